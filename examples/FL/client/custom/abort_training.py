@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import torch
+from nvflare.apis.signal import Signal
+from pytorch_lightning import Callback
+from torch.utils.data import DataLoader
+
+from training_session import shutdown_workers, unwrap_loader
+
+__all__ = ["TrainingAborted", "AbortTraining"]
+
+def _terminate_workers(loader: DataLoader) -> None:
+    # Only the workers of persistent dataloaders are reachable. The main
+    # thread notices the dead workers at its next fetch and raises.
+    iterator = getattr(unwrap_loader(loader), "_iterator", None)
+    for worker in getattr(iterator, "_workers", []):
+        if worker.is_alive():
+            worker.terminate()
+
+class TrainingAborted(Exception):
+    """
+    Raised from the Lightning hooks to leave fit and validate as soon as the
+    task is aborted.
+    """
+
+class AbortTraining(Callback):
+    """
+    Stop the Lightning trainer when the NVFlare abort signal is triggered.
+
+    The signal is checked at the start and the end of every train and
+    validation batch, where `TrainingAborted` is raised, so a long
+    validation stops after the current batch instead of after the next
+    training batch. A watcher thread also polls the signal, and if no batch
+    hook is reached within `grace_period` after the abort, e.g. while
+    waiting for data or during a long sliding window inference, it
+    terminates the workers of the watched (persistent) dataloaders so they
+    release the CPUs and memory right away, and a trainer waiting for data
+    fails at its next worker status check.
+
+    Args:
+        poll_interval: seconds between two checks of the watcher thread.
+        grace_period: seconds left to the trainer to reach a batch hook
+            before the dataloader workers are stopped.
+    """
+    def __init__(self, poll_interval: float = 0.2, grace_period: float = 2.0):
+        super(AbortTraining, self).__init__()
+
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+
+        self.signal_attached = False
+        self.signal: Optional[Signal] = None
+        self.trainer = None
+        self.loaders: List[DataLoader] = []
+        self.triggered_at: Optional[float] = None
+
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watcher = threading.Event()
+
+    def attach_signal(self, signal: Signal, loaders: Iterable[DataLoader] = ()):
+        self.signal = signal
+        self.loaders = list(loaders)
+        self.triggered_at = None
+        self.signal_attached = True
+
+        self._stop_watcher.clear()
+        self._watcher = threading.Thread(target=self._watch, name="abort-watcher", daemon=True)
+        self._watcher.start()
+
+    def detach_signal(self):
+        self.signal_attached = False
+        self._stop_watcher.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def watch(self, loader: DataLoader):
+        """
+        Add a dataloader whose workers are stopped on abort.
+        """
+        self.loaders.append(loader)
+
+    @property
+    def triggered(self) -> bool:
+        if self.signal_attached and self.signal.triggered:
+            if self.triggered_at is None:
+                self.triggered_at = time.monotonic()
+            return True
+        return False
+
+    def time_to_abort(self) -> Optional[float]:
+        """
+        Seconds since the abort was first detected, None if the signal is
+        not triggered.
+        """
+        if self.triggered_at is None:
+            if self.signal is None or not self.signal.triggered:
+                return None
+            self.triggered_at = time.monotonic()
+        return time.monotonic() - self.triggered_at
+
+    def stop_workers(self):
+        """
+        Shut down the workers of the watched dataloaders, from the thread
+        running the trainer.
+        """
+        for loader in self.loaders:
+            shutdown_workers(loader)
+
+    def _watch(self):
+        while not self._stop_watcher.wait(self.poll_interval):
+            if not self.triggered:
+                continue
+            if self.trainer is not None:
+                self.trainer.should_stop = True
+            if self.time_to_abort() > self.grace_period:
+                # The trainer did not reach a batch hook in time
+                for loader in self.loaders:
+                    _terminate_workers(loader)
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                return
+
+    def _handle_signal(self, trainer):
+        if self.triggered:
+            trainer.should_stop = True
+            raise TrainingAborted(f"Task aborted {self.time_to_abort():.2f}s ago")
+
+    def setup(self, trainer, pl_module, stage=None):
+        self.trainer = trainer
+
+    def on_sanity_check_end(self, trainer, pl_module):
+        self._handle_signal(trainer)
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, *args):
+        self._handle_signal(trainer)
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, *args):
+        self._handle_signal(trainer)
+
+    def on_validation_batch_start(self, trainer, pl_module, batch, batch_idx, *args):
+        self._handle_signal(trainer)
+
+    def on_validation_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, *args):
+        self._handle_signal(trainer)
@@ -0,0 +1,85 @@
+import os
+import pickle
+from typing import Any, Dict, Sequence
+
+import torch
+
+__all__ = ["sidecar_path", "has_sidecar", "load_checkpoint_entries", "write_sidecar"]
+
+def sidecar_path(path: str) -> str:
+    """
+    Return the path of the weights only sidecar of a checkpoint, e.g.
+    `best_model.weights.pt` for `best_model.ckpt`.
+    """
+    return os.path.splitext(path)[0] + ".weights.pt"
+
+def has_sidecar(path: str) -> bool:
+    """
+    Whether the checkpoint at `path` has a sidecar at least as recent.
+    """
+    sidecar = sidecar_path(path)
+    return os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(path)
+
+def _can_fall_back(error: Exception) -> bool:
+    # An old torch version without the `mmap` or `weights_only` argument, a
+    # legacy (non zip) file that cannot be memory mapped, or a checkpoint with
+    # objects the weights only unpickler rejects, e.g. arbitrary hyper
+    # parameters
+    if isinstance(error, TypeError):
+        return "unexpected keyword argument" in str(error)
+    if isinstance(error, RuntimeError):
+        return "mmap can only be used" in str(error)
+    return isinstance(error, pickle.UnpicklingError)
+
+def _load(path: str, mmap: bool) -> Dict[str, Any]:
+    # Memory map the storages and load the weights only, then fall back to
+    # the slower and less strict loads
+    attempts = [dict(mmap=True, weights_only=True), dict(mmap=True, weights_only=False)] if mmap else []
+    attempts += [dict(weights_only=True), dict(weights_only=False)]
+    for i, kwargs in enumerate(attempts):
+        try:
+            return torch.load(path, map_location="cpu", **kwargs)
+        except Exception as e:
+            if i == len(attempts) - 1 or not _can_fall_back(e):
+                raise
+
+def load_checkpoint_entries(
+    path: str,
+    keys: Sequence[str] = ("state_dict",),
+    mmap: bool = True,
+    use_sidecar: bool = True
+) -> Dict[str, Any]:
+    """
+    Read only the given entries of a checkpoint, e.g. the `state_dict` of a
+    Lightning checkpoint or the `model` of a NVFlare global model.
+
+    With `mmap`, the tensors are memory mapped from the file instead of
+    being read, so the optimizer states and the other entries that are not
+    returned are never loaded in memory. A sidecar written by
+    `write_sidecar` that is newer than the checkpoint is read instead of the
+    checkpoint when it holds all the keys.
+
+    Raises:
+        KeyError: if an entry is missing from the checkpoint.
+    """
+    if use_sidecar and has_sidecar(path):
+        entries = _load(sidecar_path(path), mmap)
+        if all(k in entries for k in keys):
+            return {k: entries[k] for k in keys}
+
+    checkpoint = _load(path, mmap)
+    missing = [k for k in keys if k not in checkpoint]
+    if missing:
+        raise KeyError(f"Checkpoint {path} has no entries {missing}.")
+    return {k: checkpoint[k] for k in keys}
+
+def write_sidecar(path: str, entries: Dict[str, Any]) -> str:
+    """
+    Save `entries` to the sidecar of the checkpoint at `path` and return the
+    sidecar path. The file is replaced atomically.
+    """
+    sidecar = sidecar_path(path)
+    tmp = sidecar + ".tmp"
+    torch.save(entries, tmp)
+    os.replace(tmp, sidecar)
+    return sidecar
@@ -0,0 +1,63 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+__all__ = ["PROFILE_KEY", "payload_nbytes", "summarize", "RoundProfileWriter"]
+
+# DXO meta key holding the profile of the round
+PROFILE_KEY = "round_profile"
+
+def payload_nbytes(data: Any) -> int:
+    """
+    Return the bytes of the arrays and tensors of a DXO data dict, i.e. the
+    payload serialized for the server.
+    """
+    if isinstance(data, dict):
+        return sum(payload_nbytes(v) for v in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(payload_nbytes(v) for v in data)
+    if hasattr(data, "nbytes"):
+        return int(data.nbytes)
+    if hasattr(data, "element_size"):
+        return data.element_size() * data.nelement()
+    return 0
+
+def summarize(report: Dict[str, Dict[str, float]], ndigits: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Return the report with rounded plain floats, e.g. for the DXO meta.
+    """
+    return {
+        phase: {key: round(float(value), ndigits) for key, value in values.items()}
+        for phase, values in report.items()
+    }
+
+class RoundProfileWriter:
+    """
+    Write the round profiles of `TrainingSession.end_round` as JSON lines,
+    one line per round with the site, the round and the phases, and as
+    TensorBoard scalars `fl_round/<phase>/<key>` when a Lightning logger is
+    given.
+
+    Args:
+        path: JSON lines file, appended to. None to disable.
+        logger: Lightning logger with `log_metrics`, e.g. TensorBoardLogger.
+    """
+    def __init__(self, path: Optional[str] = None, logger=None):
+        self.path = path
+        self.logger = logger
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(self, report: Dict[str, Dict[str, float]], round_num: int, site: str = "") -> None:
+        if self.path is not None:
+            record = {"site": site, "round": round_num, "phases": report}
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        if self.logger is not None:
+            metrics = {
+                f"fl_round/{phase}/{key}": float(value)
+                for phase, values in report.items()
+                for key, value in values.items()
+            }
+            self.logger.log_metrics(metrics, step=round_num)
+            self.logger.save()
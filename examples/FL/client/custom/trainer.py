@@ -16,7 +16,7 @@ from nvflare.app_common.app_constant import AppConstants
 from nvflare.app_common.pt.pt_file_model_persistor import (
     PTModelPersistenceFormatManager
 )
-from pytorch_lightning import Trainer, Callback
+from pytorch_lightning import Trainer
 from pytorch_lightning.loggers import TensorBoardLogger
 from manafaln.utils.builders import (
     build_callback,
@@ -24,28 +24,12 @@ from manafaln.utils.builders import (
     build_workflow
 )
 
-class AbortTraining(Callback):
-    def __init__(self):
-        super(AbortTraining).__init__()
-
-        self.signal_attached = False
-
-    def attach_signal(self, signal: Signal):
-        self.signal = signal
-        self.signal_attached = True
-
-    def detach_signal(self):
-        self.signal_attached = False
-
-    def _handle_signal(self, trainer):
-        if self.signal_attached and self.signal.triggered:
-            trainer.fit_loop.should_stop = True
-
-    def on_sanity_check_end(self, trainer, pl_module):
-        self._handle_signal(trainer)
-
-    def on_batch_end(self, trainer, pl_module):
-        self._handle_signal(trainer)
+from abort_training import AbortTraining
+from checkpoint_reader import has_sidecar, load_checkpoint_entries, write_sidecar
+from round_profile import PROFILE_KEY, RoundProfileWriter, payload_nbytes, summarize
+from training_session import SAMPLER_FLAG, TrainingSession
+from weight_compression import COMPRESSION_KEY, WeightDiffCompressor
+from weight_exchange import apply_weights, extract_weights
 
 class LightningTrainer(Executor):
     def __init__(
@@ -54,7 +38,13 @@ class LightningTrainer(Executor):
         aggregation_epochs: int = 1,
         train_task_name=AppConstants.TASK_TRAIN,
         submit_model_task_name=AppConstants.TASK_SUBMIT_MODEL,
-        exclude_vars=None
+        exclude_vars=None,
+        send_weight_diff: bool = False,
+        compression: str = "none",
+        compression_args: Dict = None,
+        write_weights_sidecar: bool = False,
+        profile_file: str = "logs/round_profile.jsonl",
+        profile_in_meta: bool = False
     ):
         super(LightningTrainer, self).__init__()
 
@@ -63,6 +53,22 @@ class LightningTrainer(Executor):
         self._train_task_name = train_task_name
         self._submit_model_task_name = submit_model_task_name
 
+        # Send WEIGHT_DIFF updates against the received global model instead
+        # of the full weights, the server reconstructs compressed updates with
+        # weight_compression.DecompressWeightDiff
+        self.send_weight_diff = send_weight_diff
+        self.compressor = WeightDiffCompressor(compression, **(compression_args or {}))
+        self.global_weights = None
+
+        # Save the entries read for submit_model next to the checkpoint
+        self.write_weights_sidecar = write_weights_sidecar
+
+        # Profile of every round, written to `profile_file` (relative to the
+        # app root, None to disable) and TensorBoard, and optionally sent to
+        # the server in the DXO meta
+        self.profile_file = profile_file
+        self.profile_in_meta = profile_in_meta
+
         self.key_metric = None
         self.current_metric = -np.inf
 
@@ -77,6 +83,9 @@ class LightningTrainer(Executor):
         # Overwrite some settings for correct behavior
         config["trainer"]["settings"]["default_root_dir"] = self.app_root
         config["trainer"]["settings"]["strategy"] = "ddp"
+        # The dataloaders are built once and sharded by the session, Lightning
+        # would otherwise re-create them for every fit and validate call
+        config["trainer"]["settings"][SAMPLER_FLAG] = False
 
         callbacks = config["trainer"].get("callbacks", [])
         for c in callbacks:
@@ -88,34 +97,12 @@ class LightningTrainer(Executor):
         return config
 
     def apply_weights(self, model_weights: Dict[str, np.ndarray]):
-        model = self.workflow.model
-
-        local_var_dict = model.state_dict()
-        model_keys = model_weights.keys()
-        for var_name in local_var_dict:
-            if var_name in model_keys:
-                weights = model_weights[var_name]
-                try:
-                    local_var_dict[var_name] = torch.as_tensor(
-                        np.reshape(weights, local_var_dict[var_name].shape)
-                    )
-                except Exception as e:
-                    raise ValueError(
-                        f"Convert weight from {var_name} failed with error {str(e)}"
-                    )
-        model.load_state_dict(local_var_dict)
+        # Copied into the parameters in place, see weight_exchange
+        apply_weights(self.workflow.model, model_weights)
 
     def extract_weights(self) -> Dict[str, np.ndarray]:
-        local_state_dict = self.workflow.model.state_dict()
-        local_model_dict = {}
-        for var_name in local_state_dict:
-            try:
-                local_model_dict[var_name] = local_state_dict[var_name].cpu().numpy()
-            except Exception as e:
-                raise ValueError(
-                    f"Convert weight from {var_name} failed with error: {str(e)}"
-                )
-        return local_model_dict
+        # Views of one CPU buffer per dtype, see weight_exchange
+        return extract_weights(self.workflow.model)
 
     def local_train(self):
         # Disable sanity checks
@@ -127,12 +114,13 @@ class LightningTrainer(Executor):
         )
 
         # In the trainer.fit, avoid passing data module directly, since
-        # this will cause trainer to call setup and teardown multiple times
+        # this will cause trainer to call setup and teardown multiple times.
+        # The dataloaders of the session keep their workers between rounds.
         print("Start Lightning Trainer fit")
         self.trainer.fit(
             self.workflow,
-            train_dataloaders=self.data.train_dataloader(),
-            val_dataloaders=self.data.val_dataloader()
+            train_dataloaders=self.session.train_loader,
+            val_dataloaders=self.session.val_loader
         )
 
     def update_key_metric(self):
@@ -144,7 +132,7 @@ class LightningTrainer(Executor):
 
     def local_validate(self):
         # Run validation manually
-        self.trainer.validate(self.workflow, self.data.val_dataloader())
+        self.trainer.validate(self.workflow, self.session.val_loader)
         self.update_key_metric()
 
         # Make sure all metrics are on the same device
@@ -172,13 +160,18 @@ class LightningTrainer(Executor):
         last_model = os.path.join(app_root, "models", "last.ckpt")
 
         if os.path.exists(best_model):
-            ckpt = torch.load(best_model, map_location="cpu")
+            path = best_model
         elif os.path.exists(last_model):
-            ckpt = torch.load(last_model, map_location="cpu")
+            path = last_model
             print("Best local model not found, use the lastest model instead.")
         else:
             raise RuntimeError("No model checkpoint available for submission")
 
+        # Only the model weights are read, the optimizer states and callbacks
+        # of the Lightning checkpoint stay on disk
+        ckpt = load_checkpoint_entries(path, keys=("state_dict", "global_step"))
+        if self.write_weights_sidecar and not has_sidecar(path):
+            write_sidecar(path, ckpt)
         return ckpt
 
     def generate_shareable(self) -> Shareable:
@@ -187,11 +180,24 @@ class LightningTrainer(Executor):
         else:
             meta = self.achieved_meta
             meta[MetaKey.NUM_STEPS_CURRENT_ROUND] = self.trainer.global_step
-        dxo = DXO(
-            data_kind=DataKind.WEIGHTS,
-            data=self.extract_weights(),
-            meta=meta
-        )
+        if self.send_weight_diff and self.global_weights is not None:
+            local_weights = self.extract_weights()
+            diff = {
+                k: local_weights[k] - self.global_weights[k]
+                for k in local_weights if k in self.global_weights
+            }
+            dxo = DXO(
+                data_kind=DataKind.WEIGHT_DIFF,
+                data=self.compressor.compress(diff),
+                meta=meta
+            )
+            dxo.set_meta_prop(COMPRESSION_KEY, self.compressor.compression)
+        else:
+            dxo = DXO(
+                data_kind=DataKind.WEIGHTS,
+                data=self.extract_weights(),
+                meta=meta
+            )
         dxo.set_meta_prop(MetaKey.INITIAL_METRICS, self.current_metric)
         dxo.set_meta_prop(MetaKey.NUM_STEPS_CURRENT_ROUND, self.epoch_length)
         return dxo.to_shareable()
@@ -233,6 +239,8 @@ class LightningTrainer(Executor):
                 # Insert necessary callbacks for FL
                 self.signal_handler = AbortTraining()
                 callbacks.append(self.signal_handler)
+                self.session = TrainingSession()
+                callbacks.append(self.session.step_timer)
 
                 # Create custom logger
                 tb_logger = TensorBoardLogger(save_dir="logs", name="")
@@ -245,6 +253,11 @@ class LightningTrainer(Executor):
                 )
                 self.checkpoint_saver = self.trainer.checkpoint_callback
 
+                profile_file = self.profile_file
+                if profile_file is not None:
+                    profile_file = os.path.join(self.app_root, profile_file)
+                self.profile_writer = RoundProfileWriter(profile_file, logger=tb_logger)
+
                 # Setup persistence manager
                 self.default_train_conf = {
                     "train": {"model": type(self.workflow.model).__name__}
@@ -254,21 +267,34 @@ class LightningTrainer(Executor):
                     default_train_conf=self.default_train_conf
                 )
 
-                # Manually initialize lightning data module
+                # Manually initialize lightning data module, the dataloaders
+                # are built once for the whole run
                 self.data.setup()
-                self.train_dataloader = self.data.train_dataloader()
-                self.val_dataloader = self.data.val_dataloader()
+                self.session.setup(self.data, self.trainer)
 
-                self.epoch_length = len(self.train_dataloader)
+                self.epoch_length = len(self.session.train_loader)
             elif event_type == EventType.ABORT_TASK:
                 # Nothing can do here
                 pass
             elif event_type == EventType.END_RUN:
+                self.session.teardown()
                 self.data.teardown()
         except Exception as e:
             self.log_exception(f"Exception occured while handling event {e}")
             self.log_exception(traceback.format_exc())
 
+    def abort_task(self, fl_ctx: FLContext) -> Shareable:
+        # Release the dataloader workers and the cached GPU memory right away
+        self.signal_handler.detach_signal()
+        self.signal_handler.stop_workers()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        self.log_info(
+            fl_ctx,
+            f"Task aborted {self.signal_handler.time_to_abort():.2f}s after the abort signal"
+        )
+        return make_reply(ReturnCode.TASK_ABORTED)
+
     def execute(
         self,
         task_name: str,
@@ -297,35 +323,65 @@ class LightningTrainer(Executor):
                     shareable.set_return_code(ReturnCode.EXECUTION_EXCEPTION)
                     return shareable
 
+                self.session.start_round()
+
                 # Apply received weights to local model
-                self.apply_weights(dxo.data)
+                with self.session.phase("apply_weights"):
+                    self.apply_weights(dxo.data)
+                self.session.record("apply_weights", bytes=payload_nbytes(dxo.data))
                 self.achieved_meta = dxo.meta
-
-                # Attach signal handler before and trainer actions
-                self.signal_handler.attach_signal(abort_signal)
+                if self.send_weight_diff:
+                    # The DXO arrays are not modified, no copy is needed
+                    self.global_weights = dxo.data
+
+                # Attach signal handler before and trainer actions, the
+                # workers of the session dataloaders are stopped on abort
+                self.signal_handler.attach_signal(
+                    abort_signal,
+                    loaders=[self.session.train_loader, self.session.val_loader]
+                )
 
                 # Evaluate local model before training
                 # Also save checkpoint if necessary
-                self.local_validate()
+                with self.session.phase("validate_before"):
+                    self.local_validate()
                 # Don't continue if abort triggered
                 if abort_signal.triggered:
-                    return make_reply(ReturnCode.TASK_ABORTED)
+                    return self.abort_task(fl_ctx)
 
                 # Run training
-                self.local_train()
+                with self.session.phase("train"):
+                    self.local_train()
                 if abort_signal.triggered:
-                    return make_reply(ReturnCode.TASK_ABORTED)
+                    return self.abort_task(fl_ctx)
 
                 # Run validation before submitting model
-                self.local_validate()
+                with self.session.phase("validate_after"):
+                    self.local_validate()
                 if abort_signal.triggered:
-                    return make_reply(ReturnCode.TASK_ABORTED)
+                    return self.abort_task(fl_ctx)
 
                 # Reset signal handler
                 self.signal_handler.detach_signal()
 
                 # Generate shareable from current model
-                return self.generate_shareable()
+                with self.session.phase("generate_shareable"):
+                    result = self.generate_shareable()
+                result_dxo = from_shareable(result)
+                self.session.record("generate_shareable", bytes=payload_nbytes(result_dxo.data))
+
+                # Time spent outside of the train and validation steps
+                report = self.session.end_round()
+                self.log_info(fl_ctx, f"Round timing: {self.session.format_report(report)}")
+                round_num = shareable.get_header(
+                    AppConstants.CURRENT_ROUND,
+                    len(self.session.history) - 1
+                )
+                self.profile_writer.write(report, round_num, fl_ctx.get_identity_name())
+                if self.profile_in_meta:
+                    result_dxo.set_meta_prop(PROFILE_KEY, summarize(report))
+                    result = result_dxo.update_shareable(result)
+                return result
             elif task_name == self._submit_model_task_name:
                 # Get current local model
                 ckpt = self.load_local_model(fl_ctx)
@@ -335,6 +391,10 @@ class LightningTrainer(Executor):
             else:
                 return make_reply(ReturnCode.TASK_UNKNOWN)
         except Exception as e:
+            # TrainingAborted, or a dataloader whose workers were stopped
+            if abort_signal.triggered:
+                return self.abort_task(fl_ctx)
+            self.signal_handler.detach_signal()
             self.log_exception(fl_ctx, f"Exception in LightningTrainer: {str(e)}")
             self.log_exception(fl_ctx, traceback.format_exc())
             return make_reply(ReturnCode.EXECUTION_EXCEPTION)
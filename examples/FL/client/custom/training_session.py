@@ -0,0 +1,270 @@
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import torch
+from torch.utils.data import DataLoader, DistributedSampler, IterableDataset, RandomSampler
+from pytorch_lightning import Trainer, Callback
+
+from memory import read_rss_mb, reset_peak_rss
+
+__all__ = ["SAMPLER_FLAG", "persistent_dataloader", "PersistentLoader", "StepTimer", "TrainingSession"]
+
+# Trainer flag re-creating the dataloaders with a DistributedSampler on every
+# fit/validate call, renamed in Lightning 2.0
+SAMPLER_FLAG = (
+    "use_distributed_sampler"
+    if "use_distributed_sampler" in inspect.signature(Trainer.__init__).parameters
+    else "replace_sampler_ddp"
+)
+
+def persistent_dataloader(
+    loader: DataLoader,
+    num_replicas: int = 1,
+    rank: int = 0
+) -> DataLoader:
+    """
+    Return a dataloader equivalent to `loader` whose workers stay alive
+    between the epochs, and that is sharded over `num_replicas` ranks with a
+    `DistributedSampler` like Lightning would do. Lightning must not replace
+    the sampler (see `SAMPLER_FLAG`), otherwise it builds a new dataloader,
+    with new workers, for every fit and validate call.
+    """
+    sampler = loader.sampler
+    shard = (
+        num_replicas > 1
+        and not isinstance(loader.dataset, IterableDataset)
+        and not isinstance(sampler, DistributedSampler)
+    )
+    if (loader.num_workers == 0 or loader.persistent_workers) and not shard:
+        return loader
+
+    if shard:
+        if loader.batch_size is None:
+            raise ValueError("Cannot shard a dataloader with a custom batch sampler.")
+        sampler = DistributedSampler(
+            loader.dataset,
+            num_replicas=num_replicas,
+            rank=rank,
+            shuffle=isinstance(sampler, RandomSampler),
+            drop_last=loader.drop_last
+        )
+
+    kwargs = dict(
+        num_workers=loader.num_workers,
+        collate_fn=loader.collate_fn,
+        pin_memory=loader.pin_memory,
+        timeout=loader.timeout,
+        worker_init_fn=loader.worker_init_fn,
+        multiprocessing_context=loader.multiprocessing_context,
+        generator=loader.generator,
+        persistent_workers=loader.num_workers > 0
+    )
+    if loader.num_workers > 0:
+        kwargs["prefetch_factor"] = loader.prefetch_factor
+    if getattr(loader, "pin_memory_device", ""):
+        kwargs["pin_memory_device"] = loader.pin_memory_device
+    if isinstance(loader.dataset, IterableDataset):
+        kwargs.update(batch_size=loader.batch_size, drop_last=loader.drop_last)
+    elif loader.batch_size is None:
+        kwargs["batch_sampler"] = loader.batch_sampler
+    else:
+        kwargs.update(batch_size=loader.batch_size, sampler=sampler, drop_last=loader.drop_last)
+    return DataLoader(loader.dataset, **kwargs)
+
+class PersistentLoader:
+    """
+    Iterable over a dataloader with persistent workers, to give to the
+    Lightning trainer instead of the dataloader itself.
+
+    At the end of every fit and validate call, Lightning shuts down the
+    workers of the dataloaders it was given and drops their iterator. This
+    wrapper has no iterator of its own, so Lightning leaves the one of the
+    wrapped dataloader alone, and the next call resumes the same workers.
+    The sampler is exposed for Lightning to set the epoch of a
+    `DistributedSampler`.
+    """
+    def __init__(self, dataloader: DataLoader):
+        self.dataloader = dataloader
+
+    def __iter__(self):
+        return iter(self.dataloader)
+
+    def __len__(self) -> int:
+        return len(self.dataloader)
+
+    @property
+    def sampler(self):
+        return self.dataloader.sampler
+
+    @property
+    def batch_sampler(self):
+        return self.dataloader.batch_sampler
+
+def unwrap_loader(loader) -> DataLoader:
+    return loader.dataloader if isinstance(loader, PersistentLoader) else loader
+
+def batch_size(batch: Any) -> int:
+    # Size of the first tensor of a (nested) batch
+    if isinstance(batch, torch.Tensor):
+        return batch.shape[0] if batch.ndim > 0 else 1
+    if isinstance(batch, dict):
+        batch = list(batch.values())
+    if isinstance(batch, (list, tuple)):
+        for item in batch:
+            size = batch_size(item)
+            if size:
+                return size
+    return 0
+
+def shutdown_workers(loader: DataLoader) -> None:
+    loader = unwrap_loader(loader)
+    iterator = getattr(loader, "_iterator", None)
+    if iterator is not None and hasattr(iterator, "_shutdown_workers"):
+        iterator._shutdown_workers()
+    loader._iterator = None
+
+class StepTimer(Callback):
+    """
+    Accumulate the time spent inside the train and validation batches, i.e.
+    without the data loading and the loop overheads between them, and the
+    number of samples of these batches.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.step_time = 0.0
+        self.num_steps = 0
+        self.num_samples = 0
+        self._start = None
+
+    def _sync(self, pl_module):
+        if pl_module.device.type == "cuda":
+            torch.cuda.synchronize(pl_module.device)
+
+    def _start_step(self, pl_module, batch):
+        self._sync(pl_module)
+        self.num_samples += batch_size(batch)
+        self._start = time.perf_counter()
+
+    def _end_step(self, pl_module):
+        if self._start is None:
+            return
+        self._sync(pl_module)
+        self.step_time += time.perf_counter() - self._start
+        self.num_steps += 1
+        self._start = None
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx, *args):
+        self._start_step(pl_module, batch)
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, *args):
+        self._end_step(pl_module)
+
+    def on_validation_batch_start(self, trainer, pl_module, batch, batch_idx, *args):
+        self._start_step(pl_module, batch)
+
+    def on_validation_batch_end(self, trainer, pl_module, outputs, batch, batch_idx, *args):
+        self._end_step(pl_module)
+
+class TrainingSession:
+    """
+    Dataloaders and timers kept for the whole FL run.
+
+    The train and validation dataloaders are built once, with persistent
+    workers, and reused by every fit and validate call of every round, so the
+    workers and their caches are not re-spawned several times per round.
+    They are wrapped in a `PersistentLoader`, so Lightning does not shut
+    their workers down at the end of every call.
+    Every phase of a round is profiled: wall and CPU time, time inside the
+    train and validation steps, overhead outside of them, samples per
+    second, and peak host (RSS) and GPU memory. The CPU time covers all the
+    threads of this process, not the dataloader worker processes.
+
+    Add `step_timer` to the callbacks of the Lightning trainer and call
+    `setup` once the trainer is built.
+    """
+    def __init__(self):
+        self.step_timer = StepTimer()
+        self.train_loader: Optional[PersistentLoader] = None
+        self.val_loader: Optional[PersistentLoader] = None
+        self.round: Dict[str, Dict[str, float]] = {}
+        self.history = []
+
+    def setup(self, data, trainer: Trainer):
+        start = time.perf_counter()
+        self.train_loader = PersistentLoader(persistent_dataloader(
+            data.train_dataloader(), trainer.world_size, trainer.global_rank
+        ))
+        self.val_loader = PersistentLoader(persistent_dataloader(
+            data.val_dataloader(), trainer.world_size, trainer.global_rank
+        ))
+        self.setup_time = time.perf_counter() - start
+
+    def teardown(self):
+        for loader in (self.train_loader, self.val_loader):
+            if loader is not None:
+                shutdown_workers(loader)
+
+    @contextmanager
+    def phase(self, name: str):
+        self.step_timer.reset()
+        has_peak_rss = reset_peak_rss()
+        cuda = torch.cuda.is_available()
+        if cuda:
+            torch.cuda.reset_peak_memory_stats()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            timer = self.step_timer
+            self.round.setdefault(name, {}).update({
+                "wall": wall,
+                "cpu_time": time.process_time() - cpu_start,
+                "steps": timer.num_steps,
+                "step_time": timer.step_time,
+                "overhead": wall - timer.step_time,
+                "samples": timer.num_samples,
+                "samples_per_sec": timer.num_samples / wall if wall > 0 else 0.0,
+                # Lifetime peak when it cannot be reset
+                "peak_rss_mb": read_rss_mb("VmHWM" if has_peak_rss else "VmRSS") or 0.0,
+                "peak_gpu_mb": torch.cuda.max_memory_allocated() / 2**20 if cuda else 0.0
+            })
+
+    def record(self, name: str, **values: float):
+        """
+        Add values to a phase of the round, e.g. the bytes of the update.
+        """
+        self.round.setdefault(name, {}).update(values)
+
+    def start_round(self):
+        # Drop the phases of an aborted round
+        self.round = {}
+
+    def end_round(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the timings of the phases of the round and start a new round.
+        """
+        report = dict(self.round)
+        total = {
+            key: sum(p.get(key, 0) for p in self.round.values())
+            for key in ("wall", "cpu_time", "steps", "step_time", "overhead", "samples", "bytes")
+        }
+        for key in ("peak_rss_mb", "peak_gpu_mb"):
+            total[key] = max((p.get(key, 0.0) for p in self.round.values()), default=0.0)
+        total["samples_per_sec"] = total["samples"] / total["wall"] if total["wall"] > 0 else 0.0
+        report["total"] = total
+        self.history.append(report)
+        self.round = {}
+        return report
+
+    @staticmethod
+    def format_report(report: Dict[str, Dict[str, float]]) -> str:
+        return ", ".join(
+            f"{name} {p['wall']:.1f}s ({p['steps']} steps {p['step_time']:.1f}s, overhead {p['overhead']:.1f}s)"
+            for name, p in report.items() if "wall" in p
+        )
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+__all__ = ["config_hash", "data_fingerprint", "ValidationCache"]
+
+def config_hash(config: Any) -> str:
+    """
+    Return a short hash of a JSON config, e.g. the data settings and the
+    validation transforms, to key the cached data.
+    """
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def _file_stats(item: Any, stats: List) -> None:
+    # Size and modification time of every existing path of a datalist item
+    if isinstance(item, dict):
+        for value in item.values():
+            _file_stats(value, stats)
+    elif isinstance(item, (list, tuple)):
+        for value in item:
+            _file_stats(value, stats)
+    elif isinstance(item, str) and os.path.exists(item):
+        stat = os.stat(item)
+        stats.append([item, stat.st_size, stat.st_mtime_ns])
+
+def data_fingerprint(dataset: Dataset) -> Optional[List]:
+    """
+    Return the resolved datalist of a MONAI style dataset (its `data`) with
+    the size and modification time of every file it refers to, or None if
+    the dataset has no datalist.
+    """
+    items = getattr(dataset, "data", None)
+    if not isinstance(items, (list, tuple)):
+        return None
+    stats = []
+    _file_stats(list(items), stats)
+    return [list(items), stats]
+
+# Directory names of the cached data, see `config_hash`
+_KEY = re.compile(r"[0-9a-f]{16}")
+
+class _MemoryBatches(Dataset):
+    def __init__(self, batches: List):
+        self.batches = batches
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __getitem__(self, index):
+        return self.batches[index]
+
+class _DiskBatches(Dataset):
+    def __init__(self, files: List[str]):
+        self.files = files
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, index):
+        # The batches may contain MetaTensors and meta dicts
+        return torch.load(self.files[index], map_location="cpu", weights_only=False)
+
+class ValidationCache:
+    """
+    Preprocessed validation batches, built once per run from the validation
+    dataloader and replayed for every model to evaluate.
+
+    The batches are saved in `cache_dir/<key>`, where the key hashes
+    `config_key` (e.g. the data settings and the validation transforms),
+    the resolved datalist of the validation dataset and the size and
+    modification time of its files, so a later run with the same config
+    and data reuses them without reading and transforming the images again.
+    Writing a new key removes the other keys in `cache_dir`, so the cache of
+    a previous config or datalist does not stay on disk.
+    Without `cache_dir`, the batches are kept in memory, which needs the
+    whole preprocessed validation set to fit in RAM. If the dataset has no
+    datalist to fingerprint, the disk cache is not used and the dataloader
+    is streamed as is. The validation transforms must be deterministic.
+
+    Args:
+        build_loader: returns the validation dataloader.
+        config_key: identifies the data config, see `config_hash`.
+        cache_dir: directory of the disk cache, None to cache in memory.
+    """
+    def __init__(
+        self,
+        build_loader: Callable[[], DataLoader],
+        config_key: str,
+        cache_dir: Optional[str] = None
+    ):
+        self.build_loader = build_loader
+        self.config_key = config_key
+        self.cache_dir = cache_dir
+        self.dataset: Optional[Dataset] = None
+
+    def _build(self, source: DataLoader) -> Optional[Dataset]:
+        if self.cache_dir is None:
+            return _MemoryBatches([batch for batch in source])
+
+        fingerprint = data_fingerprint(source.dataset)
+        if fingerprint is None:
+            warnings.warn("The validation dataset has no datalist to key the cache, it is not cached.")
+            return None
+        key = config_hash({"config": self.config_key, "data": fingerprint})
+        cache_dir = os.path.join(self.cache_dir, key)
+        done_file = os.path.join(cache_dir, "done.json")
+
+        if os.path.exists(done_file):
+            with open(done_file) as f:
+                num_batches = json.load(f)["num_batches"]
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            num_batches = 0
+            for batch in source:
+                torch.save(batch, os.path.join(cache_dir, f"batch_{num_batches:06d}.pt"))
+                num_batches += 1
+            # Only a complete cache is reused
+            with open(done_file, "w") as f:
+                json.dump({"num_batches": num_batches}, f)
+            self._prune(key)
+        files = [
+            os.path.join(cache_dir, f"batch_{i:06d}.pt")
+            for i in range(num_batches)
+        ]
+        return _DiskBatches(files)
+
+    def _prune(self, key: str) -> None:
+        # Remove the caches of the previous configs and data
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name != key and _KEY.fullmatch(name) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def loader(self) -> DataLoader:
+        """
+        Return a dataloader over the cached batches, building the cache on
+        the first call.
+        """
+        if self.dataset is None:
+            source = self.build_loader()
+            self.dataset = self._build(source)
+            if self.dataset is None:
+                return source
+        # The items are already collated batches
+        return DataLoader(self.dataset, batch_size=None, shuffle=False, num_workers=0)
+
+    def clear(self) -> None:
+        self.dataset = None
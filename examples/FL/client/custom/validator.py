@@ -15,7 +15,7 @@ from nvflare.apis.shareable import Shareable, make_reply
 from nvflare.apis.signal import Signal
 from nvflare.app_common.app_constant import AppConstants
 
-from pytorch_lightning import Trainer, Callback
+from pytorch_lightning import Trainer
 from pytorch_lightning.loggers import TensorBoardLogger
 from manafaln.utils.builders import (
     build_callback,
@@ -23,40 +23,30 @@ from manafaln.utils.builders import (
     build_workflow
 )
 
-class AbortTraining(Callback):
-    def __init__(self):
-        super(AbortTraining).__init__()
-
-        self.signal_attached = False
-
-    def attach_signal(self, signal: Signal):
-        self.signal = signal
-        self.signal_attached = True
-
-    def detach_signal(self):
-        self.signal_attached = False
-
-    def _handle_signal(self, trainer):
-        if self.signal_attached and self.signal.triggered:
-            trainer.fit_loop.should_stop = True
-
-    def on_sanity_check_end(self, trainer, pl_module):
-        self._handle_signal(trainer)
-
-    def on_batch_end(self, trainer, pl_module):
-        self._handle_signal(trainer)
+from abort_training import AbortTraining
+from training_session import SAMPLER_FLAG, persistent_dataloader
+from validation_cache import ValidationCache, config_hash
+from weight_exchange import apply_weights
 
 class LightningValidator(Executor):
     def __init__(
         self,
         validate_task_name=AppConstants.TASK_VALIDATION,
-        config_file="config/config_validation.json"
+        config_file="config/config_validation.json",
+        cache_data: bool = False,
+        cache_dir: str = "val_cache"
     ):
         super(LightningValidator, self).__init__()
 
         self._validate_task_name = validate_task_name
         self.config_file = config_file
 
+        # Preprocess the validation data once for all the models to evaluate,
+        # in `cache_dir` (relative to the app root), or in memory if None.
+        # Every rank caches its own shard of the validation data.
+        self.cache_data = cache_data
+        self.cache_dir = cache_dir
+
     def patch_config(self, config: Dict) -> Dict:
         # Remove unwanted settings
         if config["trainer"].get("settings", None):
@@ -68,6 +58,9 @@ class LightningValidator(Executor):
         # Overwrite some settings for correct behavior
         config["trainer"]["settings"]["default_root_dir"] = self.app_root
         config["trainer"]["settings"]["strategy"] = "ddp"
+        if self.cache_data:
+            # The cached batches are already sharded, replay them as they are
+            config["trainer"]["settings"][SAMPLER_FLAG] = False
 
         # Disable logging and checkpoints for validation,
         # otherwise there will be a lot of `versions` of logs
@@ -111,7 +104,35 @@ class LightningValidator(Executor):
         # Manually initialize lightning data module
         self.data.setup()
 
+        if self.cache_data:
+            # Keyed by the data settings and the validation transforms, the
+            # cache adds the datalist and the file stats of the dataset
+            key = config_hash({
+                "settings": self.config["data"].get("settings", {}),
+                "validation": self.config["data"].get("validation", {})
+            })
+            cache_dir = self.cache_dir
+            if cache_dir is not None:
+                cache_dir = os.path.join(
+                    self.app_root,
+                    cache_dir,
+                    f"rank_{self.trainer.global_rank}_of_{self.trainer.world_size}"
+                )
+            self.val_cache = ValidationCache(self.build_cached_loader, key, cache_dir)
+        else:
+            self.val_cache = None
+
+    def build_cached_loader(self):
+        # Shard the data like Lightning would, the replayed batches are not
+        return persistent_dataloader(
+            self.data.val_dataloader(),
+            self.trainer.world_size,
+            self.trainer.global_rank
+        )
+
     def teardown(self, fl_ctx: FLContext):
+        if self.val_cache is not None:
+            self.val_cache.clear()
         self.data.teardown()
 
     def handle_event(self, event_type: str, fl_ctx: FLContext):
@@ -126,27 +147,34 @@ class LightningValidator(Executor):
             self.log_exception(fl_ctx, traceback.format_exc())
 
     def apply_weight(self, model_weights: Dict[str, np.ndarray]):
-        model = self.workflow.model
+        # Copied into the parameters in place, see weight_exchange
+        apply_weights(self.workflow.model, model_weights)
 
-        local_var_dict = model.state_dict()
-        model_keys = model_weights.keys()
-        for var_name in local_var_dict:
-            if var_name in model_keys:
-                weights = model_weights[var_name]
-                try:
-                    local_var_dict[var_name] = torch.as_tensor(
-                        np.reshape(weights, local_var_dict[var_name].shape)
-                    )
-                except Exception as e:
-                    raise ValueError(
-                        f"Convert weight from {var_name} failed with error {str(e)}"
-                    )
-
-        model.load_state_dict(local_var_dict)
+    def val_dataloader(self):
+        if self.val_cache is not None:
+            loader = self.val_cache.loader()
+        else:
+            loader = self.data.val_dataloader()
+        # Stop its workers on abort
+        self.signal_handler.watch(loader)
+        return loader
 
     def run_validation(self):
-        self.trainer.validate(self.workflow, self.data.val_dataloader())
-        return self.trainer.callback_metrics
+        self.trainer.validate(self.workflow, self.val_dataloader())
+        # The trainer reuses the dict for the next validation
+        return dict(self.trainer.callback_metrics)
+
+    def abort_task(self, fl_ctx: FLContext) -> Shareable:
+        # Release the dataloader workers and the cached GPU memory right away
+        self.signal_handler.detach_signal()
+        self.signal_handler.stop_workers()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        self.log_info(
+            fl_ctx,
+            f"Task aborted {self.signal_handler.time_to_abort():.2f}s after the abort signal"
+        )
+        return make_reply(ReturnCode.TASK_ABORTED)
 
     def execute(
         self,
@@ -157,6 +185,8 @@ class LightningValidator(Executor):
     ) -> Shareable:
         if task_name == self._validate_task_name:
             model_owner = "?"
+            # Polled during the validation batches and by a watcher thread
+            self.signal_handler.attach_signal(abort_signal)
             try:
                 try:
                     dxo = from_shareable(shareable)
@@ -184,7 +214,7 @@ class LightningValidator(Executor):
                 # Run validation
                 metrics = self.run_validation()
                 if abort_signal.triggered:
-                    return make_reply(ReturnCode.TASK_ABORTED)
+                    return self.abort_task(fl_ctx)
 
                 self.log_info(
                     fl_ctx,
@@ -195,8 +225,13 @@ class LightningValidator(Executor):
                 dxo = DXO(data_kind=DataKind.METRICS, data=metrics)
                 return dxo.to_shareable()
             except Exception as e:
+                # TrainingAborted, or a dataloader whose workers were stopped
+                if abort_signal.triggered:
+                    return self.abort_task(fl_ctx)
                 self.log_exception(fl_ctx, traceback.format_exc())
                 return make_reply(ReturnCode.EXECUTION_EXCEPTION)
+            finally:
+                self.signal_handler.detach_signal()
         else:
             return make_reply(ReturnCode.TASK_UNKNOWN)
 
@@ -0,0 +1,117 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+COMPRESSIONS = ("none", "fp16", "topk", "int8")
+
+# DXO meta key holding the compression of a WEIGHT_DIFF update
+COMPRESSION_KEY = "weight_diff_compression"
+
+# Entries of a compressed variable are stored as `<name><SEP><field>`
+SEP = "::"
+
+class WeightDiffCompressor:
+    """
+    Compress weight differences for `DataKind.WEIGHT_DIFF` updates.
+
+    - "none": the float32 differences.
+    - "fp16": the differences cast to float16.
+    - "topk": the `topk_ratio` largest differences of every variable, as
+      indices and float16 values.
+    - "int8": the differences quantized to int8 with one scale per variable.
+
+    The DXO data stays a flat dict of NumPy arrays. With `error_feedback`, the
+    part of the difference that was not sent is kept and added to the
+    difference of the next round, so no update is lost over the rounds.
+    Variables of integer dtypes are always sent as is.
+
+    Args:
+        compression: one of "none", "fp16", "topk" and "int8".
+        topk_ratio: fraction of the values of each variable sent by "topk".
+        error_feedback: accumulate the compression error for the next round.
+    """
+    def __init__(
+        self,
+        compression: str = "fp16",
+        topk_ratio: float = 0.01,
+        error_feedback: bool = True
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}, available options are {list(COMPRESSIONS)}.")
+        if not 0.0 < topk_ratio <= 1.0:
+            raise ValueError("topk_ratio should be in (0, 1].")
+        self.compression = compression
+        self.topk_ratio = topk_ratio
+        self.error_feedback = error_feedback
+        self.residuals: Dict[str, np.ndarray] = {}
+
+    def compress(self, diff: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        data = {}
+        for name, value in diff.items():
+            value = np.asarray(value)
+            if not np.issubdtype(value.dtype, np.floating) or self.compression == "none":
+                data[name] = value
+                continue
+
+            value = value.astype(np.float32)
+            if self.error_feedback and name in self.residuals:
+                value = value + self.residuals[name]
+
+            if self.compression == "fp16":
+                data[name] = value.astype(np.float16)
+                sent = data[name].astype(np.float32)
+            elif self.compression == "topk":
+                flat = value.reshape(-1)
+                k = max(1, int(round(flat.size * self.topk_ratio)))
+                indices = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]
+                values = flat[indices].astype(np.float16)
+                data[name + SEP + "indices"] = indices.astype(np.int32 if flat.size < 2**31 else np.int64)
+                data[name + SEP + "values"] = values
+                data[name + SEP + "shape"] = np.asarray(value.shape, dtype=np.int64)
+                sent = np.zeros_like(flat)
+                sent[indices] = values
+                sent = sent.reshape(value.shape)
+            else:
+                scale = float(np.abs(value).max()) / 127.0
+                scale = scale if scale > 0 else 1.0
+                q = np.clip(np.rint(value / scale), -127, 127).astype(np.int8)
+                data[name + SEP + "q"] = q
+                data[name + SEP + "scale"] = np.asarray([scale], dtype=np.float32)
+                sent = q.astype(np.float32) * scale
+
+            if self.error_feedback:
+                self.residuals[name] = value - sent
+        return data
+
+def decompress(data: Dict[str, np.ndarray], compression: Optional[str]) -> Dict[str, np.ndarray]:
+    """
+    Reconstruct the float32 weight differences from `WeightDiffCompressor`
+    data, e.g. on the server before the aggregation.
+    """
+    if compression in (None, "none"):
+        return dict(data)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}, available options are {list(COMPRESSIONS)}.")
+
+    diff = {}
+    fields: Dict[str, Dict[str, np.ndarray]] = {}
+    for key, value in data.items():
+        if SEP in key:
+            name, field = key.rsplit(SEP, 1)
+            fields.setdefault(name, {})[field] = np.asarray(value)
+        elif np.issubdtype(np.asarray(value).dtype, np.floating):
+            diff[key] = np.asarray(value, dtype=np.float32)
+        else:
+            diff[key] = value
+
+    for name, f in fields.items():
+        if "indices" in f:
+            shape = tuple(int(s) for s in f["shape"])
+            flat = np.zeros(int(np.prod(shape)), dtype=np.float32)
+            flat[f["indices"]] = f["values"].astype(np.float32)
+            diff[name] = flat.reshape(shape)
+        elif "q" in f:
+            diff[name] = f["q"].astype(np.float32) * f["scale"].astype(np.float32)[0]
+        else:
+            raise ValueError(f"Unknown compressed fields {list(f)} of {name}.")
+    return diff
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch
+
+__all__ = ["extract_weights", "apply_weights"]
+
+def _copy_(targets: List[torch.Tensor], sources: List[torch.Tensor]):
+    foreach_copy = getattr(torch, "_foreach_copy_", None)
+    if foreach_copy is not None:
+        foreach_copy(targets, sources)
+    else:
+        for t, s in zip(targets, sources):
+            t.copy_(s)
+
+def extract_weights(model: torch.nn.Module) -> Dict[str, np.ndarray]:
+    """
+    Return the state dict of `model` as NumPy arrays for a DXO.
+
+    Tensors on an accelerator are packed into one contiguous buffer per dtype
+    on their device and moved to the CPU with a single transfer, the returned
+    arrays are reshaped views of that buffer. Tensors on the CPU are shared
+    with the model without any copy, like `Tensor.numpy()`.
+    """
+    state_dict = model.state_dict()
+
+    weights = {}
+    groups: Dict[Tuple[torch.dtype, torch.device], List[str]] = OrderedDict()
+    for name, tensor in state_dict.items():
+        if tensor.device.type == "cpu":
+            weights[name] = tensor.detach().numpy()
+        else:
+            groups.setdefault((tensor.dtype, tensor.device), []).append(name)
+
+    for names in groups.values():
+        flat = torch.cat([state_dict[n].detach().reshape(-1) for n in names])
+        flat = flat.cpu().numpy()
+        offset = 0
+        for name in names:
+            shape = tuple(state_dict[name].shape)
+            size = state_dict[name].numel()
+            weights[name] = flat[offset:offset + size].reshape(shape)
+            offset += size
+    # Keep the state dict order
+    return {name: weights[name] for name in state_dict}
+
+def apply_weights(model: torch.nn.Module, model_weights: Dict[str, np.ndarray]) -> int:
+    """
+    Copy the received weights directly into the parameters and buffers of
+    `model`, without building and loading a new state dict. Variables
+    missing from `model_weights` keep their local values.
+
+    For tensors on an accelerator, the weights of the same dtype are packed
+    into one buffer and moved to the device with a single transfer.
+
+    Returns:
+        the number of variables updated.
+    """
+    local_vars = model.state_dict(keep_vars=True)
+
+    groups: Dict[Tuple[torch.dtype, torch.device], Tuple[List, List]] = OrderedDict()
+    for var_name, target in local_vars.items():
+        if var_name not in model_weights:
+            continue
+        try:
+            source = torch.from_numpy(np.ascontiguousarray(model_weights[var_name]))
+            source = source.reshape(target.shape)
+        except Exception as e:
+            raise ValueError(
+                f"Convert weight from {var_name} failed with error {str(e)}"
+            )
+        targets, sources = groups.setdefault((target.dtype, target.device), ([], []))
+        targets.append(target.data)
+        sources.append(source)
+
+    with torch.no_grad():
+        for (dtype, device), (targets, sources) in groups.items():
+            if device.type != "cpu":
+                # One host to device transfer instead of one per tensor
+                flat = torch.cat([s.reshape(-1).to(dtype) for s in sources])
+                flat = flat.pin_memory() if torch.cuda.is_available() else flat
+                flat = flat.to(device, non_blocking=True)
+                sources = list(torch.split(flat, [s.numel() for s in sources]))
+                sources = [s.view(t.shape) for s, t in zip(sources, targets)]
+            _copy_(targets, sources)
+    return sum(len(targets) for targets, _ in groups.values())
@@ -0,0 +1,75 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import torch
+
+CUSTOM_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client", "custom")
+
+CHILD = """
+import sys, time
+import torch
+sys.path.append({custom_dir!r})
+from checkpoint_reader import load_checkpoint_entries
+def rss_kb(key):
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith(key))
+# The peak RSS is inherited from the parent, reset it
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+base = rss_kb("VmRSS:")
+start = time.perf_counter()
+if {mode!r} == "torch.load":
+    state_dict = torch.load({path!r}, map_location="cpu", weights_only=False)["state_dict"]
+else:
+    state_dict = load_checkpoint_entries({path!r}, use_sidecar={mode!r} == "sidecar")["state_dict"]
+# Read all the weights, like the serialization of the DXO does
+total = sum(float(v.float().sum()) for v in state_dict.values())
+elapsed = time.perf_counter() - start
+peak = rss_kb("VmHWM:") - base
+print(elapsed, peak / 1024)
+"""
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the full torch.load of a Lightning checkpoint with the checkpoint reader (Linux only)."
+    )
+    parser.add_argument("--num_params", type=float, default=50e6, help="number of model parameters")
+    args = parser.parse_args()
+
+    sys.path.append(CUSTOM_DIR)
+    from checkpoint_reader import load_checkpoint_entries, write_sidecar
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "best_model.ckpt")
+        num_tensors = 50
+        size = int(args.num_params // num_tensors)
+        state_dict = {f"model.layer{i}.weight": torch.randn(size) for i in range(num_tensors)}
+        # Adam keeps two moments per parameter
+        optimizer = {
+            "state": {i: {"exp_avg": torch.randn(size), "exp_avg_sq": torch.randn(size)} for i in range(num_tensors)},
+            "param_groups": [{"lr": 1e-4, "params": list(range(num_tensors))}]
+        }
+        torch.save({
+            "epoch": 100,
+            "global_step": 5000,
+            "state_dict": state_dict,
+            "optimizer_states": [optimizer],
+            "lr_schedulers": [{"last_epoch": 100}],
+            "callbacks": {"ModelCheckpoint": {"best_model_score": torch.tensor(0.9)}}
+        }, path)
+        del state_dict, optimizer
+        print(f"checkpoint {os.path.getsize(path) / 2**20:.0f} MB, weights {args.num_params * 4 / 2**20:.0f} MB")
+
+        for mode in ["torch.load", "mmap", "sidecar"]:
+            if mode == "sidecar":
+                write_sidecar(path, load_checkpoint_entries(path, keys=("state_dict", "global_step")))
+            code = CHILD.format(custom_dir=CUSTOM_DIR, mode=mode, path=path)
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            elapsed, peak = map(float, out.stdout.split())
+            print(f"{mode:<12}{elapsed:>8.2f} s {peak:>8.0f} MB peak RSS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import torch
+from pytorch_lightning import LightningModule, Trainer
+from torch.utils.data import DataLoader, Dataset
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client", "custom"))
+from training_session import (  # noqa: E402
+    SAMPLER_FLAG,
+    PersistentLoader,
+    persistent_dataloader,
+    shutdown_workers
+)
+
+class VolumeDataset(Dataset):
+    # Every worker pays a start up cost, e.g. imports or opening a cache
+    def __init__(self, num_cases, size, worker_startup):
+        self.num_cases = num_cases
+        self.size = size
+        self.worker_startup = worker_startup
+        self.started = False
+
+    def __len__(self):
+        return self.num_cases
+
+    def __getitem__(self, index):
+        if not self.started:
+            time.sleep(self.worker_startup)
+            self.started = True
+        # The pid of the worker loading the case
+        return torch.randn(1, self.size, self.size, self.size), os.getpid()
+
+class TinyModel(LightningModule):
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv3d(1, 1, 3, padding=1)
+        self.pids = set()
+
+    def training_step(self, batch, batch_idx):
+        image, pids = batch
+        self.pids.update(pids.tolist())
+        return self.conv(image).mean()
+
+    def validation_step(self, batch, batch_idx):
+        image, pids = batch
+        self.pids.update(pids.tolist())
+
+    def configure_optimizers(self):
+        return torch.optim.SGD(self.parameters(), lr=1e-3)
+
+def run_rounds(make_loaders, args):
+    """
+    Run the FL rounds of a client like trainer.py, validate, fit and validate
+    with the same trainer, and return the seconds per round and the number of
+    distinct worker processes.
+    """
+    model = TinyModel()
+    trainer = Trainer(
+        accelerator="cpu",
+        devices=1,
+        max_epochs=0,
+        num_sanity_val_steps=0,
+        logger=False,
+        enable_checkpointing=False,
+        enable_progress_bar=False,
+        enable_model_summary=False,
+        **{SAMPLER_FLAG: False}
+    )
+    loaders = None
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        loaders = make_loaders(loaders)
+        train_loader, val_loader = loaders
+        trainer.validate(model, val_loader, verbose=False)
+        trainer.fit_loop.max_epochs = trainer.current_epoch + args.epochs
+        trainer.fit(model, train_dataloaders=train_loader, val_dataloaders=val_loader)
+        trainer.validate(model, val_loader, verbose=False)
+    elapsed = (time.perf_counter() - start) / args.rounds
+    for loader in loaders:
+        shutdown_workers(loader)
+    return elapsed, len(model.pids)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the dataloader workers over FL rounds run with a Lightning trainer."
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--num_cases", type=int, default=16)
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--num_workers", type=int, default=2)
+    parser.add_argument("--worker_startup", type=float, default=0.5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    def make_loader(shuffle):
+        dataset = VolumeDataset(args.num_cases, args.size, args.worker_startup)
+        return DataLoader(dataset, batch_size=2, shuffle=shuffle, num_workers=args.num_workers)
+
+    results = {
+        # New dataloaders for every round
+        "re-created": run_rounds(lambda _: (make_loader(True), make_loader(False)), args),
+        # Persistent workers, but Lightning shuts them down after every call
+        "persistent": run_rounds(
+            lambda loaders: loaders or (
+                persistent_dataloader(make_loader(True)),
+                persistent_dataloader(make_loader(False))
+            ),
+            args
+        ),
+        # What TrainingSession gives to the trainer
+        "wrapped": run_rounds(
+            lambda loaders: loaders or (
+                PersistentLoader(persistent_dataloader(make_loader(True))),
+                PersistentLoader(persistent_dataloader(make_loader(False)))
+            ),
+            args
+        )
+    }
+
+    print(f"{args.rounds} rounds of {args.epochs} epochs, {args.num_workers} workers per dataloader")
+    for name, (elapsed, num_pids) in results.items():
+        print(f"{name:<12}{elapsed:>8.2f} s/round {num_pids:>6} worker processes")
+
+if __name__ == "__main__":
+    main()
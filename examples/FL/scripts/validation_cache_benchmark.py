@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import torch
+from monai.data import DataLoader, Dataset
+from monai.transforms import Compose, GaussianSmoothd, Resized, ScaleIntensityd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "client", "custom"))
+from validation_cache import ValidationCache, config_hash  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate several site models with and without the validation data cache."
+    )
+    parser.add_argument("--num_models", type=int, default=4)
+    parser.add_argument("--num_cases", type=int, default=8)
+    parser.add_argument("--size", type=int, default=96)
+    parser.add_argument("--disk", action="store_true", help="cache on disk instead of in memory")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    cases = [{"image": torch.randn(1, args.size, args.size, args.size)} for _ in range(args.num_cases)]
+    transforms = Compose([
+        GaussianSmoothd(keys="image", sigma=1.5),
+        Resized(keys="image", spatial_size=[args.size // 2] * 3),
+        ScaleIntensityd(keys="image")
+    ])
+
+    def build_loader():
+        return DataLoader(Dataset(cases, transforms), batch_size=1, num_workers=0)
+
+    models = [torch.nn.Conv3d(1, 2, 3, padding=1) for _ in range(args.num_models)]
+
+    def evaluate(model, loader):
+        with torch.no_grad():
+            return sum(model(batch["image"]).mean().item() for batch in loader)
+
+    start = time.perf_counter()
+    reference = [evaluate(m, build_loader()) for m in models]
+    uncached = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        key = config_hash({"size": args.size, "transforms": repr(transforms.transforms)})
+        cache = ValidationCache(build_loader, key, cache_dir if args.disk else None)
+        start = time.perf_counter()
+        results = [evaluate(m, cache.loader()) for m in models]
+        cached = time.perf_counter() - start
+
+    if not torch.allclose(torch.tensor(reference), torch.tensor(results)):
+        raise SystemExit("Cached validation results differ.")
+    print(f"{args.num_models} models, {args.num_cases} cases of {args.size}^3")
+    print(f"{'preprocess per model':<20}{uncached:>9.2f} s")
+    print(f"{'cached on disk' if args.disk else 'cached in memory':<20}{cached:>9.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import pickle
+import sys
+
+import numpy as np
+import torch
+from monai.losses import DiceCELoss
+from monai.metrics import DiceMetric
+from monai.networks.nets import UNet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "client", "custom"))
+from weight_compression import WeightDiffCompressor, decompress  # noqa: E402
+from weight_exchange import apply_weights, extract_weights  # noqa: E402
+
+def make_site(rng, num_cases, size, shift):
+    # Spheres on a noisy background, every site has its own intensity shift
+    grid = np.stack(np.meshgrid(*[np.arange(size)] * 3, indexing="ij"))
+    images, labels = [], []
+    for _ in range(num_cases):
+        center = rng.uniform(0.3, 0.7, 3)[:, None, None, None] * size
+        radius = rng.uniform(0.1, 0.25) * size
+        label = (((grid - center) ** 2).sum(0) < radius**2).astype(np.int64)
+        image = label + shift + rng.normal(0, 0.5, label.shape)
+        images.append(image[None].astype(np.float32))
+        labels.append(label[None])
+    return torch.from_numpy(np.stack(images)), torch.from_numpy(np.stack(labels))
+
+def build_model():
+    return UNet(spatial_dims=3, in_channels=1, out_channels=2, channels=(8, 16, 32), strides=(2, 2))
+
+def local_train(model, data, steps, lr):
+    images, labels = data
+    loss_fn = DiceCELoss(to_onehot_y=True, softmax=True)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    model.train()
+    for step in range(steps):
+        index = torch.randint(0, images.shape[0], (2,))
+        optimizer.zero_grad()
+        loss_fn(model(images[index]), labels[index]).backward()
+        optimizer.step()
+
+def evaluate(model, sites):
+    metric = DiceMetric(include_background=False)
+    model.eval()
+    with torch.no_grad():
+        for images, labels in sites:
+            preds = model(images).argmax(dim=1, keepdim=True)
+            metric(preds == 1, labels == 1)
+    return metric.aggregate().item()
+
+def simulate(mode, args, train_sites, val_sites):
+    torch.manual_seed(args.seed)
+    global_model = build_model()
+    global_weights = {k: v.copy() for k, v in extract_weights(global_model).items()}
+    site_model = build_model()
+    compressors = [
+        WeightDiffCompressor(mode, topk_ratio=args.topk_ratio) for _ in train_sites
+    ] if mode != "weights" else None
+
+    total_bytes = 0
+    for _ in range(args.rounds):
+        updates = []
+        for i, data in enumerate(train_sites):
+            apply_weights(site_model, global_weights)
+            local_train(site_model, data, args.local_steps, args.lr)
+            local_weights = extract_weights(site_model)
+
+            if mode == "weights":
+                payload = local_weights
+            else:
+                diff = {k: local_weights[k] - global_weights[k] for k in local_weights}
+                payload = compressors[i].compress(diff)
+            # Bytes of the DXO data sent to the server
+            message = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+            total_bytes += len(message)
+            received = pickle.loads(message)
+            updates.append(received if mode == "weights" else decompress(received, mode))
+
+        # FedAvg with equal site weights
+        for k in global_weights:
+            mean = np.mean([u[k] for u in updates], axis=0)
+            if mode == "weights":
+                global_weights[k] = mean.astype(global_weights[k].dtype)
+            else:
+                global_weights[k] = (global_weights[k] + mean).astype(global_weights[k].dtype)
+
+    apply_weights(global_model, global_weights)
+    bytes_per_round = total_bytes / args.rounds / len(train_sites)
+    return bytes_per_round, evaluate(global_model, val_sites)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate FedAvg rounds with full weights and compressed WEIGHT_DIFF updates."
+    )
+    parser.add_argument("--modes", nargs="+", default=["weights", "none", "fp16", "int8", "topk"])
+    parser.add_argument("--num_sites", type=int, default=3)
+    parser.add_argument("--num_cases", type=int, default=8)
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--local_steps", type=int, default=10)
+    parser.add_argument("--lr", type=float, default=1e-2)
+    parser.add_argument("--topk_ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    shifts = np.linspace(-0.5, 0.5, args.num_sites)
+    train_sites = [make_site(rng, args.num_cases, args.size, s) for s in shifts]
+    val_sites = [make_site(rng, args.num_cases // 2, args.size, s) for s in shifts]
+
+    print(f"{args.num_sites} sites, {args.rounds} rounds of {args.local_steps} local steps")
+    print(f"{'update':<10}{'KB/site/round':>16}{'ratio':>8}{'Dice':>8}")
+    baseline = None
+    for mode in args.modes:
+        bytes_per_round, dice = simulate(mode, args, train_sites, val_sites)
+        baseline = baseline or bytes_per_round
+        print(f"{mode:<10}{bytes_per_round / 1024:>16.1f}{baseline / bytes_per_round:>7.1f}x{dice:>8.3f}")
+
+if __name__ == "__main__":
+    main()
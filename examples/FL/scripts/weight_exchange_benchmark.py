@@ -0,0 +1,90 @@
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "client", "custom"))
+from c2fnas import C2FNAS  # noqa: E402
+from weight_exchange import apply_weights, extract_weights  # noqa: E402
+
+def legacy_extract(model):
+    # The previous LightningTrainer.extract_weights
+    return {k: v.cpu().numpy() for k, v in model.state_dict().items()}
+
+def legacy_apply(model, model_weights):
+    # The previous LightningTrainer.apply_weights
+    local_var_dict = model.state_dict()
+    for var_name in local_var_dict:
+        if var_name in model_weights:
+            local_var_dict[var_name] = torch.as_tensor(
+                np.reshape(model_weights[var_name], local_var_dict[var_name].shape)
+            )
+    model.load_state_dict(local_var_dict)
+
+def build_models(mednext_dir):
+    models = {"C2FNAS": lambda: C2FNAS(in_channels=1, num_classes=3, final_activation="none")}
+    if mednext_dir is not None:
+        sys.path.insert(0, os.path.abspath(mednext_dir))
+        from custom.mednext import mednext_base
+        models["mednext_base"] = lambda: mednext_base(
+            spatial_dims=3, in_channels=1, out_channels=3, kernel_size=3, filters=32, deep_supervision=True
+        )
+    return models
+
+def timeit(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per-tensor and bulk FL weight exchange, including a DXO-like pickle round trip."
+    )
+    parser.add_argument(
+        "--mednext_dir", default=os.path.join(ROOT, "..", "..", "mednext"),
+        help="Directory to import custom.mednext from, or an empty string to skip mednext_base."
+    )
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'model':<14}{'MB':>8}{'':>10}{'extract':>12}{'serialize':>12}{'apply':>12}")
+    for name, build in build_models(args.mednext_dir or None).items():
+        sender = build().to(args.device)
+        receiver = build().to(args.device)
+        size = sum(t.numel() * t.element_size() for t in sender.state_dict().values()) / 2**20
+
+        for method, extract, apply in [
+            ("per-tensor", legacy_extract, legacy_apply),
+            ("bulk", extract_weights, apply_weights)
+        ]:
+            t_extract, weights = timeit(lambda: extract(sender), args.repeats)
+            # NVFlare serializes the DXO data when sending the shareable
+            t_serialize, received = timeit(
+                lambda: pickle.loads(pickle.dumps(weights, protocol=pickle.HIGHEST_PROTOCOL)), args.repeats
+            )
+            t_apply, _ = timeit(lambda: apply(receiver, received), args.repeats)
+
+            for k, v in sender.state_dict().items():
+                if not torch.equal(v, receiver.state_dict()[k]):
+                    raise SystemExit(f"{method}: {k} differs after the round trip.")
+            print(
+                f"{name:<14}{size:>8.1f}{method:>10}{t_extract * 1e3:>9.1f} ms"
+                f"{t_serialize * 1e3:>9.1f} ms{t_apply * 1e3:>9.1f} ms"
+            )
+            # Start the next method from different weights
+            for p in receiver.parameters():
+                p.data.zero_()
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ import torch.nn.functional as F
 from torch.nn import Conv3d, Upsample, InstanceNorm3d
 from torch.nn import Sigmoid, Softmax
 
+MEMORY_FORMATS = {
+    "contiguous": torch.contiguous_format,
+    "channels_last_3d": torch.channels_last_3d
+}
+
 class ConvBlock(nn.Module):
     def __init__(self, inc, outc, kernel_size=3, mode="3d"):
         super(ConvBlock, self).__init__()
@@ -300,7 +305,8 @@ class C2FNAS(nn.Module):
         in_channels,
         num_classes,
         init_filters=32,
-        final_activation="softmax"
+        final_activation="softmax",
+        memory_format="contiguous"
     ):
         super(C2FNAS, self).__init__()
 
@@ -313,6 +319,13 @@ class C2FNAS(nn.Module):
             raise ValueError("Output classes must be 1 when using sigmoid")
         #endif
 
+        if memory_format not in MEMORY_FORMATS:
+            raise ValueError(
+                f"Unknown memory format {memory_format}, must be one of {list(MEMORY_FORMATS.keys())}"
+            )
+        #endif
+        self.memory_format = MEMORY_FORMATS[memory_format]
+
         filters = init_filters
 
         self.first_stem = FirstStem(in_channels, filters * 2)
@@ -369,6 +382,9 @@ class C2FNAS(nn.Module):
             )
             self.output = None
         #endif
+
+        # Run the convolutions in NDHWC layout if requested
+        self.to(memory_format=self.memory_format)
     #end
 
     def encoder(self, x):
@@ -423,6 +439,9 @@ class C2FNAS(nn.Module):
     #end
 
     def forward(self, x):
-        return self.model(x)
+        # Inputs (e.g. sliding window patches) are converted on entry and the
+        # output is returned in the default contiguous layout
+        x = x.contiguous(memory_format=self.memory_format)
+        return self.model(x).contiguous()
     #end
 #end
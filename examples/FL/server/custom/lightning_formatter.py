@@ -1,13 +1,118 @@
+import csv
+import json
+import os
 import traceback
-from nvflare.apis.dxo import DataKind, from_bytes
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from nvflare.apis.dxo import DXO, DataKind, from_bytes
+from nvflare.apis.fl_constant import FLContextKey
 from nvflare.apis.fl_context import FLContext
 from nvflare.app_common.abstract.formatter import Formatter
 from nvflare.app_common.app_constant import AppConstants
 
+class MetricTable:
+    """
+    Columnar table of the cross-site validation metrics, one row per
+    (site, model, metric). The names are interned, every column is a
+    compact array, and a value reported again for the same cell replaces
+    the previous one.
+    """
+    def __init__(self):
+        self.sites: List[str] = []
+        self.models: List[str] = []
+        self.metrics: List[str] = []
+        self._ids: Tuple[Dict[str, int], ...] = ({}, {}, {})
+
+        self.site_col = array("i")
+        self.model_col = array("i")
+        self.metric_col = array("i")
+        self.value_col = array("d")
+        self._rows: Dict[Tuple[int, int, int], int] = {}
+
+    def _intern(self, axis: int, name: str) -> int:
+        ids = self._ids[axis]
+        if name not in ids:
+            ids[name] = len(ids)
+            (self.sites, self.models, self.metrics)[axis].append(name)
+        return ids[name]
+
+    def __len__(self) -> int:
+        return len(self.value_col)
+
+    def add(self, site: str, model: str, metric: str, value: float) -> None:
+        key = (self._intern(0, site), self._intern(1, model), self._intern(2, metric))
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = len(self.value_col)
+            self.site_col.append(key[0])
+            self.model_col.append(key[1])
+            self.metric_col.append(key[2])
+            self.value_col.append(value)
+        else:
+            self.value_col[row] = value
+
+    def rows(self):
+        for s, m, k, v in zip(self.site_col, self.model_col, self.metric_col, self.value_col):
+            yield self.sites[s], self.models[m], self.metrics[k], v
+
+    def to_dict(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        result = {}
+        for site, model, metric, value in self.rows():
+            result.setdefault(site, {}).setdefault(model, {})[metric] = value
+        return result
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["site", "model", "metric", "value"])
+            writer.writerows(self.rows())
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def _to_float(value) -> Optional[float]:
+    # Metrics are floats or scalar tensors / arrays
+    try:
+        return float(value.item() if hasattr(value, "item") else value)
+    except (TypeError, ValueError, RuntimeError):
+        return None
+
 class LightningFormatter(Formatter):
-    def __init__(self) -> None:
+    """
+    Format the cross-site validation results.
+
+    Only the validation results not ingested by a previous call are read,
+    their metrics are added to a `MetricTable`. With `summary_dir`
+    (relative to the app root), the table is also written as
+    `<summary_name>.csv` (site, model, metric, value rows) and
+    `<summary_name>.json` ({site: {model: {metric: value}}}).
+    """
+    def __init__(
+        self,
+        summary_dir: Optional[str] = None,
+        summary_name: str = "cross_site_val"
+    ) -> None:
         super().__init__()
-        self.results = {}
+        self.summary_dir = summary_dir
+        self.summary_name = summary_name
+
+        self.table = MetricTable()
+        # Validation result files already ingested
+        self.ingested = set()
+
+    def ingest(self, data_client: str, model_name: str, dxo: DXO) -> int:
+        if dxo.data_kind != DataKind.METRICS:
+            return 0
+
+        count = 0
+        for metric, value in dxo.data.items():
+            value = _to_float(value)
+            if value is not None:
+                self.table.add(data_client, model_name, metric, value)
+                count += 1
+        return count
 
     def format(self, fl_ctx: FLContext) -> str:
         # Get validation result
@@ -16,30 +121,37 @@ class LightningFormatter(Formatter):
             {}
         )
 
-        result = {}
-
         try:
-            # Extract results from all clients
-            for data_client in validation_shareables_dict.keys():
-                validation_dict = validation_shareables_dict[data_client]
-                if validation_dict:
-                    res[data_client] = {}
-                    for model_name in validation_dict.keys():
-                        dxo_path = validation_dict[model_name]
-
-                        # Load the shareable
-                        with open(dxo_path, "rb") as f:
-                            metric_dxo = from_bytes(f.read())
-
-                        # Get metrics from shareable
-                        if metric_dxo and metric_dxo.data_kind == DataKind.METRICS:
-                            metrics = metric_dxo.data
-                            res[data_client][model_name] = metrics
-            # add any results
-            print(f"Updating results {res}")
-            self.results.update(res)
-            print(f"Updating results {self.results}")
+            # Extract the new results of all clients
+            for data_client, validation_dict in validation_shareables_dict.items():
+                for model_name, dxo_path in (validation_dict or {}).items():
+                    # A result file written again is read again
+                    key = (dxo_path, os.path.getmtime(dxo_path))
+                    if key in self.ingested:
+                        continue
+
+                    # Load the shareable
+                    with open(dxo_path, "rb") as f:
+                        metric_dxo = from_bytes(f.read())
+                    if metric_dxo:
+                        count = self.ingest(data_client, model_name, metric_dxo)
+                        self.log_debug(fl_ctx, f"Ingested {count} metrics of {model_name} on {data_client}")
+                    self.ingested.add(key)
+
+            if self.summary_dir is not None:
+                self.write_summary(fl_ctx)
         except Exception as e:
-            traceback.print_exc()
+            self.log_exception(fl_ctx, f"Exception in LightningFormatter: {str(e)}")
+            self.log_exception(fl_ctx, traceback.format_exc())
+
+        return repr(self.table.to_dict())
+
+    def write_summary(self, fl_ctx: FLContext) -> None:
+        app_root = fl_ctx.get_prop(FLContextKey.APP_ROOT) or ""
+        summary_dir = os.path.join(app_root, self.summary_dir)
+        os.makedirs(summary_dir, exist_ok=True)
 
-        return repr(result)
+        path = os.path.join(summary_dir, self.summary_name)
+        self.table.write_csv(path + ".csv")
+        self.table.write_json(path + ".json")
+        self.log_info(fl_ctx, f"Wrote {len(self.table)} cross-site metrics to {path}.csv/.json")
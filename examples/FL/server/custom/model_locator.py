@@ -3,7 +3,6 @@ import json
 import traceback
 from typing import List
 
-import torch
 from nvflare.apis.dxo import DXO, DataKind
 from nvflare.apis.fl_constant import FLContextKey
 from nvflare.apis.fl_context import FLContext
@@ -11,6 +10,8 @@ from nvflare.app_common.abstract.model_locator import ModelLocator
 from nvflare.app_common.pt.pt_fed_utils import PTModelPersistenceFormatManager
 from nvflare.app_common.app_constant import DefaultCheckpointFileName
 
+from checkpoint_reader import load_checkpoint_entries
+
 class LightningModelLocator(ModelLocator):
     SERVER_MODEL_NAME = "server"
     SERVER_BEST_MODEL_NAME = "server_best"
@@ -54,10 +55,10 @@ class LightningModelLocator(ModelLocator):
                     model_path, self.model_file_name
                 )
 
-            # Load checkpoint
+            # Load checkpoint, only the model weights are read
             model_data = None
             try:
-                checkpoint = torch.load(model_load_path, map_location="cpu")
+                checkpoint = load_checkpoint_entries(model_load_path, keys=("model",))
                 model_data = checkpoint["model"]
             except:
                 self.log_error(fl_ctx, traceback.format_exc())
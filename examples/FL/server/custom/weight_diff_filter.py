@@ -0,0 +1,31 @@
+from nvflare.apis.dxo import DataKind, from_shareable
+from nvflare.apis.filter import Filter
+from nvflare.apis.fl_context import FLContext
+from nvflare.apis.shareable import Shareable
+
+from weight_compression import COMPRESSION_KEY, decompress
+
+class DecompressWeightDiff(Filter):
+    """
+    Task result filter reconstructing the float32 weight differences of the
+    compressed WEIGHT_DIFF updates sent by `LightningTrainer`, so the
+    aggregator and the shareable generator get plain weight differences.
+    Other results pass through unchanged.
+    """
+    def process(self, shareable: Shareable, fl_ctx: FLContext) -> Shareable:
+        try:
+            dxo = from_shareable(shareable)
+        except ValueError:
+            # Error replies without a DXO
+            return shareable
+        if dxo.data_kind != DataKind.WEIGHT_DIFF:
+            return shareable
+
+        compression = dxo.get_meta_prop(COMPRESSION_KEY)
+        if compression in (None, "none"):
+            return shareable
+
+        dxo.data = decompress(dxo.data, compression)
+        dxo.remove_meta_props([COMPRESSION_KEY])
+        self.log_debug(fl_ctx, f"Reconstructed {len(dxo.data)} variables from {compression} update")
+        return dxo.update_shareable(shareable)
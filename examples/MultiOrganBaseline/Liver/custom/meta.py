@@ -1,7 +1,9 @@
-from typing import List
+from typing import List, Mapping, Optional, Sequence
 
 import torch
+from monai.data.meta_obj import MetaObj
 from monai.data.meta_tensor import MetaTensor
+from monai.data.utils import list_data_collate
 from monai.transforms import MapTransform
 
 def _ensure_list(data):
@@ -10,6 +12,95 @@ def _ensure_list(data):
     else:
         return [data]
 
+class MetaSidecar(dict):
+    """
+    Snapshot of the metadata of a MetaTensor kept next to it in the data dict.
+
+    Only the dict is new, the values (affine tensors, headers, filenames) are
+    shared by reference with the source metadata and never copied. Writes to
+    either side only rebind keys of their own dict, so the snapshot behaves
+    copy-on-write with respect to the MetaTensor it was taken from.
+    """
+
+    def attach(self, data: torch.Tensor) -> MetaTensor:
+        """
+        Return a MetaTensor sharing the data of `data` with a shallow copy of
+        the snapshot as metadata. `data` itself is left untouched.
+        """
+        # `as_subclass` returns a new tensor sharing the storage, and the
+        # MetaObj defaults are set directly, the MetaTensor constructor would
+        # deep copy them
+        out = data.as_subclass(MetaTensor)
+        MetaObj.__init__(out)
+        out.meta = dict(self)
+
+        affine = self.get("affine")
+        if affine is not None and (
+            not isinstance(affine, torch.Tensor) or tuple(affine.shape) != (4, 4)
+        ):
+            # The MetaObj defaults assume a 3D tensor affine, the setter
+            # converts the affine and updates the attributes derived from it
+            out.affine = affine
+        return out
+
+class MetaSidecarBatch(list):
+    """
+    Collated MetaSidecars of a batch, kept as a plain list of Python objects
+    instead of being turned into batched tensors by the default collate.
+
+    `monai.data.decollate_batch` returns `item()` for 0-dim objects without
+    recursing into them, so the batch decollates back into the original
+    sidecars, one per sample. `to` is a no-op, so moving the batch to a
+    device leaves the metadata on the CPU.
+    """
+    ndim = 0
+
+    def item(self) -> List[MetaSidecar]:
+        return list(self)
+
+    def to(self, *args, **kwargs) -> "MetaSidecarBatch":
+        return self
+
+class MetaSidecarCollate:
+    """
+    Collate function for DataLoaders of pipelines using `SaveMeta`, e.g. as
+    the `collate_fn` of the dataloader in the config.
+
+    The sidecars are collated into a `MetaSidecarBatch` instead of batched
+    tensors, and the MetaTensors of `strip_keys` are collated as plain
+    tensors, so their metadata is not collated either. The rest of the items
+    is collated with `list_data_collate`. The batch must be decollated
+    before `RestoreMeta`. Only strip the keys whose metadata is saved by
+    `SaveMeta` and not needed before `RestoreMeta`, e.g. for inverting
+    transforms.
+
+    Args:
+        strip_keys: keys of the MetaTensors to collate without metadata.
+    """
+    def __init__(self, strip_keys: Optional[Sequence[str]] = None):
+        self.strip_keys = list(strip_keys or [])
+
+    def __call__(self, batch):
+        # Flatten the lists of samples of a transform like list_data_collate
+        items = [i for item in batch for i in (item if isinstance(item, list) else [item])]
+        if not items or not isinstance(items[0], Mapping):
+            return list_data_collate(items)
+
+        items = [dict(item) for item in items]
+        keys = [key for key, value in items[0].items() if isinstance(value, MetaSidecar)]
+        sidecars = {key: [item.pop(key, None) for item in items] for key in keys}
+        for item in items:
+            for key in self.strip_keys:
+                if isinstance(item.get(key), MetaTensor):
+                    item[key] = item[key].as_tensor()
+
+        out = list_data_collate(items)
+        for key, values in sidecars.items():
+            if not all(isinstance(v, MetaSidecar) for v in values):
+                raise ValueError(f"{key} should be a MetaSidecar in every item of the batch.")
+            out[key] = MetaSidecarBatch(values)
+        return out
+
 class SaveMeta(MapTransform):
     def __init__(self, keys, meta_keys):
         super().__init__(keys)
@@ -18,8 +109,7 @@ class SaveMeta(MapTransform):
     def __call__(self, data):
         d = dict(data)
         for key, meta_key in zip(self.keys, self.meta_keys):
-            meta = d[key].meta
-            d[meta_key] = dict(meta)
+            d[meta_key] = MetaSidecar(d[key].meta)
         return d
 
 class RestoreMeta(MapTransform):
@@ -30,6 +120,10 @@ class RestoreMeta(MapTransform):
     def __call__(self, data):
         d = dict(data)
         for key, meta_key in zip(self.keys, self.meta_keys):
-            d[key] = MetaTensor(d[key], meta=d[meta_key])
+            meta = d[meta_key]
+            if isinstance(meta, MetaSidecarBatch):
+                raise ValueError(f"{meta_key} is a batch of sidecars, decollate the batch before RestoreMeta.")
+            if not isinstance(meta, MetaSidecar):
+                meta = MetaSidecar(meta)
+            d[key] = meta.attach(d[key])
         return d
-
@@ -0,0 +1,116 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Deque, List, Optional
+
+import torch
+
+__all__ = ["AsyncPostProcessor"]
+
+_worker_transform: Optional[Callable] = None
+
+def _init_worker(transform: Callable) -> None:
+    global _worker_transform
+    _worker_transform = transform
+
+def _run_worker(item: Any) -> Any:
+    with torch.no_grad():
+        return _worker_transform(item)
+
+def _to_cpu(item: Any) -> Any:
+    if isinstance(item, torch.Tensor):
+        return item.detach().cpu()
+    if isinstance(item, dict):
+        return {k: _to_cpu(v) for k, v in item.items()}
+    if type(item) in (list, tuple):
+        return type(item)(_to_cpu(v) for v in item)
+    return item
+
+def _run(transform: Callable, item: Any, inference: bool) -> Any:
+    # Grad and inference modes are thread local, use the ones of the caller
+    with torch.inference_mode(inference), torch.no_grad():
+        return transform(item)
+
+class AsyncPostProcessor:
+    """
+    Apply a transform to the submitted items on a bounded worker pool, so the
+    caller can run the next forward pass while the previous outputs are post
+    processed. The results are always returned in submission order.
+
+    Args:
+        transform: callable applied to every item, e.g. the validation post
+            transforms.
+        num_workers: number of worker threads or processes.
+        max_pending: maximum number of items in flight, `submit` waits for
+            the oldest ones beyond it. Defaults to twice `num_workers`.
+        executor: "thread" or "process". Threads share the tensors with the
+            caller, processes get a CPU copy of every item.
+    """
+    def __init__(
+        self,
+        transform: Callable,
+        num_workers: int = 2,
+        max_pending: Optional[int] = None,
+        executor: str = "thread"
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor: {executor}, available options are ['thread', 'process'].")
+        self.transform = transform
+        self.executor = executor
+        self.max_pending = max_pending or 2 * num_workers
+
+        if executor == "thread":
+            self.pool = ThreadPoolExecutor(num_workers, thread_name_prefix="post")
+        else:
+            # Forked workers would inherit the CUDA context of the caller
+            self.pool = ProcessPoolExecutor(
+                num_workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(transform,)
+            )
+        self.pending: Deque[Future] = deque()
+
+    def submit(self, item: Any) -> List[Any]:
+        """
+        Submit an item and return the results that are ready, in order.
+        """
+        if self.executor == "thread":
+            future = self.pool.submit(_run, self.transform, item, torch.is_inference_mode_enabled())
+        else:
+            future = self.pool.submit(_run_worker, _to_cpu(item))
+        self.pending.append(future)
+
+        ready = []
+        while len(self.pending) > self.max_pending:
+            ready.append(self.pending.popleft().result())
+        while self.pending and self.pending[0].done():
+            ready.append(self.pending.popleft().result())
+        return ready
+
+    def drain(self) -> List[Any]:
+        """
+        Wait for all the submitted items and return their results, in order.
+        """
+        ready = []
+        while self.pending:
+            ready.append(self.pending.popleft().result())
+        return ready
+
+    def shutdown(self) -> List[Any]:
+        """
+        Drain the pending items and stop the workers. The workers are stopped
+        even if an item failed.
+        """
+        try:
+            return self.drain()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Cancel the pending items that did not start and stop the workers,
+        without waiting for the results, e.g. after an error.
+        """
+        self.pending.clear()
+        self.pool.shutdown(wait=True, cancel_futures=True)
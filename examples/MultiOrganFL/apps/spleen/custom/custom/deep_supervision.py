@@ -1,10 +1,13 @@
-from copy import deepcopy
 from typing import Dict, Iterable
 
 import torch
 import torch.nn.functional as F
 from manafaln.workflow import SupervisedLearning
 
+from custom.async_post import AsyncPostProcessor
+from custom.ds_loss import DeepSupervisionDiceCELoss
+from custom.memory import read_rss_mb, reset_peak_rss
+
 def ensure_length(x, length):
     if len(x) < length:
         x = x + [0.0] * (length - len(x))
@@ -17,9 +20,18 @@ class DeepSupervision(SupervisedLearning):
         super().__init__(config)
 
         self.ds_weights = config["settings"].get("ds_weights", None)
+        # Log the RSS before and the peak RSS during every validation step
+        self.profile_memory = config["settings"].get("profile_memory", False)
+        # Arguments of AsyncPostProcessor to post process the validation
+        # outputs while the next batch runs, e.g. {num_workers: 2}
+        self.async_post = config["settings"].get("async_post", None)
+        self.post_pool = None
 
     def model_infer(self, x: torch.Tensor) -> torch.Tensor:
         y = self.model(x)
+        if isinstance(y, (list, tuple)):
+            # Heads at their native resolution, the first one is full size
+            return y[0]
         if y.dim() > x.dim():
             return y[:, 0, ::]
         else:
@@ -35,7 +47,21 @@ class DeepSupervision(SupervisedLearning):
         outputs = self.model(image)
 
         loss = 0.0
-        if outputs.dim() > image.dim():
+        if isinstance(outputs, (list, tuple)):
+            # Heads at their native resolution, e.g. MedNeXt with
+            # ds_native_resolution, the loss downsamples the label per head
+            batch["preds"] = outputs[0]
+
+            if isinstance(self.loss_fn, DeepSupervisionDiceCELoss):
+                if self.ds_weights is None:
+                    weights = [1.0] * len(outputs)
+                else:
+                    weights = ensure_length(self.ds_weights, len(outputs))
+                loss = self.loss_fn(outputs, label, weights=weights)
+            else:
+                # e.g. MultiScaleDeepSupervisionLoss, weighted by the loss
+                loss = self.loss_fn(list(outputs), label)
+        elif outputs.dim() > image.dim():
             batch["preds"] = outputs[:, 0, ::]
 
             num_outputs = outputs.shape[1]
@@ -44,8 +70,12 @@ class DeepSupervision(SupervisedLearning):
             else:
                 weights = ensure_length(self.ds_weights, num_outputs)
 
-            for i, w in enumerate(weights):
-                loss += w * self.loss_fn(outputs[:, i, ::], label)
+            if isinstance(self.loss_fn, DeepSupervisionDiceCELoss):
+                # All the heads in one call, the label is prepared only once
+                loss = self.loss_fn(outputs, label, weights=weights)
+            else:
+                for i, w in enumerate(weights):
+                    loss += w * self.loss_fn(outputs[:, i, ::], label)
         else:
             batch["preds"] = outputs
             loss += self.loss_fn(outputs, label)
@@ -69,34 +99,114 @@ class DeepSupervision(SupervisedLearning):
         return loss
 
     def validation_step(self, batch, batch_idx):
-        batch = deepcopy(batch)
-
-        image = batch["image"]
-        label = batch["label"]
+        try:
+            return self.run_validation_step(batch, batch_idx)
+        except BaseException:
+            # Do not leak the post transform workers and the pending items
+            self.close_post_pool()
+            raise
+
+    def run_validation_step(self, batch, batch_idx):
+        if self.profile_memory:
+            rss_before = read_rss_mb()
+            reset_peak_rss()
+
+        # The inputs are only read, predictions and post transform outputs
+        # go to a shallow copy instead of a deep copy of the whole batch
+        outputs = dict(batch)
 
         # Run inference
-        batch["preds"] = self.forward(image)
+        outputs["preds"] = self.forward(batch["image"])
 
         # Post transform & compute metrics
         metrics = []
-        if self.valid_decollate is not None:
-            for item in self.valid_decollate(batch):
+        if self.async_post:
+            metrics = self.post_process_async(outputs, batch_idx)
+        elif self.valid_decollate is not None:
+            for item in self.valid_decollate(outputs):
                 # Apply post transforms first
                 item = self.post_transforms["validation"](item)
                 # Calculate iteration metrics
-                m = self.valid_metrics.apply(item)
-                # Save meta data and results
-                m["image_meta_dict"] = item.get("image_meta_dict", {})
-                m["label_meta_dict"] = item.get("label_meta_dict", {})
-                metrics.append(m)
+                metrics.append(self.apply_valid_metrics(item))
         else:
-            batch = self.post_transforms["validation"](batch)
-            m = self.valid_metrics.apply(batch)
-            # m["preds"] = batch["preds"]
-            m["image_meta_dict"] = batch.get("image_meta_dict")
-            m["label_meta_dict"] = batch.get("label_meta_dict")
+            outputs = self.post_transforms["validation"](outputs)
+            m = self.valid_metrics.apply(outputs)
+            # m["preds"] = outputs["preds"]
+            m["image_meta_dict"] = outputs.get("image_meta_dict")
+            m["label_meta_dict"] = outputs.get("label_meta_dict")
             metrics.append(m)
 
+        if self.profile_memory:
+            rss = {"val_rss_before_mb": rss_before, "val_peak_rss_mb": read_rss_mb("VmHWM")}
+            self.log_dict(
+                {k: v for k, v in rss.items() if v is not None},
+                on_step=True,
+                on_epoch=False,
+                batch_size=batch["image"].shape[0]
+            )
+
         # Output metrics and meta data of this batch
         return metrics
 
+    def apply_valid_metrics(self, item):
+        # Calculate iteration metrics of a post transformed item
+        m = self.valid_metrics.apply(item)
+        # Save meta data and results
+        m["image_meta_dict"] = item.get("image_meta_dict", {})
+        m["label_meta_dict"] = item.get("label_meta_dict", {})
+        return m
+
+    def post_process_async(self, outputs, batch_idx):
+        """
+        Hand the outputs to the post transform pool and apply the metrics to
+        the items that are done, in submission order. The last validation
+        step waits for all the pending items, so every metric is applied
+        before the end of the epoch.
+        """
+        if self.post_pool is None:
+            kwargs = self.async_post if isinstance(self.async_post, dict) else {}
+            self.post_pool = AsyncPostProcessor(self.post_transforms["validation"], **kwargs)
+
+        if self.valid_decollate is not None:
+            items = self.valid_decollate(outputs)
+        else:
+            items = [outputs]
+
+        ready = []
+        for item in items:
+            ready.extend(self.post_pool.submit(item))
+        if self.is_last_val_batch(batch_idx):
+            post_pool, self.post_pool = self.post_pool, None
+            ready.extend(post_pool.shutdown())
+        return [self.apply_valid_metrics(item) for item in ready]
+
+    def is_last_val_batch(self, batch_idx) -> bool:
+        if self.trainer.sanity_checking:
+            num_batches = self.trainer.num_sanity_val_batches
+        else:
+            num_batches = self.trainer.num_val_batches
+        if isinstance(num_batches, (list, tuple)):
+            num_batches = num_batches[0]
+        return batch_idx + 1 >= num_batches
+
+    def close_post_pool(self):
+        if self.post_pool is not None:
+            self.post_pool.close()
+            self.post_pool = None
+
+    def on_validation_epoch_start(self):
+        # Pool left by a validation that failed outside of validation_step
+        self.close_post_pool()
+        super().on_validation_epoch_start()
+
+    def on_validation_epoch_end(self):
+        # Fallback if the number of validation batches is unknown
+        if self.post_pool is not None:
+            post_pool, self.post_pool = self.post_pool, None
+            for item in post_pool.shutdown():
+                self.apply_valid_metrics(item)
+        super().on_validation_epoch_end()
+
+    def teardown(self, stage):
+        self.close_post_pool()
+        super().teardown(stage)
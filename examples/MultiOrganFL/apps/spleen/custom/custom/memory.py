@@ -0,0 +1,29 @@
+import resource
+from typing import Optional
+
+__all__ = ["read_rss_mb", "reset_peak_rss"]
+
+def read_rss_mb(key: str = "VmRSS") -> Optional[float]:
+    """
+    Return the current ("VmRSS") or peak ("VmHWM") resident set size of this
+    process in MB, falling back to the lifetime peak from getrusage.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if key == "VmHWM":
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+def reset_peak_rss() -> bool:
+    # Linux only, resets VmHWM to the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
@@ -2,6 +2,8 @@ import torch
 from typing import Callable, Optional
 from monai.losses import DeepSupervisionLoss, DiceCELoss
 
+from custom.ds_loss import DeepSupervisionDiceCELoss
+
 def DsDiceCELoss(
     include_background: bool = True,
     to_onehot_y: bool = False,
@@ -18,6 +20,24 @@ def DsDiceCELoss(
     lambda_dice: float = 1.0,
     lambda_ce: float = 1.0
 ):
+    if other_act is None:
+        # All the heads in one fused call, the label is prepared once per scale
+        return DeepSupervisionDiceCELoss(
+            include_background=include_background,
+            to_onehot_y=to_onehot_y,
+            sigmoid=sigmoid,
+            softmax=softmax,
+            squared_pred=squared_pred,
+            jaccard=jaccard,
+            reduction=reduction,
+            smooth_nr=smooth_nr,
+            smooth_dr=smooth_dr,
+            batch=batch,
+            ce_weight=ce_weight,
+            lambda_dice=lambda_dice,
+            lambda_ce=lambda_ce
+        )
+
     dice = DiceCELoss(
         include_background=include_background,
         to_onehot_y=to_onehot_y,
@@ -0,0 +1,161 @@
+from typing import List, Optional, Sequence, Union
+
+import torch
+import torch.distributed as dist
+from monai.metrics.utils import do_metric_reduction
+
+__all__ = ["ConfusionMatrixMetric"]
+
+class ConfusionMatrixMetric:
+    """
+    Dice or IoU of integer label maps from per-case confusion matrices.
+
+    All the class overlaps of a batch are counted with a single `bincount`
+    over the (case, label, prediction) triplets, so the predictions and the
+    labels are neither expanded to one-hot nor split per class. Only the
+    per-class true positives, false positives and false negatives of every
+    case are kept, and the scores are reduced like MONAI `DiceMetric` /
+    `MeanIoU` with `ignore_empty=True`: classes missing from the label of a
+    case are excluded from the mean.
+
+    The inputs are label maps of shape (1, *spatial) for a decollated case or
+    (B, 1, *spatial) for a batch. Inputs with more channels, e.g. logits or
+    one-hot, are converted with an argmax over the channels.
+
+    Args:
+        num_classes: number of classes including the background.
+        metric: "dice" or "iou".
+        include_background: include class 0 in the mean and the outputs.
+        spatial_dims: number of spatial dimensions of the inputs.
+        per_class: return [mean, class 1, class 2, ...] instead of the mean,
+            e.g. for a list of log labels
+            `[val_meandice, val_meandice_pancreas, val_meandice_pancreas_tumor]`.
+        ignore_index: label value whose voxels are not counted, e.g. 255.
+            Other labels or predictions outside [0, num_classes) raise a
+            ValueError.
+    """
+    def __init__(
+        self,
+        num_classes: int,
+        metric: str = "dice",
+        include_background: bool = False,
+        spatial_dims: int = 3,
+        per_class: bool = False,
+        ignore_index: Optional[int] = None
+    ):
+        if metric not in ("dice", "iou"):
+            raise ValueError(f"Unsupported metric: {metric}, available options are ['dice', 'iou'].")
+        self.num_classes = num_classes
+        self.metric = metric
+        self.include_background = include_background
+        self.spatial_dims = spatial_dims
+        self.per_class = per_class
+        self.ignore_index = ignore_index
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer: List[torch.Tensor] = []
+
+    def _as_labels(self, x: torch.Tensor) -> torch.Tensor:
+        x = torch.as_tensor(x)
+        if x.ndim == self.spatial_dims + 1:
+            # A single decollated case
+            x = x.unsqueeze(0)
+        if x.shape[1] > 1:
+            x = x.argmax(dim=1, keepdim=True)
+        return x.flatten(1).long()
+
+    def confusion_matrix(self, y_pred: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+        """
+        Return the confusion matrices of shape (B, label, prediction).
+        """
+        y_pred = self._as_labels(y_pred)
+        y = self._as_labels(y).to(y_pred.device)
+        if y_pred.shape != y.shape:
+            raise ValueError(f"y_pred and y should have the same shape, got {y_pred.shape} and {y.shape}.")
+
+        n = self.num_classes
+        # Out of range values would be counted in the bins of other classes
+        # and other cases
+        valid = None if self.ignore_index is None else y != self.ignore_index
+        invalid = (y < 0) | (y >= n) | (y_pred < 0) | (y_pred >= n)
+        if valid is not None:
+            invalid &= valid
+        if invalid.any():
+            raise ValueError(
+                f"Labels and predictions should be in [0, {n}), got values in "
+                f"[{min(y.min().item(), y_pred.min().item())}, {max(y.max().item(), y_pred.max().item())}]."
+            )
+
+        batch = torch.arange(y.shape[0], device=y.device).unsqueeze(1)
+        index = (batch * n + y) * n + y_pred
+        if valid is not None:
+            index = index[valid]
+        counts = torch.bincount(index.flatten(), minlength=y.shape[0] * n * n)
+        return counts[:y.shape[0] * n * n].view(-1, n, n)
+
+    def __call__(
+        self,
+        y_pred: torch.Tensor,
+        y: torch.Tensor
+    ) -> Union[torch.Tensor, List[torch.Tensor]]:
+        """
+        Accumulate the batch and return its scores of shape (B, C), or with
+        `per_class` its [mean, class 1, class 2, ...] like `aggregate`.
+        """
+        cm = self.confusion_matrix(y_pred, y)
+        tp = cm.diagonal(dim1=1, dim2=2)
+        # Label counts are the rows, prediction counts are the columns
+        stats = torch.stack([tp, cm.sum(dim=1) - tp, cm.sum(dim=2) - tp], dim=1)
+        self._buffer.append(stats.cpu())
+        scores = self._scores(stats)
+        if self.per_class:
+            return self._reduce(scores)
+        return scores
+
+    update = __call__
+
+    def _scores(self, stats: torch.Tensor) -> torch.Tensor:
+        tp, fp, fn = stats.double().unbind(dim=1)
+        if self.metric == "dice":
+            scores = 2 * tp / (2 * tp + fp + fn)
+        else:
+            scores = tp / (tp + fp + fn)
+        # Ignore the classes missing from the label
+        scores = torch.where(tp + fn > 0, scores, torch.full_like(scores, float("nan")))
+        if not self.include_background:
+            scores = scores[:, 1:]
+        return scores.float()
+
+    def aggregate(self) -> Union[torch.Tensor, List[torch.Tensor]]:
+        if self._buffer:
+            stats = torch.cat(self._buffer)
+        else:
+            stats = torch.zeros(0, 3, self.num_classes, dtype=torch.long)
+        stats = self._gather(stats)
+        return self._reduce(self._scores(stats))
+
+    compute = aggregate
+
+    def _reduce(self, scores: torch.Tensor) -> Union[torch.Tensor, List[torch.Tensor]]:
+        mean, _ = do_metric_reduction(scores.clone(), "mean")
+        if not self.per_class:
+            return mean
+        per_class, _ = do_metric_reduction(scores.clone(), "mean_batch")
+        return [mean, *per_class.unbind()]
+
+    def _gather(self, stats: torch.Tensor) -> torch.Tensor:
+        # Collect the cases of all the ranks, every rank may have a different number
+        if not (dist.is_available() and dist.is_initialized()) or dist.get_world_size() == 1:
+            return stats
+        device = torch.device("cuda", torch.cuda.current_device()) \
+            if dist.get_backend() == "nccl" else torch.device("cpu")
+        stats = stats.to(device)
+        sizes = [torch.zeros(1, dtype=torch.long, device=device) for _ in range(dist.get_world_size())]
+        dist.all_gather(sizes, torch.tensor([stats.shape[0]], device=device))
+        max_size = int(max(s.item() for s in sizes))
+        padded = torch.zeros(max_size, *stats.shape[1:], dtype=stats.dtype, device=device)
+        padded[:stats.shape[0]] = stats
+        gathered = [torch.zeros_like(padded) for _ in sizes]
+        dist.all_gather(gathered, padded)
+        return torch.cat([g[:int(s.item())] for g, s in zip(gathered, sizes)]).cpu()
@@ -1,5 +1,7 @@
 import os
-from typing import Dict, Optional
+import time
+import weakref
+from typing import Dict, Optional, Sequence
 
 import numpy as np
 from monai.config.type_definitions import KeysCollection, PathLike
@@ -7,9 +9,38 @@ from monai.data.csv_saver import CSVSaver
 from monai.transforms import MapTransform
 from monai.utils import ImageMetaKey as Key
 from monai.utils import PostFix, ensure_tuple_rep
+from pytorch_lightning import Callback
 
 DEFAULT_POST_FIX = PostFix.meta()
 
+_POWERS_OF_10 = 10 ** np.arange(1, 19, dtype=np.int64)
+
+
+def _format_ints(values: np.ndarray) -> str:
+    """
+    Formats non-negative integers as a space separated string, e.g.
+    [0, 12, 345] -> "0 12 345", by writing the ASCII digits of all the
+    values into one byte buffer instead of converting them one by one.
+    """
+    if values.size == 0:
+        return ""
+    values = values.astype(np.int64)
+    num_digits = np.searchsorted(_POWERS_OF_10, values, side="right") + 1
+
+    # Each value is followed by a space, the last one is dropped at the end.
+    ends = np.cumsum(num_digits + 1) - 1
+    buffer = np.full(ends[-1] + 1, ord(" "), dtype=np.uint8)
+
+    # Fill the digits from the least significant one.
+    position = ends - 1
+    for k in range(int(num_digits.max())):
+        valid = num_digits > k
+        buffer[position[valid]] = values[valid] % 10 + ord("0")
+        values //= 10
+        position -= 1
+
+    return buffer[:-1].tobytes().decode("ascii")
+
 
 class RLECSVSaver(CSVSaver):
     """
@@ -49,17 +80,19 @@ class RLECSVSaver(CSVSaver):
         """
         This overwrites `CSVSaver.finalize` to
         1. Write string data to csv, instead of assumimg data to be np.ndarray
+        2. Write all the cached rows with the file opened only once
 
         Writes the cached dict to a csv
         """
+        if not self._cache_dict:
+            return
         if not self.output_dir.exists():
             self.output_dir.mkdir(parents=True, exist_ok=True)
         with open(self._filepath, "a") as f:
-            for k, v in self._cache_dict.items():
-                f.write(k)
-                # Write string data to csv, instead of assumimg data to be np.ndarray
-                f.write(self.delimiter + str(v))
-                f.write("\n")
+            # Write string data to csv, instead of assumimg data to be np.ndarray
+            f.writelines(
+                f"{k}{self.delimiter}{v}\n" for k, v in self._cache_dict.items()
+            )
         # clear cache content after writing
         self.reset_cache()
 
@@ -87,8 +120,14 @@ class SaveRunLengthEncodingd(MapTransform):
         filename (str): Name of the CSV file. Defaults to "predictions.csv".
         delimiter (str): The delimiter character in the saved file, as the default output type is `csv`.
             to be consistent with: https://docs.python.org/3/library/csv.html#csv.Dialect.delimiter. Defaults to ",".
-        flush (bool): Indicate whether to write the cache data to CSV file immediately in this transform and
-            clear the cache. If True, flushes the CSV writer after each write operation. Defaults to True.
+        flush (bool): Indicate whether to write the cache data to CSV file in this transform and clear the
+            cache. If True, the cached rows are written once `flush_rows` rows are cached or `flush_interval`
+            seconds have passed since the last write. Remaining rows are written by `close`, e.g. from the
+            `FlushRunLengthEncoding` callback at the end of prediction, and as a last resort when the
+            transform is garbage collected or the interpreter exits. Defaults to True.
+        flush_rows (int): Number of cached rows that triggers a write, 1 writes after every sample.
+            Defaults to 256.
+        flush_interval (float): Seconds since the last write that triggers a write. Defaults to 30.0.
         allow_missing_keys (bool): If True, don't raise exception if key is missing. Defaults to False.
 
     Raises:
@@ -106,6 +145,8 @@ class SaveRunLengthEncodingd(MapTransform):
         filename: str = "predictions.csv",
         delimiter: str = ",",
         flush: bool = True,
+        flush_rows: int = 256,
+        flush_interval: float = 30.0,
         allow_missing_keys: bool = False,
     ):
         super().__init__(keys, allow_missing_keys)
@@ -120,12 +161,18 @@ class SaveRunLengthEncodingd(MapTransform):
             delimiter=delimiter,
         )
         self.flush = flush
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
         self.meta_keys = ensure_tuple_rep(meta_keys, len(self.keys))
         self.meta_key_postfix = ensure_tuple_rep(meta_key_postfix, len(self.keys))
 
         # Write the header
         self.saver._cache_dict[id_column] = data_column
         self.saver.finalize()
+        self._last_flush = time.monotonic()
+
+        # Last resort for the rows left in the buffer if `close` is not called
+        weakref.finalize(self, self.saver.finalize)
 
     @staticmethod
     def encode_run_length(mask: np.ndarray) -> str:
@@ -151,23 +198,57 @@ class SaveRunLengthEncodingd(MapTransform):
         "0 1 3 4 9 1"
         """
 
-        # Flatten the mask and append a 0 to the end to handle the case where the last pixel is 1.
-        flat_mask = np.concatenate([[0], mask.flatten(), [0]])
+        # Pad the flattened mask with 0 on both sides to handle runs touching the borders.
+        flat_mask = np.asarray(mask).ravel()
+        padded = np.zeros(flat_mask.size + 2, dtype=bool)
+        padded[1:-1] = flat_mask != 0
 
         # Calculate the indices where the mask transitions from 0 to 1 or 1 to 0.
-        transitions = np.nonzero(flat_mask[:-1] != flat_mask[1:])[0]
+        transitions = np.flatnonzero(padded[:-1] != padded[1:])
 
-        # Pair the transition indices together to get the start and end of each run.
-        run_starts = transitions[::2]
-        run_lengths = transitions[1::2] - transitions[::2]
+        # Turn the (start, end) pairs into (start, length) pairs in place.
+        runs = transitions.reshape(-1, 2)
+        runs[:, 1] -= runs[:, 0]
 
-        # Concat the result into a string with format "s1 l1 s2 l2 s3 l3 ..."
-        res = ""
-        for run_start, run_length in zip(run_starts, run_lengths):
-            res += str(run_start) + " " + str(run_length) + " "
-        res = res[:-1]
+        # Format all the runs at once with format "s1 l1 s2 l2 s3 l3 ..."
+        return _format_ints(runs.ravel())
+
+    @staticmethod
+    def decode_run_length(rle: str, shape: Sequence[int]) -> np.ndarray:
+        """
+        Decodes a run-length encoding (RLE) string back to a binary mask.
+
+        Args:
+            rle (str): A string with format "s1 l1 s2 l2 s3 l3 ...", as returned by `encode_run_length`.
+            shape (Sequence[int]): Shape of the mask, e.g. (W, H) or (1, W, H).
+
+        Returns:
+            np.ndarray: A uint8 binary mask with the given shape.
+        """
+        size = int(np.prod(shape))
+        runs = np.array(rle.split(), dtype=np.int64).reshape(-1, 2)
 
-        return res
+        # Mark +1 at the start and -1 at the end of each run, the cumulative
+        # sum is then positive exactly inside the runs.
+        delta = np.zeros(size + 1, dtype=np.int32)
+        np.add.at(delta, runs[:, 0], 1)
+        np.add.at(delta, runs[:, 0] + runs[:, 1], -1)
+        mask = np.cumsum(delta[:-1]) > 0
+
+        return mask.astype(np.uint8).reshape(shape)
+
+    def _should_flush(self) -> bool:
+        return (
+            len(self.saver._cache_dict) >= self.flush_rows
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def close(self) -> None:
+        """
+        Write the rows left in the buffer to the CSV file.
+        """
+        self.saver.finalize()
+        self._last_flush = time.monotonic()
 
     def __call__(self, data):
         d = dict(data)
@@ -179,11 +260,42 @@ class SaveRunLengthEncodingd(MapTransform):
             meta_data = d[meta_key] if meta_key is not None else None
             rle = self.encode_run_length(d[key])
             self.saver.save(data=rle, meta_data=meta_data)
-            if self.flush:
-                self.saver.finalize()
+            if self.flush and self._should_flush():
+                self.close()
         return d
 
 
+def _iter_transforms(transform):
+    # The transforms of (nested) Compose
+    yield transform
+    for t in getattr(transform, "transforms", None) or []:
+        yield from _iter_transforms(t)
+
+
+class FlushRunLengthEncoding(Callback):
+    """
+    Write the rows buffered by the `SaveRunLengthEncodingd` post transforms of
+    the workflow when prediction ends or fails, so the CSV file is complete
+    as soon as `trainer.predict` returns.
+    """
+
+    def close(self, pl_module) -> None:
+        post_transforms = getattr(pl_module, "post_transforms", None) or {}
+        if "predict" not in post_transforms:
+            return
+        for transform in _iter_transforms(post_transforms["predict"]):
+            if isinstance(transform, SaveRunLengthEncodingd):
+                transform.close()
+
+    def on_predict_end(self, trainer, pl_module) -> None:
+        self.close(pl_module)
+
+    def on_exception(self, trainer, pl_module, exception) -> None:
+        self.close(pl_module)
+
+
 if __name__ == "__main__":
     mask = np.array([[1, 0, 0, 1], [1, 1, 1, 0], [0, 1, 0, 0]])
-    print(SaveRunLengthEncodingd.encode_run_length(mask))
+    rle = SaveRunLengthEncodingd.encode_run_length(mask)
+    print(rle)
+    print(SaveRunLengthEncodingd.decode_run_length(rle, mask.shape))
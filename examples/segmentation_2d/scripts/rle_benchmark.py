@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from custom.run_length_encoder import RLECSVSaver, SaveRunLengthEncodingd  # noqa: E402
+
+
+def encode_run_length_loop(mask):
+    # The previous implementation, kept as the reference for parity & timing
+    flat_mask = np.concatenate([[0], mask.flatten(), [0]])
+    transitions = np.nonzero(flat_mask[:-1] != flat_mask[1:])[0]
+    run_starts = transitions[::2]
+    run_lengths = transitions[1::2] - transitions[::2]
+    res = ""
+    for run_start, run_length in zip(run_starts, run_lengths):
+        res += str(run_start) + " " + str(run_length) + " "
+    return res[:-1]
+
+
+def make_masks(num_masks, size, noise, seed):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:size, :size]
+    masks = []
+    for _ in range(num_masks):
+        cy, cx = rng.uniform(0.2, 0.8, 2) * size
+        r = rng.uniform(0.05, 0.3) * size
+        mask = (yy - cy) ** 2 + (xx - cx) ** 2 < r**2
+        # Speckle noise produces masks with many short runs
+        mask ^= rng.random((size, size)) < noise
+        masks.append(mask.astype(np.uint8)[None])
+    return masks
+
+
+def time_encoder(fn, masks):
+    start = time.perf_counter()
+    out = [fn(m) for m in masks]
+    return out, time.perf_counter() - start
+
+
+def time_writer(rles, output_dir, flush_rows):
+    # Only the CSV writing is timed, the masks are encoded beforehand
+    saver = RLECSVSaver(output_dir=output_dir, filename=f"predictions_{flush_rows}.csv")
+    start = time.perf_counter()
+    for i, rle in enumerate(rles):
+        saver.save(data=rle, meta_data={"filename_or_obj": f"case_{i:05d}.png"})
+        if len(saver._cache_dict) >= flush_rows:
+            saver.finalize()
+    saver.finalize()
+    return time.perf_counter() - start
+
+
+def main(args):
+    masks = make_masks(args.num_masks, args.size, args.noise, args.seed)
+
+    ref, t_loop = time_encoder(encode_run_length_loop, masks)
+    out, t_vec = time_encoder(SaveRunLengthEncodingd.encode_run_length, masks)
+    if ref != out:
+        raise SystemExit("Vectorized RLE differs from the loop implementation.")
+    for mask, rle in zip(masks, out):
+        decoded = SaveRunLengthEncodingd.decode_run_length(rle, mask.shape)
+        if not np.array_equal(decoded, mask):
+            raise SystemExit("Decoded mask differs from the original mask.")
+
+    num_runs = sum(len(r.split()) // 2 for r in out)
+    print(f"{len(masks)} masks of {args.size}x{args.size}, {num_runs / len(masks):.0f} runs/mask")
+    print(f"Loop encoder:       {t_loop:.2f} s")
+    print(f"Vectorized encoder: {t_vec:.2f} s ({t_loop / t_vec:.1f}x)")
+
+    with tempfile.TemporaryDirectory(dir=args.output_dir) as output_dir:
+        t_each = time_writer(out, output_dir, flush_rows=1)
+        t_buffered = time_writer(out, output_dir, flush_rows=args.flush_rows)
+        with open(os.path.join(output_dir, "predictions_1.csv")) as f1, open(
+            os.path.join(output_dir, f"predictions_{args.flush_rows}.csv")
+        ) as f2:
+            if f1.read() != f2.read():
+                raise SystemExit("Buffered CSV differs from the per-sample CSV.")
+    print(f"Write every sample: {t_each:.2f} s")
+    print(f"Write every {args.flush_rows} rows: {t_buffered:.2f} s ({t_each / t_buffered:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the RLE encoder and the buffered RLE CSV writer."
+    )
+    parser.add_argument("--num_masks", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--flush_rows", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output_dir", default=None,
+        help="Directory for the CSV files, e.g. on network storage. Defaults to the system temp directory."
+    )
+    main(parser.parse_args())
@@ -1,37 +1,227 @@
+from typing import Optional, Tuple, Union
 
 import numpy as np
-from scipy.ndimage import binary_erosion
+import torch
+from scipy.ndimage import (
+    binary_erosion,
+    distance_transform_cdt,
+    generate_binary_structure
+)
+from monai.data import MetaTensor
 from monai.transforms import MapTransform, Transform
 
+NdarrayTensor = Union[np.ndarray, torch.Tensor]
+
+def _connectivity(structure: Optional[np.ndarray], ndim: int) -> Optional[int]:
+    """
+    Return 1 for the cross structure (the SciPy default) and `ndim` for the
+    full box, which are erosions by a taxicab / chessboard ball. Any other
+    structure returns None.
+    """
+    if structure is None:
+        return 1
+    structure = np.asarray(structure, dtype=bool)
+    for connectivity in (1, ndim):
+        if np.array_equal(structure, generate_binary_structure(ndim, connectivity)):
+            return connectivity
+    return None
+
+def _erode_numpy(
+    mask: np.ndarray,
+    iterations: int,
+    structure: Optional[np.ndarray]
+) -> np.ndarray:
+    # Pad by one background voxel so the volume border erodes like SciPy's
+    # default `border_value=0`
+    padded = np.pad(mask, 1)
+    connectivity = _connectivity(structure, mask.ndim)
+    if connectivity is None:
+        return binary_erosion(padded, structure=structure, iterations=iterations)[(slice(1, -1),) * mask.ndim]
+
+    # n erosions by the unit ball keep exactly the voxels further than n
+    # from the background, which a single distance transform gives
+    metric = "taxicab" if connectivity == 1 else "chessboard"
+    dist = distance_transform_cdt(padded, metric=metric)
+    return dist[(slice(1, -1),) * mask.ndim] > iterations
+
+def _erode_torch(
+    mask: torch.Tensor,
+    iterations: int,
+    structure: Optional[np.ndarray]
+) -> torch.Tensor:
+    ndim = mask.ndim
+    connectivity = _connectivity(structure, ndim)
+    if connectivity is None:
+        return torch.from_numpy(_erode_numpy(mask.cpu().numpy(), iterations, structure)).to(mask.device)
+
+    # Shifted slices of a zero padded mask, the padding never changes, so the
+    # border erodes like SciPy's default `border_value=0`
+    padded = torch.nn.functional.pad(mask, (1, 1) * ndim)
+    inner = (slice(1, -1),) * ndim
+
+    def shifted(x: torch.Tensor, axis: int, offset: int) -> torch.Tensor:
+        index = list(inner)
+        index[axis] = slice(1 + offset, x.shape[axis] - 1 + offset)
+        return x[tuple(index)]
+
+    for _ in range(iterations):
+        if connectivity == 1:
+            # Cross structure, every face neighbour has to be foreground
+            eroded = padded[inner].clone()
+            for axis in range(ndim):
+                eroded &= shifted(padded, axis, -1) & shifted(padded, axis, 1)
+            padded[inner] = eroded
+        else:
+            # Box structure is separable, erode along one axis at a time
+            for axis in range(ndim):
+                padded[inner] = padded[inner] & shifted(padded, axis, -1) & shifted(padded, axis, 1)
+    return padded[inner]
+
+def _bboxes_torch(label: torch.Tensor, per_label: bool):
+    """
+    Return the foreground label values and their bounding boxes, from a
+    single pass collecting the foreground coordinates.
+    """
+    coords = torch.nonzero(label)
+    if coords.shape[0] == 0:
+        return [], []
+
+    def bbox(c: torch.Tensor) -> Tuple[slice, ...]:
+        lo, hi = c.aminmax(dim=0)
+        return tuple(slice(int(l), int(h) + 1) for l, h in zip(lo, hi))
+
+    if not per_label:
+        return [None], [bbox(coords)]
+
+    fg = label[tuple(coords.T)]
+    values = torch.unique(fg)
+    return values.tolist(), [bbox(coords[fg == v]) for v in values]
+
+def _bbox_numpy(mask: np.ndarray) -> Optional[Tuple[slice, ...]]:
+    # Projections on every axis are much cheaper than `find_objects`
+    bbox = []
+    for axis in range(mask.ndim):
+        others = tuple(d for d in range(mask.ndim) if d != axis)
+        index = np.flatnonzero(mask.any(axis=others))
+        if index.size == 0:
+            return None
+        bbox.append(slice(index[0], index[-1] + 1))
+    return tuple(bbox)
+
+def _bboxes_numpy(label: np.ndarray, per_label: bool):
+    """
+    Return the foreground label values and their bounding boxes. Labels are
+    only searched inside the bounding box of the whole foreground.
+    """
+    fg_bbox = _bbox_numpy(label > 0)
+    if fg_bbox is None:
+        return [], []
+    if not per_label:
+        return [None], [fg_bbox]
+
+    crop = label[fg_bbox]
+    values = np.unique(crop[crop > 0])
+    bboxes = []
+    for value in values:
+        bbox = _bbox_numpy(crop == value)
+        bboxes.append(tuple(
+            slice(outer.start + inner.start, outer.start + inner.stop)
+            for outer, inner in zip(fg_bbox, bbox)
+        ))
+    return list(values), bboxes
+
 class BinaryErosion(Transform):
-    def __init__(self, iterations=1, structure=None):
+    def __init__(
+        self,
+        iterations=1,
+        structure=None,
+        per_label: bool = False,
+        spatial_dims: Optional[int] = None
+    ):
         """
         Apply binary erosion to a single label array.
+
+        The erosion is computed on the bounding box of the foreground only. For
+        the default cross structure (and the full box) the n iterations are a
+        single distance transform threshold for NumPy arrays, torch tensors are
+        eroded with shifted slices on their own device. Other structures fall
+        back to `scipy.ndimage.binary_erosion`.
+
         :param iterations: Number of erosion iterations.
         :param structure: Structuring element for erosion.
+        :param per_label: Erode every label value separately and keep the label
+            values, instead of returning the eroded binary foreground.
+        :param spatial_dims: Number of trailing axes to erode, e.g. 3 for channel
+            first MONAI data. Defaults to all the axes like SciPy.
         """
         super().__init__()
         self.iterations = iterations
         self.structure = structure
+        self.per_label = per_label
+        self.spatial_dims = spatial_dims
+
+    def _erode_volume(self, label: NdarrayTensor) -> NdarrayTensor:
+        is_tensor = isinstance(label, torch.Tensor)
+        out = torch.zeros_like(label) if is_tensor else np.zeros_like(label)
+
+        if is_tensor:
+            values, bboxes = _bboxes_torch(label, self.per_label)
+        else:
+            values, bboxes = _bboxes_numpy(label, self.per_label)
+
+        for value, bbox in zip(values, bboxes):
+            crop = label[bbox]
+            mask = crop > 0 if value is None else crop == value
+            if is_tensor:
+                eroded = _erode_torch(mask, self.iterations, self.structure)
+            else:
+                eroded = _erode_numpy(mask, self.iterations, self.structure)
+            # Keep the other labels already written inside this bounding box
+            out[bbox][eroded] = 1 if value is None else value
+        return out
 
     def __call__(self, label):
-        eroded_label = binary_erosion(label > 0, structure=self.structure, iterations=self.iterations).astype(label.dtype)
-        return eroded_label
-        
+        # Work on the plain tensor, slicing a MetaTensor tracks metadata
+        if isinstance(label, MetaTensor):
+            return MetaTensor(self(label.as_tensor()), meta=label.meta)
+
+        if self.spatial_dims is None or label.ndim == self.spatial_dims:
+            return self._erode_volume(label)
+
+        spatial_shape = label.shape[-self.spatial_dims:]
+        volumes = label.reshape(-1, *spatial_shape)
+        eroded = [self._erode_volume(v) for v in volumes]
+        if isinstance(label, torch.Tensor):
+            return torch.stack(eroded).reshape(label.shape)
+        return np.stack(eroded).reshape(label.shape)
+
 class BinaryErosiond(MapTransform):
-    def __init__(self, keys, iterations=1, structure=None):
+    def __init__(
+        self,
+        keys,
+        iterations=1,
+        structure=None,
+        per_label: bool = False,
+        spatial_dims: Optional[int] = None
+    ):
         """
         Apply binary erosion to specific keys in a dictionary (e.g., label data).
         :param keys: List of keys to apply erosion on.
         :param iterations: Number of erosion iterations.
         :param structure: Structuring element for erosion.
+        :param per_label: Erode every label value separately, see `BinaryErosion`.
+        :param spatial_dims: Number of trailing axes to erode, see `BinaryErosion`.
         """
         super().__init__(keys)
-        self.iterations = iterations
-        self.structure = structure
+        self.erosion = BinaryErosion(
+            iterations=iterations,
+            structure=structure,
+            per_label=per_label,
+            spatial_dims=spatial_dims
+        )
 
     def __call__(self, data):
         d = dict(data)
         for key in self.keys:
-            d[key] = binary_erosion(d[key] > 0, structure=self.structure, iterations=self.iterations).astype(d[key].dtype)
-        return d
\ No newline at end of file
+            d[key] = self.erosion(d[key])
+        return d
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from typing import Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+import torch
+from monai.data import MetaTensor
+from monai.inferers import Inferer, SlidingWindowInferer
+
+__all__ = ["SlabSlidingWindowInferer"]
+
+class SlabSlidingWindowInferer(Inferer):
+    """
+    Sliding window inference that streams the volume slab by slab along one
+    spatial axis and writes argmax labels into a memory-mapped output.
+
+    Every slab is extended by a halo on both sides so the windows near the
+    slab borders see the same context as in whole-volume inference. Only the
+    logits of a single slab (plus halo) are kept in memory, the full-volume
+    float logits are never allocated.
+
+    The output is a (B, 1, *spatial) label tensor, which replaces the
+    `AsDiscreted(argmax=True)` post transform. It is backed by an unlinked
+    temporary file, so its pages can be written back to disk instead of
+    being held in RAM and the file is removed once the tensor is freed.
+
+    Args:
+        roi_size: the window size of the sliding window inference.
+        sw_batch_size: the batch size to run window slices.
+        overlap: amount of overlap between windows.
+        mode: blending mode of the windows, "constant" or "gaussian".
+        slab_axis: spatial axis to split the volume along.
+        slab_size: number of voxels along `slab_axis` emitted per slab,
+            defaults to `roi_size[slab_axis]`.
+        halo: number of context voxels added on each side of a slab,
+            defaults to half of `roi_size[slab_axis]`. A larger halo matches
+            whole-volume inference more closely at the cost of recomputing
+            more windows.
+        output_dir: directory of the memory-mapped output, defaults to the
+            system temporary directory.
+        output_dtype: dtype of the label output.
+        kwargs: other arguments of `SlidingWindowInferer`.
+    """
+    def __init__(
+        self,
+        roi_size: Sequence[int],
+        sw_batch_size: int = 1,
+        overlap: float = 0.25,
+        mode: str = "constant",
+        slab_axis: int = -1,
+        slab_size: Optional[int] = None,
+        halo: Optional[int] = None,
+        output_dir: Optional[str] = None,
+        output_dtype: Union[str, np.dtype] = "uint8",
+        **kwargs
+    ):
+        super().__init__()
+
+        self.roi_size = list(roi_size)
+        self.slab_axis = slab_axis % len(self.roi_size)
+        self.slab_size = slab_size or self.roi_size[self.slab_axis]
+        self.halo = self.roi_size[self.slab_axis] // 2 if halo is None else halo
+        if self.slab_size <= 0 or self.halo < 0:
+            raise ValueError("`slab_size` must be positive and `halo` non-negative.")
+
+        self.output_dir = output_dir
+        self.output_dtype = np.dtype(output_dtype)
+
+        self.inferer = SlidingWindowInferer(
+            roi_size=roi_size,
+            sw_batch_size=sw_batch_size,
+            overlap=overlap,
+            mode=mode,
+            **kwargs
+        )
+
+    def _allocate(self, shape: Sequence[int]) -> np.memmap:
+        fd, path = tempfile.mkstemp(suffix=".labels", dir=self.output_dir)
+        try:
+            out = np.memmap(path, dtype=self.output_dtype, mode="w+", shape=tuple(shape))
+        finally:
+            # The mapping stays valid after unlinking, the file is released
+            # together with the last reference to the output
+            os.close(fd)
+            os.unlink(path)
+        return out
+
+    @torch.no_grad()
+    def __call__(
+        self,
+        inputs: torch.Tensor,
+        network: Callable[..., torch.Tensor],
+        *args: Any,
+        **kwargs: Any
+    ) -> torch.Tensor:
+        meta_inputs = inputs if isinstance(inputs, MetaTensor) else None
+        if meta_inputs is not None:
+            inputs = inputs.as_tensor()
+
+        batch_size = inputs.shape[0]
+        spatial_shape = inputs.shape[2:]
+        dim = 2 + self.slab_axis
+        length = spatial_shape[self.slab_axis]
+
+        out = self._allocate((batch_size, 1, *spatial_shape))
+        index = [slice(None)] * out.ndim
+        for start in range(0, length, self.slab_size):
+            stop = min(start + self.slab_size, length)
+            lo = max(start - self.halo, 0)
+            hi = min(stop + self.halo, length)
+
+            logits = self.inferer(inputs.narrow(dim, lo, hi - lo), network, *args, **kwargs)
+            labels = logits.narrow(dim, start - lo, stop - start).argmax(dim=1, keepdim=True)
+
+            index[dim] = slice(start, stop)
+            out[tuple(index)] = labels.cpu().numpy()
+            del logits, labels
+
+        out = torch.from_numpy(out)
+        if meta_inputs is not None:
+            out = MetaTensor(out, meta=meta_inputs.meta)
+        return out
@@ -1,7 +1,42 @@
 import torch
-from typing import Callable, Optional
+from typing import Callable, List, Optional
 from monai.losses import DeepSupervisionLoss, DiceCELoss
 
+from custom.ds_loss import DeepSupervisionDiceCELoss
+
+class MultiScaleDeepSupervisionLoss(DeepSupervisionLoss):
+    """
+    DeepSupervisionLoss for deep supervision outputs at their native scales.
+    With the default "nearest-exact" `interp_mode`, the target is downsampled
+    once per scale by strided slicing, which picks the same voxels as the
+    interpolation without copying the label. Other modes, and scale factors
+    that are not integers, interpolate the target with `interp_mode`.
+    """
+    def __init__(
+        self,
+        loss: torch.nn.Module,
+        weight_mode: str = "exp",
+        weights: Optional[List[float]] = None,
+        interp_mode: str = "nearest-exact"
+    ):
+        super().__init__(loss, weight_mode=weight_mode, weights=weights)
+        self.interp_mode = interp_mode
+
+    def get_loss(self, input: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+        size = input.shape[2:]
+        full_size = target.shape[2:]
+        if (
+            self.interp_mode == "nearest-exact"
+            and size != full_size
+            and all(f % s == 0 for f, s in zip(full_size, size))
+        ):
+            index = [slice(None), slice(None)]
+            for f, s in zip(full_size, size):
+                step = f // s
+                index.append(slice(step // 2, None, step))
+            target = target[tuple(index)]
+        return super().get_loss(input, target)
+
 def DsDiceCELoss(
     include_background: bool = True,
     to_onehot_y: bool = False,
@@ -18,6 +53,24 @@ def DsDiceCELoss(
     lambda_dice: float = 1.0,
     lambda_ce: float = 1.0
 ):
+    if other_act is None:
+        # All the heads in one fused call, the label is prepared once per scale
+        return DeepSupervisionDiceCELoss(
+            include_background=include_background,
+            to_onehot_y=to_onehot_y,
+            sigmoid=sigmoid,
+            softmax=softmax,
+            squared_pred=squared_pred,
+            jaccard=jaccard,
+            reduction=reduction,
+            smooth_nr=smooth_nr,
+            smooth_dr=smooth_dr,
+            batch=batch,
+            ce_weight=ce_weight,
+            lambda_dice=lambda_dice,
+            lambda_ce=lambda_ce
+        )
+
     dice = DiceCELoss(
         include_background=include_background,
         to_onehot_y=to_onehot_y,
@@ -34,5 +87,5 @@ def DsDiceCELoss(
         lambda_dice=lambda_dice,
         lambda_ce=lambda_ce
     )
-    return DeepSupervisionLoss(dice)
+    return MultiScaleDeepSupervisionLoss(dice)
 
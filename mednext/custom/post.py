@@ -1,4 +1,4 @@
-from typing import Dict, Hashable, List, Mapping, Union
+from typing import Dict, Hashable, List, Mapping, Sequence, Union
 
 import torch
 from monai.data import MetaTensor
@@ -20,13 +20,17 @@ class DeepSupervisionSplitDimd(MapTransform):
 
     def __call__(
         self,
-        data: Mapping[Hashable, torch.Tensor]
+        data: Mapping[Hashable, Union[torch.Tensor, Sequence[torch.Tensor]]]
     ) -> Dict[Hashable, Union[torch.Tensor, List[torch.Tensor]]]:
         d = dict(data)
         for key in self.key_iterator(d):
-            # Split the deep supervision outputs
-            num_outputs = d[key].shape[1]
-            preds = [d[key][:, i, ::] for i in range(num_outputs)]
+            if isinstance(d[key], (list, tuple)):
+                # Outputs at native resolution, ordered from the highest resolution
+                preds = list(d[key])
+            else:
+                # Split the deep supervision outputs
+                num_outputs = d[key].shape[1]
+                preds = [d[key][:, i, ::] for i in range(num_outputs)]
 
             # Repalce original deep supervision preds with normal preds
             if self.replace_preds:
@@ -0,0 +1,100 @@
+import argparse
+import time
+from typing import Callable, Dict
+
+import torch
+from custom.mednext import (
+    mednext_small,
+    mednext_base,
+    mednext_medium,
+    mednext_large
+)
+
+MODELS = {
+    "mednext_small": mednext_small,
+    "mednext_base": mednext_base,
+    "mednext_medium": mednext_medium,
+    "mednext_large": mednext_large
+}
+
+def build_eager(model: torch.nn.Module, args: argparse.Namespace) -> torch.nn.Module:
+    return model
+
+def build_script(model: torch.nn.Module, args: argparse.Namespace) -> torch.nn.Module:
+    return torch.jit.script(model)
+
+def build_compile(model: torch.nn.Module, args: argparse.Namespace) -> torch.nn.Module:
+    return torch.compile(model, mode=args.compile_mode, fullgraph=True, dynamic=False)
+
+BACKENDS: Dict[str, Callable] = {
+    "eager": build_eager,
+    "script": build_script,
+    "compile": build_compile
+}
+
+@torch.no_grad()
+def benchmark(model: torch.nn.Module, x: torch.Tensor, repeats: int) -> Dict[str, float]:
+    # The first call includes scripting/tracing and code generation
+    start = time.perf_counter()
+    out = model(x)
+    startup = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(x)
+        times.append(time.perf_counter() - start)
+
+    return {
+        "output": out,
+        "startup": startup,
+        "steady": min(times)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare startup and steady-state inference time of eager, TorchScript and torch.compile MedNeXt."
+    )
+    parser.add_argument("--model", default="mednext_base", choices=list(MODELS.keys()))
+    parser.add_argument("--in_channels", type=int, default=1)
+    parser.add_argument("--out_channels", type=int, default=3)
+    parser.add_argument("--roi_size", type=int, nargs="+", default=[64, 64, 64])
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--memory_format", default="contiguous")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS.keys()), choices=list(BACKENDS.keys()))
+    parser.add_argument("--compile_mode", default="default")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = MODELS[args.model](
+        len(args.roi_size),
+        args.in_channels,
+        args.out_channels,
+        memory_format=args.memory_format
+    ).eval()
+    x = torch.randn(args.batch_size, args.in_channels, *args.roi_size)
+
+    with torch.no_grad():
+        ref = model(x)
+
+    print(f"{'backend':<10}{'startup':>12}{'steady':>12}{'speedup':>10}{'max diff':>12}")
+    eager_time = None
+    for name in args.backends:
+        result = benchmark(BACKENDS[name](model, args), x, args.repeats)
+        if eager_time is None:
+            eager_time = result["steady"]
+        max_diff = (result["output"] - ref).abs().max().item()
+        print(
+            f"{name:<10}"
+            f"{result['startup']:>10.2f} s"
+            f"{result['steady'] * 1000:>9.1f} ms"
+            f"{eager_time / result['steady']:>9.2f}x"
+            f"{max_diff:>12.2e}"
+        )
+        if max_diff > args.atol:
+            raise SystemExit(f"{name} output differs by {max_diff:.3e} > {args.atol:.1e}")
+
+if __name__ == "__main__":
+    main()
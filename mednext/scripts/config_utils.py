@@ -0,0 +1,27 @@
+import importlib
+import json
+from typing import Any, Dict, Optional
+
+from ruamel.yaml import YAML
+
+def load_config(path: str) -> Dict:
+    """
+    Load a manafaln JSON or YAML configuration file.
+    """
+    with open(path) as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        return YAML(typ="safe").load(f)
+
+def build_component(config: Dict, default_path: Optional[str] = None, **kwargs) -> Any:
+    """
+    Instantiate a `name`/`path`/`args` component from the configuration,
+    `kwargs` overwrite the arguments in the configuration.
+    """
+    path = config.get("path", default_path)
+    if path is None:
+        raise ValueError(f"Component {config['name']} has no path to import from.")
+    module = importlib.import_module(path)
+    args = dict(config.get("args", {}) or {})
+    args.update(kwargs)
+    return getattr(module, config["name"])(**args)
@@ -1,5 +1,8 @@
+import copy
+import math
+import warnings
 from collections import OrderedDict
-from typing import Any, List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -9,6 +12,7 @@ from torch.nn.functional import interpolate
 from torch.utils.checkpoint import checkpoint as grad_ckpt
 
 __all__ = [
+    "MEMORY_FORMATS",
     "MedNeXtBlock",
     "MedNeXtDownBlock",
     "MedNeXtUpBlock",
@@ -17,9 +21,17 @@ __all__ = [
     "mednext_small",
     "mednext_base",
     "mednext_medium",
-    "mednext_large"
+    "mednext_large",
+    "PointwiseLinear",
+    "quantize_dynamic_int8"
 ]
 
+MEMORY_FORMATS = {
+    "contiguous": torch.contiguous_format,
+    "channels_last": torch.channels_last,
+    "channels_last_3d": torch.channels_last_3d
+}
+
 class MedNeXtBlock(nn.Module):
     def __init__(
         self,
@@ -72,8 +84,88 @@ class MedNeXtBlock(nn.Module):
         )
         self.layers = nn.Sequential(layers)
 
+        # Number of voxels per tile in the fused inference path, None to disable
+        self.fused_tile_size = None
+
+    def fuse_for_inference(self, tile_size: int = 4096):
+        """
+        Run the block with the fused execution path in eval mode. The GroupNorm
+        is folded into the expand convolution as a per-sample scale and shift,
+        and both pointwise convolutions run as channels-last matmuls over tiles
+        of `tile_size` voxels, so the expanded tensor is never fully allocated.
+        The parameters are not modified, checkpoints remain compatible.
+        """
+        if tile_size is not None and tile_size < 1:
+            raise ValueError(f"tile_size must be a positive integer, got {tile_size}.")
+        if isinstance(self.layers.conv2, PointwiseLinear):
+            raise ValueError("Fused inference is not supported on quantized blocks.")
+        self.fused_tile_size = tile_size
+
+    def __prepare_scriptable__(self):
+        # Called by `torch.jit.script`, the fused path is eager only and would
+        # otherwise fail when the scripted model runs
+        if self.fused_tile_size is not None:
+            raise RuntimeError(
+                "Fused inference cannot be scripted, script the model before "
+                "`fuse_for_inference` or without it."
+            )
+        return self
+
+    @torch.jit.unused
+    def fused_layers(self, x: Tensor) -> Tensor:
+        x = self.layers.conv1(x)
+
+        batch_size = x.shape[0]
+        spatial_shape = x.shape[2:]
+
+        # GroupNorm with one channel per group is a per-sample, per-channel
+        # affine transform, fold it into the weight & bias of conv2
+        norm = self.layers.norm
+        # Two-pass biased variance like GroupNorm, E[x^2] - mean^2 loses
+        # precision in float32 for activations with a large mean
+        var, mean = torch.var_mean(x.flatten(2), dim=2, unbiased=False)
+        scale = norm.weight * torch.rsqrt(var + norm.eps)
+        shift = norm.bias - mean * scale
+
+        conv2 = self.layers.conv2
+        conv3 = self.layers.conv3
+        w2 = conv2.weight.flatten(1).t()
+        b2 = torch.addmm(conv2.bias, shift, w2).unsqueeze(1)
+        w2 = scale.unsqueeze(2) * w2
+        w3 = conv3.weight.flatten(1).t()
+        approximate = self.layers.act.approximate
+
+        # Channels-last copy of the depthwise conv output: (B, N, C), this is
+        # only a view if the input is already in channels-last memory format
+        channels_last = x.stride(1) == 1
+        x = x.flatten(2).transpose(1, 2).contiguous()
+        num_voxels = x.shape[1]
+
+        # Keep the memory layout of the input, channels-last inputs are
+        # written directly, otherwise each tile is written back transposed
+        if channels_last:
+            out = x.new_empty(batch_size, num_voxels, conv3.out_channels)
+            out_tiles = out
+        else:
+            out = x.new_empty(batch_size, conv3.out_channels, num_voxels)
+            out_tiles = out.transpose(1, 2)
+        for start in range(0, num_voxels, self.fused_tile_size):
+            end = min(start + self.fused_tile_size, num_voxels)
+            h = torch.baddbmm(b2, x[:, start:end], w2)
+            h = F.gelu(h, approximate=approximate)
+            out_tiles[:, start:end] = torch.matmul(h, w3).add_(conv3.bias)
+
+        if channels_last:
+            out = out.transpose(1, 2)
+        return out.view(batch_size, -1, *spatial_shape)
+
+    def run_layers(self, x: Tensor) -> Tensor:
+        if self.fused_tile_size is not None and not self.training:
+            return self.fused_layers(x)
+        return self.layers(x)
+
     def forward(self, x: Tensor) -> Tensor:
-        s = self.layers(x)
+        s = self.run_layers(x)
         if self.res_block:
             return s + x
         return s
@@ -119,7 +211,7 @@ class MedNeXtDownBlock(MedNeXtBlock):
             self.res_conv = None
 
     def forward(self, x: Tensor) -> Tensor:
-        s = super().forward(x)
+        s = self.run_layers(x)
 
         if self.res_conv is not None:
             r = self.res_conv(x)
@@ -148,9 +240,9 @@ class MedNeXtUpBlock(MedNeXtBlock):
 
         # Note: MedNeXtBlock should ensure `spatial_dims` is either 2 or 3
         if spatial_dims == 2:
-            self.pad_sizes = (1, 0, 1, 0)
+            self.pad_sizes = [1, 0, 1, 0]
         else:
-            self.pad_sizes = (1, 0, 1, 0, 1, 0)
+            self.pad_sizes = [1, 0, 1, 0, 1, 0]
         Conv = nn.ConvTranspose2d if spatial_dims == 2 else nn.ConvTranspose3d
 
         self.layers.conv1 = Conv(
@@ -173,7 +265,7 @@ class MedNeXtUpBlock(MedNeXtBlock):
             self.res_conv = None
 
     def forward(self, x: Tensor) -> Tensor:
-        s = super().forward(x)
+        s = self.run_layers(x)
         s = nn.functional.pad(s, self.pad_sizes)
 
         if self.res_conv is not None:
@@ -212,8 +304,29 @@ class MedNeXt(nn.Module):
         expand_ratio: Union[int, Sequence[int]],
         res_block: bool = True,
         deep_supervision: bool = False,
-        use_grad_checkpoint: bool = False
+        use_grad_checkpoint: Union[bool, Sequence[bool]] = False,
+        checkpoint_budget: Optional[Dict[str, Any]] = None,
+        ds_native_resolution: bool = False,
+        memory_format: str = "contiguous"
     ):
+        """
+        Args:
+            use_grad_checkpoint: enable gradient checkpointing for all stages
+                with a bool, or per stage with a sequence of bools in the same
+                order as `num_blocks` (encoder stages, bottleneck, decoder stages).
+            checkpoint_budget: keyword arguments of `solve_checkpoint_policy`
+                (`budget`, `roi_size`, `batch_size`, `bytes_per_element`). If set,
+                the per-stage policy is solved from the activation memory budget
+                and overrides `use_grad_checkpoint`.
+            ds_native_resolution: return the deep supervision outputs as a list
+                (full resolution output, 1/2 head, 1/4 head, ...) with every head
+                at its native scale, instead of interpolating all heads to full
+                resolution and stacking them on dim 1.
+            memory_format: "contiguous", or "channels_last_3d" ("channels_last"
+                for 2D) to run the convolutions in NDHWC layout. Inputs, e.g. the
+                windows of SlidingWindowInferer, are converted on entry and the
+                inference output is returned contiguous.
+        """
         super().__init__()
 
         self.spatial_dims = spatial_dims
@@ -223,7 +336,18 @@ class MedNeXt(nn.Module):
         self.filters = filters
         self.res_block = res_block
         self.deep_supervision = deep_supervision
-        self.use_grad_checkpoint = use_grad_checkpoint
+        self.ds_native_resolution = ds_native_resolution
+
+        if memory_format not in MEMORY_FORMATS:
+            raise ValueError(
+                f"Unknown memory format {memory_format}, must be one of {list(MEMORY_FORMATS.keys())}."
+            )
+        if (spatial_dims, memory_format) in [(2, "channels_last_3d"), (3, "channels_last")]:
+            raise ValueError(f"Memory format {memory_format} is invalid for {spatial_dims}D inputs.")
+        self.memory_format = MEMORY_FORMATS[memory_format]
+        # TorchScript cannot hold a torch.memory_format attribute, forward
+        # only branches on this constant flag
+        self.channels_last = memory_format != "contiguous"
 
         if not len(num_blocks) % 2:
             raise ValueError(
@@ -240,6 +364,8 @@ class MedNeXt(nn.Module):
         else:
             self.expand_ratio = list(expand_ratio)
 
+        self.set_checkpoint_policy(use_grad_checkpoint)
+
         # Input layer
         if self.spatial_dims == 2:
             self.stem = nn.Conv2d(in_channels, self.filters, kernel_size=1)
@@ -337,6 +463,159 @@ class MedNeXt(nn.Module):
         # Dummy tensor with require_grad to fix checkpointing bug
         # self.dummy_tensor = nn.Parameter(torch.tensor([1.0]), requires_grad=True)
 
+        if checkpoint_budget is not None:
+            self.set_checkpoint_policy(self.solve_checkpoint_policy(**checkpoint_budget))
+
+        self.to(memory_format=self.memory_format)
+
+    def set_checkpoint_policy(self, policy: Union[bool, Sequence[bool]]):
+        """
+        Set gradient checkpointing for all stages (bool) or per stage (sequence
+        of bools ordered as `num_blocks`).
+        """
+        if isinstance(policy, bool):
+            policy = [policy] * len(self.num_blocks)
+        elif len(policy) != len(self.num_blocks):
+            raise ValueError(
+                "The length of the checkpoint policy and `num_blocks` must be the same."
+            )
+        self.ckpt_stages = [bool(p) for p in policy]
+        self.use_grad_checkpoint = any(self.ckpt_stages)
+
+    def _stage_blocks(self, stage: int, roi_size: Sequence[int]) -> List[Tuple[int, int, int, int, int]]:
+        # List (in_voxels, voxels, in_channels, out_channels, expand_ratio) of
+        # every block in the stage, voxels is the resolution of the block convs
+        factor = 2 ** self.spatial_dims
+        voxels = math.prod(roi_size)
+        if stage <= self.depth:
+            level = stage
+        else:
+            level = 2 * self.depth - stage
+        n = voxels // (factor ** level)
+        chs = self.filters * (2 ** level)
+        expand = self.expand_ratio[stage]
+
+        if stage < self.depth:
+            blocks = [(n, n, chs, chs, expand)] * self.num_blocks[stage]
+            blocks.append((n, n // factor, chs, chs * 2, self.expand_ratio[stage + 1]))
+        elif stage == self.depth:
+            blocks = [(n, n, chs, chs, expand)] * self.num_blocks[stage]
+        else:
+            blocks = [(n // factor, n, chs * 2, chs, expand)]
+            blocks += [(n, n, chs, chs, expand)] * self.num_blocks[stage]
+        return blocks
+
+    def estimate_stage_costs(
+        self,
+        roi_size: Sequence[int],
+        batch_size: int = 1,
+        bytes_per_element: int = 4
+    ) -> List[Dict[str, int]]:
+        """
+        Estimate the activation memory kept for backward by each stage, with
+        and without checkpointing, and the recomputation cost in MACs.
+
+        A block stores its input, the depthwise conv & norm outputs and both
+        expanded tensors around the GELU. A checkpointed block only stores its
+        input, but has to rematerialize the rest during backward.
+        """
+        if len(roi_size) != self.spatial_dims:
+            raise ValueError(f"roi_size must have {self.spatial_dims} dimensions.")
+
+        kernel_volume = self.kernel_size ** self.spatial_dims
+        scale = batch_size * bytes_per_element
+
+        costs = []
+        for stage in range(len(self.num_blocks)):
+            full = ckpt = peak = macs = 0
+            for n_in, n, c_in, c_out, e in self._stage_blocks(stage, roi_size):
+                inner = (2 * c_in + 2 * e * c_in) * n
+                full += c_in * n_in + inner
+                ckpt += c_in * n_in
+                peak = max(peak, inner)
+                macs += n * (kernel_volume * c_in + e * c_in * c_in + e * c_in * c_out)
+            costs.append({
+                "full": full * scale,
+                "checkpoint": ckpt * scale,
+                "recompute_peak": peak * scale,
+                "recompute_macs": macs * batch_size
+            })
+        return costs
+
+    def estimate_activation_memory(
+        self,
+        policy: Sequence[bool],
+        roi_size: Sequence[int],
+        batch_size: int = 1,
+        bytes_per_element: int = 4
+    ) -> int:
+        """
+        Estimate the peak activation memory in bytes of a training step with
+        the given per-stage checkpoint policy.
+        """
+        costs = self.estimate_stage_costs(roi_size, batch_size, bytes_per_element)
+        total = sum(c["checkpoint"] if p else c["full"] for c, p in zip(costs, policy))
+        peak = max([c["recompute_peak"] for c, p in zip(costs, policy) if p], default=0)
+        return total + peak
+
+    def solve_checkpoint_policy(
+        self,
+        budget: float,
+        roi_size: Sequence[int],
+        batch_size: int = 1,
+        bytes_per_element: int = 4
+    ) -> List[bool]:
+        """
+        Find a per-stage checkpoint policy whose estimated activation memory
+        fits in `budget` bytes. Stages are checkpointed greedily by saved
+        memory per recomputed MAC until the estimate fits.
+        """
+        costs = self.estimate_stage_costs(roi_size, batch_size, bytes_per_element)
+        order = sorted(
+            range(len(costs)),
+            key=lambda i: (costs[i]["full"] - costs[i]["checkpoint"]) / costs[i]["recompute_macs"],
+            reverse=True
+        )
+
+        policy = [False] * len(costs)
+        for stage in [None] + order:
+            if stage is not None:
+                policy[stage] = True
+            usage = self.estimate_activation_memory(
+                policy, roi_size, batch_size, bytes_per_element
+            )
+            if usage <= budget:
+                return policy
+
+        warnings.warn(
+            f"Estimated activation memory {usage / 2 ** 30:.2f} GiB exceeds the budget "
+            f"{budget / 2 ** 30:.2f} GiB even with all stages checkpointed."
+        )
+        return policy
+
+    @torch.jit.unused
+    def _run_stage(self, blocks: nn.Module, x: Tensor, stage: int) -> Tensor:
+        if self.ckpt_stages[stage]:
+            return grad_ckpt(blocks, x, use_reentrant=False)
+        return blocks(x)
+
+    @torch.jit.unused
+    def _run_blocks(self, blocks: nn.Sequential, x: Tensor, stage: int) -> Tensor:
+        for layer in blocks:
+            x = self._run_stage(layer, x, stage)
+        return x
+
+    def fuse_for_inference(self, tile_size: int = 4096) -> "MedNeXt":
+        """
+        Switch every MedNeXt block to the fused inference path and put the
+        model in eval mode. The fused path is only used in eval mode, calling
+        `train()` afterwards falls back to the original layers.
+        """
+        for module in self.modules():
+            if isinstance(module, MedNeXtBlock):
+                module.fuse_for_inference(tile_size)
+        return self.eval()
+
     def encode(self, x: Tensor):
         x = self.stem(x)
         skips = []
@@ -347,40 +626,46 @@ class MedNeXt(nn.Module):
         x = self.bottleneck(x)
         return x, skips
 
+    @torch.jit.unused
     def encode_with_ckpt(self, x: Tensor):
         x = self.stem(x)
         skips = []
-        for enc, down in zip(self.enc_blocks, self.down_blocks):
-            s = x
-            for layer in enc:
-                s = grad_ckpt(layer, s, use_reentrant=False)
-            x = grad_ckpt(down, s, use_reentrant=False)
+        for i, (enc, down) in enumerate(zip(self.enc_blocks, self.down_blocks)):
+            s = self._run_blocks(enc, x, i)
+            x = self._run_stage(down, s, i)
             skips.append(s)
-        x = grad_ckpt(self.bottleneck, x, use_reentrant=False)
+        x = self._run_blocks(self.bottleneck, x, self.depth)
         return x, skips
 
     def decode(self, x: Tensor, skips: List[Tensor]):
-        for up, dec in zip(self.up_blocks, self.dec_blocks):
-            x = up(x) + skips.pop()
+        # Skips are indexed from the deepest one instead of popped, so the
+        # list is not mutated during the forward pass
+        for i, (up, dec) in enumerate(zip(self.up_blocks, self.dec_blocks)):
+            x = up(x) + skips[-1 - i]
             x = dec(x)
         x = self.out(x)
         return x
 
+    @torch.jit.unused
     def decode_with_ckpt(self, x: Tensor, skips: List[Tensor]):
-        for up, dec in zip(self.up_blocks, self.dec_blocks):
-            x = grad_ckpt(up, x, use_reentrant=False) + skips.pop()
-            for layer in dec:
-                x = grad_ckpt(layer, x, use_reentrant=False)
-        x = grad_ckpt(self.out, x, use_reentrant=False)
+        stage = self.depth
+        for i, (up, dec) in enumerate(zip(self.up_blocks, self.dec_blocks)):
+            stage += 1
+            x = self._run_stage(up, x, stage) + skips[-1 - i]
+            x = self._run_blocks(dec, x, stage)
+        x = self._run_stage(self.out, x, stage)
         return x
 
-    def decode_with_ds(self, x: Tensor, skips: List[Tensor]) -> Tensor:
-        ds_heads = []
-        for ds_out, up, dec in zip(self.ds_out_blocks, self.up_blocks, self.dec_blocks):
-            ds_heads.append(ds_out(x))
-            x = up(x) + skips.pop()
-            x = dec(x)
-        x = self.out(x)
+    @torch.jit.unused
+    def collect_ds_outputs(
+        self,
+        x: Tensor,
+        ds_heads: List[Tensor]
+    ) -> Union[Tensor, List[Tensor]]:
+        # Heads are collected from the lowest resolution, reverse them so the
+        # outputs are ordered from the highest resolution
+        if self.ds_native_resolution:
+            return [x, *reversed(ds_heads)]
 
         # Collect deep supervision outputs and transform to MONAI format
         out = [x]
@@ -390,38 +675,96 @@ class MedNeXt(nn.Module):
 
         return x
 
-    def decode_with_ds_ckpt(self, x: Tensor, skips: List[Tensor]) -> Tensor:
+    @torch.jit.unused
+    def decode_with_ds(self, x: Tensor, skips: List[Tensor]) -> Union[Tensor, List[Tensor]]:
         ds_heads = []
-        for ds_out, up, dec in zip(self.ds_out_blocks, self.up_blocks, self.dec_blocks):
-            ds_heads.append(grad_ckpt(ds_out, x, use_reentrant=False))
-            x = grad_ckpt(up, x, use_reentrant=False) + skips.pop()
-            x = grad_ckpt(dec, x, use_reentrant=False)
-        x = grad_ckpt(self.out, x, use_reentrant=False)
-
-        # Collect deep supervision outputs and transform to MONAI format
-        out = [x]
-        for ds_head in reversed(ds_heads):
-            out.append(interpolate(ds_head, x.shape[2:]))
-        x = torch.stack(out, dim=1)
+        for i, (ds_out, up, dec) in enumerate(zip(self.ds_out_blocks, self.up_blocks, self.dec_blocks)):
+            ds_heads.append(ds_out(x))
+            x = up(x) + skips[-1 - i]
+            x = dec(x)
+        x = self.out(x)
 
-        return x
+        return self.collect_ds_outputs(x, ds_heads)
 
-    def forward(self, x: Tensor) -> Tensor:
-        if self.training and (self.deep_supervision or self.use_grad_checkpoint):
-            if self.use_grad_checkpoint:
-                x, skips = self.encode_with_ckpt(x)
-                if self.deep_supervision:
-                    x = self.decode_with_ds_ckpt(x, skips)
-                else:
-                    x = self.decode_with_ckpt(x, skips)
-            else:
-                x, skips = self.encode(x)
-                x = self.decode_with_ds(x, skips)
-        else:
+    @torch.jit.unused
+    def decode_with_ds_ckpt(self, x: Tensor, skips: List[Tensor]) -> Union[Tensor, List[Tensor]]:
+        ds_heads = []
+        stage = self.depth
+        for i, (ds_out, up, dec) in enumerate(zip(self.ds_out_blocks, self.up_blocks, self.dec_blocks)):
+            stage += 1
+            ds_heads.append(self._run_stage(ds_out, x, stage))
+            x = self._run_stage(up, x, stage) + skips[-1 - i]
+            x = self._run_blocks(dec, x, stage)
+        x = self._run_stage(self.out, x, stage)
+
+        return self.collect_ds_outputs(x, ds_heads)
+
+    def forward_inference(self, x: Tensor) -> Tensor:
+        """
+        Plain encoder-decoder pass with no data-dependent branching, used in
+        eval mode and by `torch.jit.script` / `torch.compile`.
+        """
+        x, skips = self.encode(x)
+        x = self.decode(x, skips)
+        return x.contiguous()
+
+    @torch.jit.unused
+    def forward_train(self, x: Tensor) -> Union[Tensor, List[Tensor]]:
+        if self.use_grad_checkpoint:
+            x, skips = self.encode_with_ckpt(x)
+            if self.deep_supervision:
+                return self.decode_with_ds_ckpt(x, skips)
+            return self.decode_with_ckpt(x, skips)
+
+        if self.deep_supervision:
             x, skips = self.encode(x)
-            x = self.decode(x, skips)
-        return x
+            return self.decode_with_ds(x, skips)
+        return self.forward_inference(x)
 
+    def forward(self, x: Tensor) -> Union[Tensor, List[Tensor]]:
+        if self.channels_last:
+            if self.spatial_dims == 3:
+                x = x.contiguous(memory_format=torch.channels_last_3d)
+            else:
+                x = x.contiguous(memory_format=torch.channels_last)
+        if self.training:
+            return self.forward_train(x)
+        return self.forward_inference(x)
+
+def _apply_inference_options(
+    model: MedNeXt,
+    fuse_for_inference: bool,
+    compile_kwargs: Optional[Dict[str, Any]],
+    quantize_int8: bool = False
+):
+    """
+    Apply the inference options shared by the factory functions.
+
+    `compile_kwargs` are passed to `nn.Module.compile` (e.g. `{"mode":
+    "max-autotune", "dynamic": False}`), which compiles the module in place
+    so the state dict keys are unchanged. The fused blocks are hand-written
+    tiled kernels for eager mode and are not combined with compilation, and
+    `torch.jit.script` rejects a fused model.
+
+    `quantize_int8` applies `quantize_dynamic_int8` in place on the first
+    forward pass in eval mode, after the workflow has loaded the float32
+    checkpoint, so the state dict keys are unchanged until then. The int8
+    model runs on CPU only (set `accelerator: cpu`) and cannot be trained
+    afterwards, it is not combined with the other options.
+    """
+    if fuse_for_inference and compile_kwargs is not None:
+        raise ValueError("`fuse_for_inference` and `compile_kwargs` cannot be used together.")
+    if quantize_int8 and (fuse_for_inference or compile_kwargs is not None):
+        raise ValueError(
+            "`quantize_int8` cannot be used with `fuse_for_inference` or `compile_kwargs`."
+        )
+    if fuse_for_inference:
+        model.fuse_for_inference()
+    if compile_kwargs is not None:
+        model.compile(**compile_kwargs)
+    if quantize_int8:
+        model.int8_pending = True
+        model.register_forward_pre_hook(_quantize_on_inference)
 
 def mednext_small(
     spatial_dims: int,
@@ -430,7 +773,13 @@ def mednext_small(
     kernel_size: int = 3,
     filters: int = 32,
     deep_supervision: bool = False,
-    use_grad_checkpoint: bool = False
+    use_grad_checkpoint: Union[bool, Sequence[bool]] = False,
+    checkpoint_budget: Optional[Dict[str, Any]] = None,
+    ds_native_resolution: bool = False,
+    memory_format: str = "contiguous",
+    fuse_for_inference: bool = False,
+    compile_kwargs: Optional[Dict[str, Any]] = None,
+    quantize_int8: bool = False
 ) -> MedNeXt:
     model = MedNeXt(
         spatial_dims,
@@ -442,8 +791,12 @@ def mednext_small(
         expand_ratio=[2, 2, 2, 2, 2, 2, 2, 2, 2],
         res_block=True,
         deep_supervision=deep_supervision,
-        use_grad_checkpoint=use_grad_checkpoint
+        use_grad_checkpoint=use_grad_checkpoint,
+        checkpoint_budget=checkpoint_budget,
+        ds_native_resolution=ds_native_resolution,
+        memory_format=memory_format
     )
+    _apply_inference_options(model, fuse_for_inference, compile_kwargs, quantize_int8)
     return model
 
 def mednext_base(
@@ -453,7 +806,13 @@ def mednext_base(
     kernel_size: int = 3,
     filters: int = 32,
     deep_supervision: bool = False,
-    use_grad_checkpoint: bool = False,
+    use_grad_checkpoint: Union[bool, Sequence[bool]] = False,
+    checkpoint_budget: Optional[Dict[str, Any]] = None,
+    ds_native_resolution: bool = False,
+    memory_format: str = "contiguous",
+    fuse_for_inference: bool = False,
+    compile_kwargs: Optional[Dict[str, Any]] = None,
+    quantize_int8: bool = False,
     pretrain: str = None
 ) -> MedNeXt:
     model = MedNeXt(
@@ -466,13 +825,18 @@ def mednext_base(
         expand_ratio=[2, 3, 4, 4, 4, 4, 4, 3, 2],
         res_block=True,
         deep_supervision=deep_supervision,
-        use_grad_checkpoint=use_grad_checkpoint
+        use_grad_checkpoint=use_grad_checkpoint,
+        checkpoint_budget=checkpoint_budget,
+        ds_native_resolution=ds_native_resolution,
+        memory_format=memory_format
     )
 
     if pretrain is not None:
         sd = torch.load(pretrain)
         model.load_state_dict(sd)
 
+    _apply_inference_options(model, fuse_for_inference, compile_kwargs, quantize_int8)
+
     return model
 
 def mednext_medium(
@@ -482,7 +846,13 @@ def mednext_medium(
     kernel_size: int = 3,
     filters: int = 32,
     deep_supervision: bool = False,
-    use_grad_checkpoint: bool = False
+    use_grad_checkpoint: Union[bool, Sequence[bool]] = False,
+    checkpoint_budget: Optional[Dict[str, Any]] = None,
+    ds_native_resolution: bool = False,
+    memory_format: str = "contiguous",
+    fuse_for_inference: bool = False,
+    compile_kwargs: Optional[Dict[str, Any]] = None,
+    quantize_int8: bool = False
 ) -> MedNeXt:
     model = MedNeXt(
         spatial_dims,
@@ -494,8 +864,12 @@ def mednext_medium(
         expand_ratio=[2, 3, 4, 4, 4, 4, 4, 3, 2],
         res_block=True,
         deep_supervision=deep_supervision,
-        use_grad_checkpoint=use_grad_checkpoint
+        use_grad_checkpoint=use_grad_checkpoint,
+        checkpoint_budget=checkpoint_budget,
+        ds_native_resolution=ds_native_resolution,
+        memory_format=memory_format
     )
+    _apply_inference_options(model, fuse_for_inference, compile_kwargs, quantize_int8)
     return model
 
 def mednext_large(
@@ -505,7 +879,13 @@ def mednext_large(
     kernel_size: int = 3,
     filters: int = 32,
     deep_supervision: bool = False,
-    use_grad_checkpoint: bool = False
+    use_grad_checkpoint: Union[bool, Sequence[bool]] = False,
+    checkpoint_budget: Optional[Dict[str, Any]] = None,
+    ds_native_resolution: bool = False,
+    memory_format: str = "contiguous",
+    fuse_for_inference: bool = False,
+    compile_kwargs: Optional[Dict[str, Any]] = None,
+    quantize_int8: bool = False
 ) -> MedNeXt:
     model = MedNeXt(
         spatial_dims,
@@ -517,7 +897,65 @@ def mednext_large(
         expand_ratio=[3, 4, 8, 8, 8, 8, 8, 4, 3],
         res_block=True,
         deep_supervision=deep_supervision,
-        use_grad_checkpoint=use_grad_checkpoint
+        use_grad_checkpoint=use_grad_checkpoint,
+        checkpoint_budget=checkpoint_budget,
+        ds_native_resolution=ds_native_resolution,
+        memory_format=memory_format
     )
+    _apply_inference_options(model, fuse_for_inference, compile_kwargs, quantize_int8)
     return model
 
+class PointwiseLinear(nn.Module):
+    """
+    A 1x1 convolution computed as a Linear layer over the channel dimension,
+    so it can be handled by PyTorch dynamic quantization.
+    """
+    def __init__(self, conv: nn.Module):
+        super().__init__()
+
+        self.linear = nn.Linear(
+            conv.in_channels,
+            conv.out_channels,
+            bias=conv.bias is not None
+        )
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight.flatten(1))
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    def forward(self, x: Tensor) -> Tensor:
+        return self.linear(x.movedim(1, -1)).movedim(-1, 1)
+
+def _quantize_dynamic_int8_(model: MedNeXt) -> MedNeXt:
+    for module in model.modules():
+        if isinstance(module, MedNeXtBlock):
+            module.fused_tile_size = None
+            module.layers.conv2 = PointwiseLinear(module.layers.conv2)
+            module.layers.conv3 = PointwiseLinear(module.layers.conv3)
+    model.int8_pending = False
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+def _quantize_on_inference(model: MedNeXt, args):
+    # Forward pre-hook registered by the `quantize_int8` factory option
+    if model.training or not model.int8_pending:
+        return None
+    if any(p.device.type != "cpu" for p in model.parameters()):
+        raise RuntimeError("`quantize_int8` runs on CPU only, set the trainer accelerator to cpu.")
+    _quantize_dynamic_int8_(model)
+    return None
+
+def quantize_dynamic_int8(model: MedNeXt) -> MedNeXt:
+    """
+    Create an int8 copy of a MedNeXt model for CPU inference. The pointwise
+    convolutions of every block are replaced with dynamically quantized Linear
+    layers (int8 weights, activations quantized at runtime), the depthwise
+    convolutions, norms and resampling layers stay in float32.
+
+    The quantized model has a different state dict, load the float32 weights
+    before quantizing. The fused inference path is disabled on the copy. For
+    config driven runs use the `quantize_int8` option of the factories.
+    """
+    return _quantize_dynamic_int8_(copy.deepcopy(model).eval())
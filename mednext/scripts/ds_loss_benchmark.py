@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+
+import torch
+from monai.losses import DiceCELoss
+
+def time_step(loss_fn, heads, label, repeats):
+    # Loss forward + backward, like the loss part of a training step
+    times = []
+    for _ in range(repeats):
+        inputs = [h.detach().requires_grad_() for h in heads] if isinstance(heads, list) \
+            else heads.detach().requires_grad_()
+        start = time.perf_counter()
+        loss = loss_fn(inputs, label)
+        loss.backward()
+        times.append(time.perf_counter() - start)
+    return min(times), loss.detach()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the step time of per-head and fused deep supervision Dice + CE losses."
+    )
+    parser.add_argument(
+        "--custom_dir", default="..",
+        help="Directory to import custom.ds_loss from, e.g. the project root."
+    )
+    parser.add_argument("--batch_size", type=int, default=2)
+    parser.add_argument("--num_classes", type=int, default=3)
+    parser.add_argument("--shape", type=int, nargs=3, default=[96, 96, 96])
+    parser.add_argument("--max_heads", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.custom_dir))
+    from custom.ds_loss import DeepSupervisionDiceCELoss
+
+    kwargs = dict(include_background=True, to_onehot_y=True, softmax=True, smooth_nr=0.0, batch=True)
+    dice_ce = DiceCELoss(**kwargs)
+    fused = DeepSupervisionDiceCELoss(**kwargs)
+
+    label = torch.randint(0, args.num_classes, (args.batch_size, 1, *args.shape), device=args.device)
+
+    print(f"Label {[args.batch_size, 1, *args.shape]}, {args.num_classes} classes on {args.device}")
+    print(f"{'layout':<10}{'heads':>6}{'per-head':>12}{'fused':>12}{'speedup':>10}")
+    for layout in ("stacked", "native"):
+        for num_heads in range(1, args.max_heads + 1):
+            weights = fused.get_weights(num_heads)
+            if layout == "stacked":
+                # DeepSupervision workflow, heads upsampled to the full resolution
+                heads = torch.randn(
+                    args.batch_size, num_heads, args.num_classes, *args.shape, device=args.device
+                )
+
+                def per_head(x, y):
+                    return sum(w * dice_ce(x[:, i], y) for i, w in enumerate(weights))
+            else:
+                # MedNeXt heads at their native resolution
+                heads = [
+                    torch.randn(
+                        args.batch_size, args.num_classes, *[s // 2**i for s in args.shape],
+                        device=args.device
+                    )
+                    for i in range(num_heads)
+                ]
+
+                def per_head(x, y):
+                    return sum(
+                        w * dice_ce(h, fused.downsample_target(y, h.shape[2:]))
+                        for h, w in zip(x, weights)
+                    )
+
+            def fused_step(x, y):
+                return fused(x, y, weights=weights)
+
+            t_ref, ref = time_step(per_head, heads, label, args.repeats)
+            t_fused, out = time_step(fused_step, heads, label, args.repeats)
+            if not torch.allclose(ref, out, rtol=1e-4, atol=1e-5):
+                raise SystemExit(f"Fused loss {out.item()} differs from the per-head loss {ref.item()}.")
+            print(
+                f"{layout:<10}{num_heads:>6}{t_ref * 1e3:>9.1f} ms{t_fused * 1e3:>9.1f} ms"
+                f"{t_ref / t_fused:>9.2f}x"
+            )
+
+if __name__ == "__main__":
+    main()
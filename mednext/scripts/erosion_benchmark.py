@@ -0,0 +1,79 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+from scipy.ndimage import binary_erosion
+from custom.binary_erosion import BinaryErosion
+
+def make_label(shape, num_labels: int, radius: float, seed: int) -> np.ndarray:
+    # Ellipsoid "organs" of different labels, like a spleen/kidney label map
+    rng = np.random.default_rng(seed)
+    grid = np.ogrid[tuple(slice(0, s) for s in shape)]
+    label = np.zeros(shape, dtype=np.uint8)
+    for value in range(1, num_labels + 1):
+        center = rng.uniform(0.25, 0.75, len(shape)) * np.array(shape)
+        radii = rng.uniform(0.5, 1.0, len(shape)) * radius * np.array(shape)
+        dist = sum(((g - c) / r) ** 2 for g, c, r in zip(grid, center, radii))
+        label[dist < 1.0] = value
+    return label
+
+def timeit(fn, repeats: int):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return out, min(times)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare BinaryErosion against iterated scipy.ndimage.binary_erosion."
+    )
+    parser.add_argument("--shape", type=int, nargs=3, default=[512, 512, 120])
+    parser.add_argument("--num_labels", type=int, default=3)
+    parser.add_argument("--radius", type=float, default=0.1, help="Organ radius as a fraction of the shape.")
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    label = make_label(args.shape, args.num_labels, args.radius, seed=0)
+    label_t = torch.from_numpy(label)
+    print(f"Label {args.shape}, {args.num_labels} labels, {np.count_nonzero(label) / label.size:.1%} foreground")
+
+    print(f"{'iterations':<12}{'scipy':>10}{'numpy':>10}{'torch':>10}{'scipy/label':>14}{'numpy/label':>14}{'torch/label':>14}")
+    for iterations in args.iterations:
+        # Reference, the previous implementation
+        ref, t_scipy = timeit(
+            lambda: binary_erosion(label > 0, iterations=iterations).astype(label.dtype), args.repeats
+        )
+        out, t_numpy = timeit(lambda: BinaryErosion(iterations)(label), args.repeats)
+        out_t, t_torch = timeit(lambda: BinaryErosion(iterations)(label_t), args.repeats)
+
+        def scipy_per_label():
+            out = np.zeros_like(label)
+            for value in range(1, args.num_labels + 1):
+                out[binary_erosion(label == value, iterations=iterations)] = value
+            return out
+
+        ref_l, t_scipy_l = timeit(scipy_per_label, args.repeats)
+        out_l, t_numpy_l = timeit(lambda: BinaryErosion(iterations, per_label=True)(label), args.repeats)
+        out_lt, t_torch_l = timeit(lambda: BinaryErosion(iterations, per_label=True)(label_t), args.repeats)
+
+        for name, x, y in [
+            ("numpy", out, ref), ("torch", out_t.numpy(), ref),
+            ("numpy per-label", out_l, ref_l), ("torch per-label", out_lt.numpy(), ref_l)
+        ]:
+            if not np.array_equal(x, y):
+                raise SystemExit(f"{name} erosion differs from SciPy with {iterations} iterations.")
+
+        print(
+            f"{iterations:<12}"
+            f"{t_scipy:>8.2f} s{t_numpy:>8.2f} s{t_torch:>8.2f} s"
+            f"{t_scipy_l:>12.2f} s{t_numpy_l:>12.2f} s{t_torch_l:>12.2f} s"
+        )
+
+if __name__ == "__main__":
+    main()
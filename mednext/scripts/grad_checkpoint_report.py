@@ -0,0 +1,99 @@
+import argparse
+import multiprocessing as mp
+import resource
+import time
+from typing import Dict, List
+
+import torch
+from custom.mednext import (
+    mednext_small,
+    mednext_base,
+    mednext_medium,
+    mednext_large
+)
+
+MODELS = {
+    "mednext_small": mednext_small,
+    "mednext_base": mednext_base,
+    "mednext_medium": mednext_medium,
+    "mednext_large": mednext_large
+}
+
+def peak_rss() -> int:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def run_policy(args: argparse.Namespace, policy: List[bool]) -> Dict:
+    # Executed in a fresh process, so the peak RSS only reflects this policy
+    torch.manual_seed(0)
+    model = MODELS[args.model](
+        len(args.roi_size),
+        args.in_channels,
+        args.out_channels,
+        deep_supervision=args.deep_supervision,
+        use_grad_checkpoint=policy
+    )
+    model.train()
+    x = torch.randn(args.batch_size, args.in_channels, *args.roi_size)
+
+    base = peak_rss()
+    times = []
+    for _ in range(args.steps):
+        start = time.perf_counter()
+        model.zero_grad(set_to_none=True)
+        model(x).float().mean().backward()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "peak": peak_rss() - base,
+        "step_time": min(times)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report activation memory and step time of MedNeXt checkpoint policies."
+    )
+    parser.add_argument("--model", default="mednext_large", choices=list(MODELS.keys()))
+    parser.add_argument("--in_channels", type=int, default=1)
+    parser.add_argument("--out_channels", type=int, default=3)
+    parser.add_argument("--roi_size", type=int, nargs="+", default=[64, 64, 64])
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--deep_supervision", action="store_true")
+    parser.add_argument("--steps", type=int, default=2)
+    parser.add_argument(
+        "--budgets", type=float, nargs="+", default=[0.75, 0.5, 0.25],
+        help="Budgets as fractions of the estimated memory without checkpointing."
+    )
+    args = parser.parse_args()
+
+    model = MODELS[args.model](len(args.roi_size), args.in_channels, args.out_channels)
+    num_stages = len(model.num_blocks)
+
+    def estimate(policy):
+        return model.estimate_activation_memory(policy, args.roi_size, args.batch_size)
+
+    full = estimate([False] * num_stages)
+    policies = {
+        "none": [False] * num_stages,
+        "all": [True] * num_stages
+    }
+    for fraction in args.budgets:
+        policies[f"budget {fraction:.2f}"] = model.solve_checkpoint_policy(
+            full * fraction, args.roi_size, args.batch_size
+        )
+
+    ctx = mp.get_context("spawn")
+    print(f"{'policy':<14}{'stages':<12}{'estimated':>12}{'peak rss':>12}{'step time':>12}")
+    for name, policy in policies.items():
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_policy, (args, policy))
+        stages = "".join("C" if p else "-" for p in policy)
+        print(
+            f"{name:<14}{stages:<12}"
+            f"{estimate(policy) / 2 ** 20:>9.0f} MB"
+            f"{result['peak'] / 2 ** 20:>9.0f} MB"
+            f"{result['step_time']:>10.2f} s"
+        )
+
+if __name__ == "__main__":
+    main()
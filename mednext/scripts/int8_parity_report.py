@@ -0,0 +1,131 @@
+import argparse
+import io
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import torch
+from monai.transforms import Compose
+from config_utils import build_component, load_config
+
+def load_datalist(config: Dict, phase: str) -> List[Dict]:
+    settings = config["data"]["settings"]
+    data_root = settings["data_root"]
+    datalist = load_config(settings["data_list"])
+
+    keys = config["data"][phase]["data_list_key"]
+    if isinstance(keys, str):
+        keys = [keys]
+
+    cases = []
+    for key in keys:
+        for item in datalist[key]:
+            cases.append({
+                k: os.path.join(data_root, v) if isinstance(v, str) else v
+                for k, v in item.items()
+            })
+    return cases
+
+def load_weights(model: torch.nn.Module, ckpt_path: str):
+    ckpt = torch.load(ckpt_path, map_location="cpu")
+    state_dict = ckpt.get("state_dict", ckpt)
+    # Lightning checkpoints store the workflow, the model is under `model.`
+    state_dict = {
+        k[len("model."):] if k.startswith("model.") else k: v
+        for k, v in state_dict.items()
+    }
+    model.load_state_dict(state_dict)
+
+def model_size(model: torch.nn.Module) -> int:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def dice(a: torch.Tensor, b: torch.Tensor, num_classes: int) -> List[float]:
+    scores = []
+    for c in range(1, num_classes):
+        x = a == c
+        y = b == c
+        denom = x.sum() + y.sum()
+        if denom == 0:
+            scores.append(1.0)
+        else:
+            scores.append((2.0 * (x & y).sum() / denom).item())
+    return scores
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare int8 dynamic quantized MedNeXt against the float32 checkpoint."
+    )
+    parser.add_argument("--config", required=True, help="Inference config, e.g. config/config_infer_t1.yaml")
+    parser.add_argument("--ckpt", required=True, help="Float32 model checkpoint.")
+    parser.add_argument("--custom_dir", default=".")
+    parser.add_argument("--phase", default="predict", help="Data section of the config to use.")
+    parser.add_argument("--label_key", default="label")
+    parser.add_argument("--max_cases", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.custom_dir))
+    from custom.mednext import quantize_dynamic_int8
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    config = load_config(args.config)
+    components = config["workflow"]["components"]
+
+    model = build_component(components["model"], "monai.networks.nets")
+    load_weights(model, args.ckpt)
+    model.eval()
+    int8_model = quantize_dynamic_int8(model)
+    num_classes = components["model"]["args"]["out_channels"]
+
+    inferer = build_component(components["inferer"], "monai.inferers")
+    transforms = Compose([
+        build_component(t, "monai.transforms")
+        for t in config["data"][args.phase]["transforms"]
+    ])
+
+    cases = load_datalist(config, args.phase)[:args.max_cases]
+
+    print(f"Model size: fp32 {model_size(model) / 2 ** 20:.1f} MB, int8 {model_size(int8_model) / 2 ** 20:.1f} MB")
+
+    rows = []
+    for case in cases:
+        data = transforms(case)
+        image = data["image"].unsqueeze(0)
+
+        with torch.no_grad():
+            start = time.perf_counter()
+            fp32_preds = inferer(image, model).argmax(dim=1)
+            fp32_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            int8_preds = inferer(image, int8_model).argmax(dim=1)
+            int8_time = time.perf_counter() - start
+
+        row = {
+            "fp32_time": fp32_time,
+            "int8_time": int8_time,
+            "parity": np.mean(dice(int8_preds, fp32_preds, num_classes))
+        }
+        if args.label_key in data:
+            label = torch.as_tensor(data[args.label_key])[0]
+            row["fp32_dice"] = np.mean(dice(fp32_preds[0], label, num_classes))
+            row["int8_dice"] = np.mean(dice(int8_preds[0], label, num_classes))
+        rows.append(row)
+
+        print(
+            f"{os.path.basename(case['image'])}: "
+            + ", ".join(f"{k} {v:.4f}" for k, v in row.items())
+        )
+
+    print("Mean: " + ", ".join(
+        f"{k} {np.mean([r[k] for r in rows]):.4f}" for k in rows[0].keys()
+    ))
+
+if __name__ == "__main__":
+    main()
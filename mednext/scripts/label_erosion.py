@@ -1,91 +1,144 @@
-#%%
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
-import numpy as np
-from scipy.ndimage import binary_erosion
-from monai.transforms import MapTransform, Transform
-
-class BinaryErosion(Transform):
-    def __init__(self, iterations=1, structure=None):
-        """
-        Apply binary erosion to a single label array.
-        :param iterations: Number of erosion iterations.
-        :param structure: Structuring element for erosion.
-        """
-        super().__init__()
-        self.iterations = iterations
-        self.structure = structure
-
-    def __call__(self, label):
-        eroded_label = binary_erosion(label > 0, structure=self.structure, iterations=self.iterations).astype(label.dtype)
-        return eroded_label
-        
-class BinaryErosiond(MapTransform):
-    def __init__(self, keys, iterations=1, structure=None):
-        """
-        Apply binary erosion to specific keys in a dictionary (e.g., label data).
-        :param keys: List of keys to apply erosion on.
-        :param iterations: Number of erosion iterations.
-        :param structure: Structuring element for erosion.
-        """
-        super().__init__(keys)
-        self.iterations = iterations
-        self.structure = structure
-
-    def __call__(self, data):
-        d = dict(data)
-        for key in self.keys:
-            d[key] = binary_erosion(d[key] > 0, structure=self.structure, iterations=self.iterations).astype(d[key].dtype)
-        return d
-
-
-#%%
-
-import os, json
 import numpy as np
 import nibabel as nib
-from tqdm import tqdm
-
-data_root = "/data2/open_dataset/MSD/Task09_Spleen"
-datalist_path = "/home/u/qqaazz800624/manafaln/mednext/datalist/datalist_spleen.json"
-with open(datalist_path, "r") as f:
-    datalist = json.load(f)
-
-
-folds = ['training', 'validation', 'testing']
-save_root = "/neodata/hap/Task09_Spleen/labelsTr"
-erosion_transform = BinaryErosion(iterations=2)
-
-for fold in folds:
-    for i in tqdm(range(len(datalist[fold]))):
-        label_path = os.path.join(data_root, datalist[fold][i]['label'])
-        basename = os.path.basename(label_path)
-        label_nifti = nib.load(label_path)
-        label_data = label_nifti.get_fdata().astype(np.uint8)
-        
-        eroded_label_data = erosion_transform(label_data)
-        eroded_label_nifti = nib.Nifti1Image(eroded_label_data, affine=label_nifti.affine)
-        
-        nib.save(eroded_label_nifti, os.path.join(save_root, basename))
-    
-
-#%%
-
-
-
-
-
-
-#%%
-
-
-
-
-
-#%%
-
-
-
-
-
-
-#%%
\ No newline at end of file
+from custom.binary_erosion import BinaryErosion
+
+def collect_cases(
+    datalist_path: str,
+    data_root: str,
+    output_dir: str,
+    folds: List[str],
+    label_key: str
+) -> List[Tuple[str, str]]:
+    with open(datalist_path, "r") as f:
+        datalist = json.load(f)
+
+    cases = []
+    for fold in folds:
+        for item in datalist.get(fold, []):
+            if label_key not in item:
+                continue
+            label_path = os.path.join(data_root, item[label_key])
+            output_path = os.path.join(output_dir, os.path.basename(label_path))
+            cases.append((label_path, output_path))
+    return cases
+
+def is_up_to_date(label_path: str, output_path: str) -> bool:
+    return (
+        os.path.exists(output_path)
+        and os.path.getmtime(output_path) >= os.path.getmtime(label_path)
+    )
+
+def erode_case(
+    label_path: str,
+    output_path: str,
+    iterations: int,
+    dtype: Optional[str],
+    per_label: bool = False
+) -> Dict[str, float]:
+    timings = {}
+
+    start = time.perf_counter()
+    label_nifti = nib.load(label_path)
+    # Read the voxels in their on-disk dtype instead of the float64 copy of
+    # `get_fdata`, labels are stored without intensity scaling
+    label_data = np.asanyarray(label_nifti.dataobj)
+    if dtype is not None:
+        label_data = label_data.astype(dtype, copy=False)
+    timings["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    eroded_label_data = BinaryErosion(iterations=iterations, per_label=per_label)(label_data)
+    timings["erode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    header = label_nifti.header.copy()
+    header.set_data_dtype(eroded_label_data.dtype)
+    eroded_label_nifti = nib.Nifti1Image(eroded_label_data, affine=label_nifti.affine, header=header)
+    # Write to a temporary file first so an interrupted run never leaves a
+    # truncated output that looks up to date
+    tmp_path = os.path.join(
+        os.path.dirname(output_path), f".tmp.{os.getpid()}.{os.path.basename(output_path)}"
+    )
+    nib.save(eroded_label_nifti, tmp_path)
+    os.replace(tmp_path, output_path)
+    timings["write"] = time.perf_counter() - start
+
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply binary erosion to the labels of a datalist in parallel."
+    )
+    parser.add_argument("--datalist", required=True, help="Path to the datalist json.")
+    parser.add_argument("--data_root", required=True, help="Root directory of the paths in the datalist.")
+    parser.add_argument("--output_dir", required=True, help="Directory to save the eroded labels.")
+    parser.add_argument("--folds", nargs="+", default=["training", "validation", "testing"])
+    parser.add_argument("--label_key", default="label")
+    parser.add_argument("--iterations", type=int, default=2)
+    parser.add_argument(
+        "--dtype", default="none",
+        help="Dtype to cast the labels to after reading, 'none' keeps the on-disk dtype. "
+             "Label values that do not fit the dtype wrap around, e.g. 256 becomes 0 with uint8."
+    )
+    parser.add_argument(
+        "--per_label", action="store_true",
+        help="Erode every label value separately and keep the label values, instead of the foreground."
+    )
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count())
+    parser.add_argument("--overwrite", action="store_true", help="Re-erode cases whose output is up to date.")
+    args = parser.parse_args()
+
+    dtype = None if args.dtype.lower() == "none" else args.dtype
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    cases = collect_cases(
+        args.datalist, args.data_root, args.output_dir, args.folds, args.label_key
+    )
+    todo = [
+        (label_path, output_path) for label_path, output_path in cases
+        if args.overwrite or not is_up_to_date(label_path, output_path)
+    ]
+    print(f"{len(cases)} cases, {len(cases) - len(todo)} up to date, {len(todo)} to erode")
+
+    start = time.perf_counter()
+    totals = {"read": 0.0, "erode": 0.0, "write": 0.0}
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        futures = {
+            executor.submit(
+                erode_case, label_path, output_path, args.iterations, dtype, args.per_label
+            ): label_path
+            for label_path, output_path in todo
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            label_path = futures[future]
+            try:
+                timings = future.result()
+            except Exception as e:
+                failed.append(label_path)
+                print(f"[{i}/{len(todo)}] {label_path} failed: {e}")
+                continue
+            for k, v in timings.items():
+                totals[k] += v
+            print(
+                f"[{i}/{len(todo)}] {os.path.basename(label_path)} "
+                f"read {timings['read']:.2f} s, erode {timings['erode']:.2f} s, write {timings['write']:.2f} s"
+            )
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Eroded {len(todo) - len(failed)} cases in {elapsed:.1f} s with {args.num_workers} workers "
+        f"(total read {totals['read']:.1f} s, erode {totals['erode']:.1f} s, write {totals['write']:.1f} s)"
+    )
+    if failed:
+        raise SystemExit(f"{len(failed)} cases failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import time
+
+import torch
+from config_utils import build_component, load_config
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark sliding window inference throughput per memory format."
+    )
+    parser.add_argument("--config", required=True, help="Training or inference config.")
+    parser.add_argument(
+        "--custom_dir", default=".",
+        help="Directory to import the model from, e.g. the project root or FL custom dir."
+    )
+    parser.add_argument(
+        "--memory_formats", nargs="+", default=["contiguous", "channels_last_3d"]
+    )
+    parser.add_argument("--roi_size", type=int, nargs="+", default=None,
+                        help="Overwrite the roi_size of the inferer in the config.")
+    parser.add_argument("--volume_size", type=int, nargs="+", default=None,
+                        help="Input volume size, defaults to roi_size (one window).")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.custom_dir))
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    config = load_config(args.config)
+    components = config["workflow"]["components"]
+
+    inferer_args = {}
+    if args.roi_size is not None:
+        inferer_args["roi_size"] = args.roi_size
+    inferer = build_component(components["inferer"], "monai.inferers", **inferer_args)
+    roi_size = list(inferer.roi_size)
+    volume_size = args.volume_size or roi_size
+
+    in_channels = components["model"]["args"]["in_channels"]
+    x = torch.randn(1, in_channels, *volume_size)
+    num_voxels = x[0, 0].numel()
+
+    print(f"roi_size: {roi_size}, volume_size: {volume_size}, threads: {torch.get_num_threads()}")
+    for memory_format in args.memory_formats:
+        model = build_component(
+            components["model"], "monai.networks.nets", memory_format=memory_format
+        )
+        model.eval()
+
+        num_windows = 0
+        def network(patch):
+            nonlocal num_windows
+            num_windows += patch.shape[0]
+            return model(patch)
+
+        with torch.no_grad():
+            inferer(x, network)
+            num_windows = 0
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                inferer(x, network)
+            elapsed = (time.perf_counter() - start) / args.repeats
+
+        print(
+            f"{memory_format:<18}{elapsed:>8.2f} s/volume"
+            f"{num_windows / args.repeats / elapsed:>8.2f} windows/s"
+            f"{num_voxels / elapsed / 1e6:>8.2f} Mvoxels/s"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import nibabel as nib
+import torch
+from monai.data.meta_tensor import MetaTensor
+from monai.transforms import LoadImaged, EnsureChannelFirstd
+
+def legacy_save(data, keys, meta_keys):
+    # The previous SaveMeta
+    d = dict(data)
+    for key, meta_key in zip(keys, meta_keys):
+        d[meta_key] = dict(d[key].meta)
+    return d
+
+def legacy_restore(data, keys, meta_keys):
+    # The previous RestoreMeta, builds a new MetaTensor with a deep copy of the metadata
+    d = dict(data)
+    for key, meta_key in zip(keys, meta_keys):
+        d[key] = MetaTensor(d[key], meta=d[meta_key])
+    return d
+
+def load_sample(shape, tmp_dir):
+    # Metadata exactly as produced by LoadImaged on a NIfTI file
+    for key in ("image", "label"):
+        nib.save(
+            nib.Nifti1Image(np.zeros(shape, dtype=np.float32), np.diag([0.8, 0.8, 2.5, 1.0])),
+            os.path.join(tmp_dir, f"{key}.nii.gz")
+        )
+    loader = LoadImaged(keys=["image", "label"], image_only=True)
+    channel = EnsureChannelFirstd(keys=["image", "label"])
+    return channel(loader({k: os.path.join(tmp_dir, f"{k}.nii.gz") for k in ("image", "label")}))
+
+def run(sample, save, restore, num_samples, out_channels):
+    keys = ["image", "label"]
+    meta_keys = ["image_meta_dict", "label_meta_dict"]
+    preds = torch.zeros(out_channels, *sample["image"].shape[1:])
+
+    t_save = t_restore = 0.0
+    for _ in range(num_samples):
+        start = time.perf_counter()
+        d = save(sample, keys, meta_keys)
+        t_save += time.perf_counter() - start
+
+        # Predictions and labels come out of the workflow without metadata
+        d["preds"] = preds
+        d["label"] = d["label"].as_tensor()
+
+        start = time.perf_counter()
+        restore(d, ["preds", "label"], meta_keys)
+        t_restore += time.perf_counter() - start
+    return t_save / num_samples, t_restore / num_samples
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the per-sample overhead of SaveMeta/RestoreMeta in a validation loop."
+    )
+    parser.add_argument(
+        "--custom_dir", default="..",
+        help="Directory to import custom.meta from, e.g. the project root."
+    )
+    parser.add_argument("--shape", type=int, nargs=3, default=[256, 256, 96])
+    parser.add_argument("--out_channels", type=int, default=3)
+    parser.add_argument("--num_samples", type=int, default=200)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.custom_dir))
+    from custom.meta import RestoreMeta, SaveMeta
+
+    save_meta = SaveMeta(["image", "label"], ["image_meta_dict", "label_meta_dict"])
+    restore_meta = RestoreMeta(["preds", "label"], ["image_meta_dict", "label_meta_dict"])
+
+    def sidecar_save(data, keys, meta_keys):
+        return save_meta(data)
+
+    def sidecar_restore(data, keys, meta_keys):
+        return restore_meta(data)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample = load_sample(args.shape, tmp_dir)
+
+    print(f"{len(sample['image'].meta)} metadata keys per image, {args.num_samples} samples")
+    print(f"{'':<10}{'save':>12}{'restore':>12}")
+    results = {}
+    for name, save, restore in [
+        ("legacy", legacy_save, legacy_restore),
+        ("sidecar", sidecar_save, sidecar_restore)
+    ]:
+        results[name] = run(sample, save, restore, args.num_samples, args.out_channels)
+        t_save, t_restore = results[name]
+        print(f"{name:<10}{t_save * 1e6:>9.1f} us{t_restore * 1e6:>9.1f} us")
+
+    legacy, sidecar = sum(results["legacy"]), sum(results["sidecar"])
+    print(f"Per-sample overhead: {legacy * 1e6:.1f} us -> {sidecar * 1e6:.1f} us ({legacy / sidecar:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from typing import List, Optional, Sequence, Union
+
+import torch
+import torch.nn.functional as F
+from torch.nn.modules.loss import _Loss
+
+__all__ = ["DeepSupervisionDiceCELoss"]
+
+class DeepSupervisionDiceCELoss(_Loss):
+    """
+    Dice + cross entropy loss of all the deep supervision heads in one call.
+
+    Computes the same value as the weighted sum of MONAI `DiceCELoss` over the
+    heads, but the heads of the same size are evaluated together: the label
+    is prepared once per size, the Dice terms are gathered at the label
+    instead of multiplied with a one-hot label, and the head weights are
+    applied as a tensor. Heads at lower resolution get the label downsampled
+    by strided slicing like `MultiScaleDeepSupervisionLoss`.
+
+    Args:
+        include_background: include the first channel in the Dice loss.
+        to_onehot_y: the label is given as class indices with one channel.
+            Labels with one channel are always treated as class indices.
+        sigmoid: apply a sigmoid to the predictions for the Dice loss.
+        softmax: apply a softmax to the predictions for the Dice loss.
+        squared_pred: use squared predictions in the Dice denominator.
+        jaccard: compute the Jaccard index (soft IoU) instead of Dice.
+        reduction: "mean" or "sum" over the batch and classes of every head.
+        smooth_nr: a small constant added to the numerator to avoid zero.
+        smooth_dr: a small constant added to the denominator to avoid nan.
+        batch: sum the Dice terms over the batch before the division.
+        ce_weight: class weights of the cross entropy loss, also applied to
+            the per-class Dice loss like the `weight` of MONAI `DiceCELoss`.
+        lambda_dice: weight of the Dice loss.
+        lambda_ce: weight of the cross entropy loss.
+        weight_mode: head weights if none are given, "same", "exp" (halved
+            for every head, at least 0.0625) or "two" (1.0 for the first
+            head, 0.5 for the others), like MONAI `DeepSupervisionLoss`.
+        weights: head weights, overrides `weight_mode`.
+    """
+    def __init__(
+        self,
+        include_background: bool = True,
+        to_onehot_y: bool = False,
+        sigmoid: bool = False,
+        softmax: bool = False,
+        squared_pred: bool = False,
+        jaccard: bool = False,
+        reduction: str = "mean",
+        smooth_nr: float = 1e-5,
+        smooth_dr: float = 1e-5,
+        batch: bool = False,
+        ce_weight: Optional[torch.Tensor] = None,
+        lambda_dice: float = 1.0,
+        lambda_ce: float = 1.0,
+        weight_mode: str = "exp",
+        weights: Optional[Sequence[float]] = None
+    ):
+        super().__init__(reduction=reduction)
+        if reduction not in ("mean", "sum"):
+            raise ValueError(f"Unsupported reduction: {reduction}, available options are ['mean', 'sum'].")
+        if sigmoid and softmax:
+            raise ValueError("Incompatible values: sigmoid=True and softmax=True.")
+        if weight_mode not in ("same", "exp", "two"):
+            raise ValueError(f"Unsupported weight_mode: {weight_mode}.")
+        if lambda_dice < 0.0 or lambda_ce < 0.0:
+            raise ValueError("lambda_dice and lambda_ce should be no less than 0.0.")
+
+        self.include_background = include_background
+        self.to_onehot_y = to_onehot_y
+        self.sigmoid = sigmoid
+        self.softmax = softmax
+        self.squared_pred = squared_pred
+        self.jaccard = jaccard
+        self.smooth_nr = float(smooth_nr)
+        self.smooth_dr = float(smooth_dr)
+        self.batch = batch
+        self.lambda_dice = lambda_dice
+        self.lambda_ce = lambda_ce
+        self.weight_mode = weight_mode
+        self.weights = weights
+
+        if ce_weight is not None:
+            ce_weight = torch.as_tensor(ce_weight, dtype=torch.float)
+        self.register_buffer("ce_weight", ce_weight, persistent=False)
+
+    def get_weights(self, levels: int) -> List[float]:
+        if self.weights is not None:
+            weights = list(self.weights)[:levels]
+            return weights + [0.0] * (levels - len(weights))
+        if self.weight_mode == "same":
+            return [1.0] * levels
+        if self.weight_mode == "exp":
+            return [max(0.5**l, 0.0625) for l in range(levels)]
+        return [1.0 if l == 0 else 0.5 for l in range(levels)]
+
+    @staticmethod
+    def downsample_target(target: torch.Tensor, size: Sequence[int]) -> torch.Tensor:
+        full_size = target.shape[2:]
+        if tuple(size) == tuple(full_size):
+            return target
+        if all(f % s == 0 for f, s in zip(full_size, size)):
+            # Same voxels as nearest-exact interpolation, without a copy
+            index = [slice(None), slice(None)]
+            for f, s in zip(full_size, size):
+                step = f // s
+                index.append(slice(step // 2, None, step))
+            return target[tuple(index)]
+        return F.interpolate(target.float(), size=tuple(size), mode="nearest-exact")
+
+    def heads_loss(self, input: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+        """
+        Return the Dice + CE loss of every head of `input` (B, H, C, ...)
+        with the `target` (B, 1, ...) of class indices or (B, C, ...) of
+        one-hot labels, as a tensor of shape (H,).
+        """
+        num_classes = input.shape[2]
+        if target.shape[1] == 1 and num_classes > 1:
+            if not self.to_onehot_y:
+                raise ValueError(
+                    f"Target of shape {tuple(target.shape)} is not one-hot encoded, set to_onehot_y=True."
+                )
+            labels = target.long()
+            onehot = None
+        elif target.shape[1] == num_classes:
+            labels = None
+            onehot = target.to(input.dtype)
+        else:
+            raise ValueError(
+                "number of channels for target is neither 1 (without one-hot encoding) nor the same as input, "
+                f"got shape {tuple(input.shape)} and {tuple(target.shape)}."
+            )
+        if num_classes == 1:
+            raise ValueError("Single channel predictions are not supported, use MONAI DiceCELoss per head.")
+
+        logp = F.log_softmax(input, dim=2)
+        if self.softmax:
+            probs = logp.exp()
+        elif self.sigmoid:
+            probs = torch.sigmoid(input)
+        else:
+            probs = input
+
+        spatial = tuple(range(3, input.ndim))
+        if self.squared_pred:
+            pred_o = (probs * probs).sum(dim=spatial)
+        else:
+            pred_o = probs.sum(dim=spatial)
+
+        num_heads = input.shape[1]
+        if labels is not None:
+            # Gather the predictions at the label and sum them per class
+            # instead of multiplying with a one-hot label
+            index = labels.unsqueeze(1).expand(-1, num_heads, -1, *labels.shape[2:])
+            logp_y = logp.gather(2, index).flatten(2)
+            flat_index = index.flatten(2)
+            intersection = torch.zeros_like(pred_o).scatter_add_(
+                2, flat_index, probs.gather(2, index).flatten(2)
+            )
+            flat_labels = labels.flatten(1)
+            ground_o = torch.zeros(
+                labels.shape[0], num_classes, dtype=pred_o.dtype, device=pred_o.device
+            ).scatter_add_(1, flat_labels, torch.ones_like(flat_labels, dtype=pred_o.dtype)).unsqueeze(1)
+        else:
+            onehot = onehot.unsqueeze(1)
+            intersection = (probs * onehot).sum(dim=spatial)
+            ground_o = onehot.sum(dim=spatial)
+
+        if not self.include_background:
+            intersection = intersection[:, :, 1:]
+            pred_o = pred_o[:, :, 1:]
+            ground_o = ground_o[:, :, 1:]
+        if self.batch:
+            intersection = intersection.sum(dim=0, keepdim=True)
+            pred_o = pred_o.sum(dim=0, keepdim=True)
+            ground_o = ground_o.sum(dim=0, keepdim=True)
+
+        denominator = pred_o + ground_o
+        if self.jaccard:
+            denominator = 2.0 * (denominator - intersection)
+        dice = 1.0 - (2.0 * intersection + self.smooth_nr) / (denominator + self.smooth_dr)
+        if self.ce_weight is not None:
+            # MONAI `DiceCELoss` weights the Dice loss of every class too
+            dice_weight = self.ce_weight if self.include_background else self.ce_weight[1:]
+            if dice_weight.shape[0] != dice.shape[2]:
+                raise ValueError(
+                    f"ce_weight should have {dice.shape[2] + (0 if self.include_background else 1)} values, "
+                    f"got {self.ce_weight.shape[0]}."
+                )
+            dice = dice * dice_weight.to(dice)
+        # (B, H, C) -> (H,)
+        dice = dice.transpose(0, 1).flatten(1)
+        dice = dice.mean(dim=1) if self.reduction == "mean" else dice.sum(dim=1)
+
+        if labels is not None:
+            nll = -logp_y.transpose(0, 1).flatten(1)
+            if self.ce_weight is not None:
+                voxel_weight = self.ce_weight.to(nll)[flat_labels].flatten().unsqueeze(0)
+                nll = nll * voxel_weight
+                ce = nll.sum(dim=1) / voxel_weight.sum() if self.reduction == "mean" else nll.sum(dim=1)
+            else:
+                ce = nll.mean(dim=1) if self.reduction == "mean" else nll.sum(dim=1)
+        else:
+            # Soft targets, like `torch.nn.CrossEntropyLoss` with probabilities
+            soft = onehot if self.ce_weight is None else onehot * self.ce_weight.to(onehot).view(1, 1, -1, *([1] * len(spatial)))
+            nll = -(soft * logp).sum(dim=2).transpose(0, 1).flatten(1)
+            ce = nll.mean(dim=1) if self.reduction == "mean" else nll.sum(dim=1)
+
+        return self.lambda_dice * dice + self.lambda_ce * ce
+
+    def forward(
+        self,
+        input: Union[torch.Tensor, Sequence[torch.Tensor]],
+        target: torch.Tensor,
+        weights: Optional[Union[Sequence[float], torch.Tensor]] = None
+    ) -> torch.Tensor:
+        """
+        Args:
+            input: a single output (B, C, ...), the stacked heads (B, H, C, ...)
+                or a list of heads (B, C, ...), ordered from the full resolution.
+            target: label of shape (B, 1, ...) or (B, C, ...).
+            weights: head weights, defaults to the weights of this loss.
+        """
+        if isinstance(input, torch.Tensor) and input.ndim == target.ndim:
+            input = input.unsqueeze(1)
+
+        if isinstance(input, torch.Tensor):
+            groups = {tuple(input.shape[3:]): (list(range(input.shape[1])), input)}
+            num_heads = input.shape[1]
+        else:
+            num_heads = len(input)
+            indices = {}
+            for i, head in enumerate(input):
+                indices.setdefault(tuple(head.shape[2:]), []).append(i)
+            groups = {
+                size: (heads, torch.stack([input[i] for i in heads], dim=1))
+                for size, heads in indices.items()
+            }
+
+        if weights is None:
+            weights = self.get_weights(num_heads)
+        weights = torch.as_tensor(weights, dtype=torch.float, device=target.device)
+
+        loss = None
+        for size, (heads, stacked) in groups.items():
+            head_loss = self.heads_loss(stacked.float(), self.downsample_target(target, size))
+            group_loss = (weights[heads] * head_loss).sum()
+            loss = group_loss if loss is None else loss + group_loss
+        return loss
@@ -0,0 +1,117 @@
+from typing import Dict, Hashable, Mapping, Optional, Union
+
+import numpy as np
+import torch
+from monai.config import KeysCollection
+from monai.data import MetaTensor
+from monai.transforms import MapTransform, Transform
+from monai.utils import get_equivalent_dtype
+
+__all__ = ["LabelRemap", "LabelRemapd"]
+
+NdarrayTensor = Union[np.ndarray, torch.Tensor]
+
+class LabelRemap(Transform):
+    """
+    Remap label values with a dense lookup table.
+
+    The mapping is compiled once into a table indexed by the input label
+    value, so remapping a volume is a single fancy-indexing pass in the input
+    integer dtype instead of a Python call per voxel.
+
+    Args:
+        mapping: dict from original label values to new label values.
+        default: value for the labels missing from `mapping`. If None,
+            the missing labels are kept unchanged.
+        dtype: dtype of the output, e.g. "uint8". Defaults to the input dtype.
+            Labels of floating point dtype, e.g. from `LoadImaged`, are
+            remapped as integers.
+    """
+    def __init__(
+        self,
+        mapping: Mapping[int, int],
+        default: Optional[int] = 0,
+        dtype: Optional[Union[str, np.dtype]] = None
+    ):
+        super().__init__()
+
+        self.mapping = {int(k): int(v) for k, v in mapping.items()}
+        if any(k < 0 for k in self.mapping):
+            raise ValueError("Only non-negative labels can be remapped.")
+        self.default = default
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self._lut = self._build_lut(max(self.mapping, default=0) + 1)
+
+    def _build_lut(self, size: int) -> np.ndarray:
+        if self.default is None:
+            lut = np.arange(size, dtype=np.int64)
+        else:
+            lut = np.full(size, self.default, dtype=np.int64)
+        for k, v in self.mapping.items():
+            lut[k] = v
+        return lut
+
+    def _lut_for(self, label: NdarrayTensor) -> np.ndarray:
+        # Cover the whole input range so no bound checking is needed, uint8
+        # inputs get a table over their full range
+        if label.dtype in (np.uint8, torch.uint8):
+            size = 256
+        elif label.shape and min(label.shape) == 0:
+            size = 0
+        else:
+            if label.min() < 0:
+                raise ValueError("Only non-negative labels can be remapped.")
+            size = int(label.max()) + 1
+
+        if size > len(self._lut):
+            self._lut = self._build_lut(size)
+        return self._lut
+
+    def __call__(self, label: NdarrayTensor) -> NdarrayTensor:
+        lut = self._lut_for(label)
+
+        if isinstance(label, torch.Tensor):
+            dtype = label.dtype if self.dtype is None else get_equivalent_dtype(self.dtype, torch.Tensor)
+            lut = torch.from_numpy(lut).to(device=label.device, dtype=dtype)
+            # Integer tensors other than int64 are not valid indices, uint8
+            # would even be treated as a boolean mask
+            index = label.as_tensor() if isinstance(label, MetaTensor) else label
+            out = lut[index.long()]
+            if isinstance(label, MetaTensor):
+                out = MetaTensor(out, meta=label.meta)
+            return out
+
+        dtype = label.dtype if self.dtype is None else self.dtype
+        # Labels loaded as floats have to be cast before indexing, integer
+        # labels are used as indices in their own dtype
+        index = label if np.issubdtype(label.dtype, np.integer) else label.astype(np.int64)
+        return lut.astype(dtype)[index]
+
+class LabelRemapd(MapTransform):
+    """
+    Dictionary-based wrapper of `LabelRemap`.
+
+    Args:
+        keys: keys of the labels to remap.
+        mapping: dict from original label values to new label values.
+        default: value for the labels missing from `mapping`. If None,
+            the missing labels are kept unchanged.
+        dtype: dtype of the output. Defaults to the input dtype.
+        allow_missing_keys: don't raise exception if key is missing.
+    """
+    def __init__(
+        self,
+        keys: KeysCollection,
+        mapping: Mapping[int, int],
+        default: Optional[int] = 0,
+        dtype: Optional[Union[str, np.dtype]] = None,
+        allow_missing_keys: bool = False
+    ):
+        super().__init__(keys, allow_missing_keys)
+        self.remap = LabelRemap(mapping, default=default, dtype=dtype)
+
+    def __call__(self, data: Mapping[Hashable, NdarrayTensor]) -> Dict[Hashable, NdarrayTensor]:
+        d = dict(data)
+        for key in self.key_iterator(d):
+            d[key] = self.remap(d[key])
+        return d
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from custom.remap import LabelRemap  # noqa: E402
+from merge_labels import AMOS_MAPPING  # noqa: E402
+
+def timeit(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per-volume cost of np.vectorize and lookup-table label remapping."
+    )
+    parser.add_argument("--shape", type=int, nargs=3, default=[512, 512, 100])
+    parser.add_argument("--num_labels", type=int, default=16)
+    parser.add_argument("--dtypes", nargs="+", default=["uint8", "int16", "float64"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip_vectorize", action="store_true", help="Skip the slow np.vectorize baseline.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    volume = rng.integers(0, args.num_labels, args.shape)
+    mapping = dict(AMOS_MAPPING)
+    remap = LabelRemap(mapping, default=0, dtype="uint8")
+
+    print(f"Volume {args.shape}, {volume.size / 1e6:.1f} Mvoxels")
+    print(f"{'dtype':<10}{'vectorize':>12}{'lut':>12}{'speedup':>10}")
+    for dtype in args.dtypes:
+        seg_data = volume.astype(dtype)
+        t_lut = timeit(lambda: remap(seg_data), args.repeats)
+        out = remap(seg_data)
+
+        if args.skip_vectorize:
+            print(f"{dtype:<10}{'-':>12}{t_lut * 1000:>9.1f} ms{'-':>10}")
+            continue
+
+        # The previous implementation, every voxel is a Python call
+        vectorized = np.vectorize(lambda v: mapping.get(v, 0))
+        start = time.perf_counter()
+        ref = vectorized(seg_data).astype(np.uint8)
+        t_vec = time.perf_counter() - start
+        if not np.array_equal(ref, out):
+            raise SystemExit(f"Lookup-table remap differs from np.vectorize for {dtype}.")
+        print(f"{dtype:<10}{t_vec:>10.2f} s{t_lut * 1000:>9.1f} ms{t_vec / t_lut:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
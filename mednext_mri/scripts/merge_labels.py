@@ -1,12 +1,19 @@
-#%%
+import argparse
 import json
-from pathlib import Path
 import os
-import nibabel as nib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
 import numpy as np
-from tqdm import tqdm
+import nibabel as nib
 
-mapping = {
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from custom.remap import LabelRemap  # noqa: E402
+
+# AMOS labels merged into background, kidney, liver, pancreas and spleen
+AMOS_MAPPING = {
     0: 0,    # background
     2: 1,    # kidney
     3: 1,    # kidney
@@ -15,83 +22,98 @@ mapping = {
     1: 4     # spleen
 }
 
-for i in range(30):
-    mapping.setdefault(i, 0)
-
-mapping.setdefault(i, 0)
-
-data_root = '/neodata/hap/AMOS_MRI'
-data_list = 'datalist_mr.json' 
-data_path = os.path.join(data_root, data_list)
-
-with open(data_path, "r") as f:
-    dataset = json.load(f)
-
-#%%
-
-dataroot = Path("/neodata/hap/AMOS_MRI")
-datalist = {}
-
-for split in ["training", "validation"]:
-    datalist[split] = []
-    for case in tqdm(dataset[split]):
-        seg_name = Path(case["label"]).name
-        
-        # Convert label format
-        seg_nifti = nib.load(str(dataroot / case["label"]))
-        seg_data = np.asanyarray(seg_nifti.dataobj)
-        seg_data = np.vectorize(mapping.get)(seg_data)
-        seg_nifti = nib.Nifti1Image(seg_data.astype(np.uint8), seg_nifti.affine)
-        if split == "training":
-            nib.save(seg_nifti, f"/neodata/hap/AMOS_MRI/labelsTr/{seg_name}")
-        else:
-            nib.save(seg_nifti, f"/neodata/hap/AMOS_MRI/labelsVa/{seg_name}")
-
-#%%
-
-import nibabel as nib
-import numpy as np
-import os
-
-data_root = '/neodata/hap/AMOS_MRI'
-#file_name = 'labelsTr/amos_0507.nii.gz'
-file_name = 'labelsVa/amos_0544.nii.gz'
-
-file_path = os.path.join(data_root, file_name)
-
-nii = nib.load(file_path)
-nii_data = nii.get_fdata()
-
-#%%
-
-nii_data.shape
-#%%
-
-nii_data
-
-#%%
-
-np.unique(nii_data)
-
-
-#%%
-
-import json
-json_path = '/home/u/qqaazz800624/manafaln/mednext_mri/AMOS22/dataset.json'
-
-with open(json_path) as f:
-    data = json.load(f)
-
-data
-
-
-#%%
-
-
-
-
-
-
-
-
-#%%
\ No newline at end of file
+def load_mapping(mapping: str) -> Dict[int, int]:
+    if mapping is None:
+        return AMOS_MAPPING
+    if os.path.exists(mapping):
+        with open(mapping, "r") as f:
+            mapping = f.read()
+    return {int(k): int(v) for k, v in json.loads(mapping).items()}
+
+def collect_cases(
+    datalist_path: str,
+    data_root: str,
+    splits: List[str],
+    output_dirs: List[str],
+    label_key: str
+) -> List[Tuple[str, str]]:
+    with open(datalist_path, "r") as f:
+        datalist = json.load(f)
+
+    cases = []
+    for split, output_dir in zip(splits, output_dirs):
+        os.makedirs(output_dir, exist_ok=True)
+        for item in datalist[split]:
+            label_path = os.path.join(data_root, item[label_key])
+            cases.append((label_path, os.path.join(output_dir, os.path.basename(label_path))))
+    return cases
+
+def remap_case(label_path: str, output_path: str, remap: LabelRemap) -> Dict[str, float]:
+    timings = {}
+
+    start = time.perf_counter()
+    seg_nifti = nib.load(label_path)
+    seg_data = np.asanyarray(seg_nifti.dataobj)
+    timings["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seg_data = remap(seg_data)
+    timings["remap"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    nib.save(nib.Nifti1Image(seg_data, seg_nifti.affine), output_path)
+    timings["write"] = time.perf_counter() - start
+
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the labels of a datalist with a lookup table.")
+    parser.add_argument("--datalist", required=True, help="Path to the datalist json.")
+    parser.add_argument("--data_root", required=True, help="Root directory of the paths in the datalist.")
+    parser.add_argument("--splits", nargs="+", default=["training", "validation"])
+    parser.add_argument(
+        "--output_dirs", nargs="+", required=True,
+        help="Output directory of each split, e.g. labelsTr labelsVa."
+    )
+    parser.add_argument("--label_key", default="label")
+    parser.add_argument(
+        "--mapping", default=None,
+        help="JSON string or file of {old: new} labels, defaults to the AMOS organ mapping."
+    )
+    parser.add_argument("--default", type=int, default=0, help="Value of the labels missing from the mapping.")
+    parser.add_argument("--dtype", default="uint8")
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if len(args.splits) != len(args.output_dirs):
+        raise ValueError("The number of `splits` and `output_dirs` must be the same.")
+
+    remap = LabelRemap(load_mapping(args.mapping), default=args.default, dtype=args.dtype)
+    cases = collect_cases(
+        args.datalist, args.data_root, args.splits, args.output_dirs, args.label_key
+    )
+
+    start = time.perf_counter()
+    totals = {"read": 0.0, "remap": 0.0, "write": 0.0}
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        futures = {
+            executor.submit(remap_case, label_path, output_path, remap): label_path
+            for label_path, output_path in cases
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            timings = future.result()
+            for k, v in timings.items():
+                totals[k] += v
+            print(
+                f"[{i}/{len(cases)}] {os.path.basename(futures[future])} "
+                f"read {timings['read']:.2f} s, remap {timings['remap']:.3f} s, write {timings['write']:.2f} s"
+            )
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Remapped {len(cases)} cases in {elapsed:.1f} s with {args.num_workers} workers "
+        f"(total read {totals['read']:.1f} s, remap {totals['remap']:.1f} s, write {totals['write']:.1f} s)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import torch
+from monai.data import CacheDataset, DataLoader, decollate_batch, list_data_collate
+from ruamel.yaml import YAML
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from custom.meta import MetaSidecarCollate, RestoreMeta  # noqa: E402
+
+def build_transforms(configs):
+    transforms = []
+    for config in configs:
+        module = importlib.import_module(config.get("path", "monai.transforms"))
+        transforms.append(getattr(module, config["name"])(**(config.get("args", {}) or {})))
+    return transforms
+
+def load_datalist(data_root, data_list, key, max_cases):
+    with open(data_list if os.path.isabs(data_list) else os.path.join(data_root, data_list)) as f:
+        items = json.load(f)[key][:max_cases]
+    return [
+        {k: os.path.join(data_root, v) if isinstance(v, str) else v for k, v in item.items()}
+        for item in items
+    ]
+
+def run(dataset, collate_fn, args):
+    loader = DataLoader(
+        dataset,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        collate_fn=collate_fn
+    )
+    restore = RestoreMeta(["preds", "label"], ["image_meta_dict", "label_meta_dict"])
+
+    t_load = t_decollate = 0.0
+    for _ in range(args.epochs):
+        start = time.perf_counter()
+        for batch in loader:
+            t_load += time.perf_counter() - start
+
+            # Predictions come out of the model without metadata
+            batch["preds"] = torch.zeros(batch["image"].shape[0], args.out_channels, *batch["image"].shape[2:])
+            start = time.perf_counter()
+            for item in decollate_batch(batch):
+                restore(item)
+            t_decollate += time.perf_counter() - start
+
+            start = time.perf_counter()
+    num_batches = args.epochs * len(loader)
+    return t_load / num_batches, t_decollate / num_batches
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the loader throughput with tensorised and sidecar SaveMeta metadata."
+    )
+    parser.add_argument("--config", default="config/config_train_t1.yaml")
+    parser.add_argument("--phase", default="validation")
+    parser.add_argument("--data_root", default=None, help="Overwrite the data_root of the config.")
+    parser.add_argument("--data_list", default=None, help="Overwrite the data_list of the config.")
+    parser.add_argument("--max_cases", type=int, default=None)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_workers", type=int, default=0)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--out_channels", type=int, default=3)
+    parser.add_argument("--strip_keys", nargs="+", default=["image", "label"])
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = YAML(typ="safe").load(f)
+    data = config["data"]
+    data_root = args.data_root or data["settings"]["data_root"]
+    data_list = args.data_list or data["settings"]["data_list"]
+    phase = data[args.phase]
+
+    # Transforms are cached, so only the collate and decollate costs differ
+    datalist = load_datalist(data_root, data_list, phase["data_list_key"], args.max_cases)
+    dataset = CacheDataset(datalist, build_transforms(phase["transforms"]), num_workers=None, progress=False)
+
+    num_keys = sum(len(dataset[0][k]) for k in ("image_meta_dict", "label_meta_dict"))
+    print(f"{len(dataset)} cases, batch size {args.batch_size}, {num_keys} metadata keys per case")
+    print(f"{'':<16}{'load':>12}{'decollate':>12}")
+
+    # The default collate, the sidecars are collated like any other dict
+    results = {"legacy": run(dataset, list_data_collate, args)}
+    results["sidecar"] = run(dataset, MetaSidecarCollate(), args)
+    results["sidecar+strip"] = run(dataset, MetaSidecarCollate(args.strip_keys), args)
+
+    for name, (t_load, t_decollate) in results.items():
+        print(f"{name:<16}{t_load * 1e3:>9.2f} ms{t_decollate * 1e3:>9.2f} ms")
+    legacy = sum(results["legacy"])
+    for name in ("sidecar", "sidecar+strip"):
+        total = sum(results[name])
+        print(f"{name}: {legacy * 1e3:.2f} ms -> {total * 1e3:.2f} ms per batch ({legacy / total:.1f}x)")
+
+if __name__ == "__main__":
+    main()
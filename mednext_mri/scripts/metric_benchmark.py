@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+import torch
+from monai.metrics import DiceMetric
+from monai.transforms import AsDiscreted, SplitDimd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from custom.metrics import ConfusionMatrixMetric  # noqa: E402
+
+def onehot_split_dice(cases, num_classes, class_names):
+    # The previous validation chain, one-hot + split + one DiceMetric per output
+    post = [
+        AsDiscreted(keys=["preds", "label"], to_onehot=[num_classes, num_classes], dim=0),
+        SplitDimd(keys=["preds", "label"], dim=0, output_postfixes=class_names, update_meta=False)
+    ]
+    metrics = {"": DiceMetric(include_background=False)}
+    metrics.update({f"_{name}": DiceMetric(include_background=False) for name in class_names[1:]})
+    for case in cases:
+        d = dict(case)
+        for t in post:
+            d = t(d)
+        for postfix, metric in metrics.items():
+            metric(d["preds" + postfix][None], d["label" + postfix][None])
+    return [m.aggregate() for m in metrics.values()]
+
+def confusion_matrix_dice(cases, num_classes, class_names):
+    metric = ConfusionMatrixMetric(num_classes, per_class=True)
+    for case in cases:
+        metric(case["preds"], case["label"])
+    return metric.aggregate()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the one-hot + SplitDimd + DiceMetric chain with the confusion matrix metric."
+    )
+    parser.add_argument("--shape", type=int, nargs=3, default=[256, 256, 128])
+    parser.add_argument("--class_names", nargs="+", default=["background", "pancreas", "pancreas_tumor"])
+    parser.add_argument("--num_cases", type=int, default=4)
+    args = parser.parse_args()
+
+    num_classes = len(args.class_names)
+    cases = []
+    for _ in range(args.num_cases):
+        label = torch.randint(0, num_classes, (1, *args.shape))
+        logits = torch.randn(num_classes, *args.shape)
+        # Mostly correct predictions
+        logits.scatter_add_(0, label, torch.full(label.shape, 1.5))
+        # Both chains start after the argmax of the predictions
+        preds = AsDiscreted(keys=["preds"], argmax=True, dim=0)({"preds": logits})["preds"]
+        cases.append({"preds": preds, "label": label.float()})
+
+    print(f"{args.num_cases} cases of {args.shape}, {num_classes} classes")
+    results = {}
+    for name, fn in [("one-hot + split", onehot_split_dice), ("confusion matrix", confusion_matrix_dice)]:
+        start = time.perf_counter()
+        results[name] = fn(cases, num_classes, args.class_names)
+        elapsed = (time.perf_counter() - start) / args.num_cases
+        print(f"{name:<18}{elapsed * 1e3:>9.1f} ms/case")
+
+    for ref, out in zip(*results.values()):
+        if not torch.allclose(ref.float(), out.float(), atol=1e-5):
+            raise SystemExit(f"Confusion matrix Dice {out} differs from DiceMetric {ref}.")
+    labels = ["mean", *args.class_names[1:]]
+    print("Dice: " + ", ".join(f"{l} {v.item():.4f}" for l, v in zip(labels, results["confusion matrix"])))
+
+if __name__ == "__main__":
+    main()
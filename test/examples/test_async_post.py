@@ -0,0 +1,45 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "examples", "MultiOrganBaseline", "Spleen", "custom"))
+from async_post import AsyncPostProcessor  # noqa: E402
+
+def post_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("post")]
+
+def slow_square(x):
+    time.sleep(0.01)
+    if x < 0:
+        raise ValueError("negative")
+    return x * x
+
+def test_results_in_order():
+    pool = AsyncPostProcessor(slow_square, num_workers=2)
+    ready = []
+    for i in range(10):
+        ready.extend(pool.submit(i))
+    ready.extend(pool.shutdown())
+    assert ready == [i * i for i in range(10)]
+    assert not post_threads()
+
+def test_shutdown_after_error_stops_workers():
+    pool = AsyncPostProcessor(slow_square, num_workers=2, max_pending=8)
+    for i in [1, -1, 2, 3]:
+        pool.submit(i)
+    with pytest.raises(ValueError):
+        pool.shutdown()
+    assert not pool.pending
+    assert not post_threads()
+
+def test_close_cancels_pending_items():
+    pool = AsyncPostProcessor(slow_square, num_workers=1, max_pending=100)
+    for i in range(50):
+        pool.submit(i)
+    futures = list(pool.pending)
+    pool.close()
+    assert any(f.cancelled() for f in futures)
+    assert not post_threads()
@@ -0,0 +1,33 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, os.path.join(ROOT, "examples", "FL", "client", "custom"))
+from memory import read_rss_mb, reset_peak_rss  # noqa: E402
+
+def test_copies_are_identical():
+    # Every custom dir is deployed on its own and keeps a copy
+    copies = glob.glob(os.path.join(ROOT, "examples", "**", "custom", "memory.py"), recursive=True)
+    assert len(copies) == 9
+    contents = {open(path).read() for path in copies}
+    assert len(contents) == 1
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_read_rss_mb():
+    reset_peak_rss()
+    rss = read_rss_mb()
+    peak = read_rss_mb("VmHWM")
+    assert rss > 0
+    assert peak >= rss
+
+    # Grow the RSS by about 64 MB
+    data = bytearray(64 * 2**20)
+    data[::4096] = b"\x01" * len(data[::4096])
+    assert read_rss_mb("VmHWM") >= peak + 32
+    del data
+
+def test_unknown_key():
+    assert read_rss_mb("VmUnknown") is None
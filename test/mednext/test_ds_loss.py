@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+import torch
+from monai.losses import DeepSupervisionLoss, DiceCELoss
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mednext"))
+from custom.ds_loss import DeepSupervisionDiceCELoss  # noqa: E402
+from custom.losses import DsDiceCELoss, MultiScaleDeepSupervisionLoss  # noqa: E402
+
+def reference_loss(heads, label, **kwargs):
+    ce_weight = kwargs.pop("ce_weight", None)
+    loss = DiceCELoss(weight=ce_weight, **kwargs)
+    return MultiScaleDeepSupervisionLoss(loss)(heads, label)
+
+@pytest.mark.parametrize("ce_weight", [None, [0.2, 1.0, 3.0]])
+@pytest.mark.parametrize("include_background", [True, False])
+@pytest.mark.parametrize("batch", [False, True])
+def test_ds_dice_ce_parity(ce_weight, include_background, batch):
+    torch.manual_seed(0)
+    heads = [
+        torch.randn(2, 3, 16, 16, 16, requires_grad=True),
+        torch.randn(2, 3, 8, 8, 8, requires_grad=True),
+        torch.randn(2, 3, 4, 4, 4, requires_grad=True)
+    ]
+    label = torch.randint(0, 3, (2, 1, 16, 16, 16))
+    kwargs = dict(
+        include_background=include_background,
+        to_onehot_y=True,
+        softmax=True,
+        batch=batch,
+        ce_weight=None if ce_weight is None else torch.tensor(ce_weight)
+    )
+
+    expected = reference_loss(heads, label, **kwargs)
+    expected_grads = torch.autograd.grad(expected, heads)
+
+    loss_fn = DsDiceCELoss(**kwargs)
+    assert isinstance(loss_fn, DeepSupervisionDiceCELoss)
+    out = loss_fn(heads, label)
+    grads = torch.autograd.grad(out, heads)
+
+    torch.testing.assert_close(out, expected, rtol=1e-5, atol=1e-5)
+    for g, e in zip(grads, expected_grads):
+        torch.testing.assert_close(g, e, rtol=1e-4, atol=1e-6)
+
+def test_ds_dice_ce_weight_size():
+    loss_fn = DeepSupervisionDiceCELoss(to_onehot_y=True, softmax=True, ce_weight=[1.0, 2.0])
+    with pytest.raises(ValueError):
+        loss_fn(torch.randn(1, 3, 4, 4, 4), torch.randint(0, 3, (1, 1, 4, 4, 4)))
+
+@pytest.mark.parametrize("interp_mode", ["nearest-exact", "nearest", "area"])
+def test_multi_scale_interp_mode(interp_mode):
+    torch.manual_seed(0)
+    heads = [torch.randn(2, 3, 16, 16, 16), torch.randn(2, 3, 8, 8, 8), torch.randn(2, 3, 4, 4, 4)]
+    # A float target, e.g. soft labels, so every mode gives a different target
+    target = torch.rand(2, 3, 16, 16, 16)
+    loss = DiceCELoss(softmax=True)
+
+    reference = DeepSupervisionLoss(loss)
+    reference.interp_mode = interp_mode
+    out = MultiScaleDeepSupervisionLoss(loss, interp_mode=interp_mode)(heads, target)
+    torch.testing.assert_close(out, reference(heads, target))
@@ -0,0 +1,83 @@
+import copy
+import os
+import sys
+
+import pytest
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mednext"))
+from custom.mednext import MedNeXtBlock, mednext_small, quantize_dynamic_int8  # noqa: E402
+
+def randomize_norms(model):
+    # Freshly initialized GroupNorm is an identity affine, perturb it so the
+    # folded scale & shift are actually exercised
+    for m in model.modules():
+        if isinstance(m, torch.nn.GroupNorm):
+            torch.nn.init.normal_(m.weight, 1.0, 0.2)
+            torch.nn.init.normal_(m.bias, 0.0, 0.2)
+
+@pytest.mark.parametrize("spatial_dims", [2, 3])
+@pytest.mark.parametrize("tile_size", [None, 100])
+def test_fused_inference_parity(spatial_dims, tile_size):
+    torch.manual_seed(0)
+    model = mednext_small(spatial_dims, 1, 3, filters=8)
+    randomize_norms(model)
+    model.eval()
+    fused = copy.deepcopy(model)
+    fused.fuse_for_inference(tile_size or 4096)
+
+    x = torch.randn(2, 1, *[32] * spatial_dims)
+    with torch.no_grad():
+        torch.testing.assert_close(fused(x), model(x), rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize("offset", [0.0, 1e3])
+def test_fused_block_large_mean(offset):
+    # Activations with a large mean and a small variance
+    torch.manual_seed(0)
+    block = MedNeXtBlock(3, 4, 4, expand_ratio=2, kernel_size=3).eval()
+    randomize_norms(block)
+    # Identity depthwise conv, so the norm sees the input statistics
+    with torch.no_grad():
+        block.layers.conv1.weight.zero_()
+        block.layers.conv1.weight[:, :, 1, 1, 1] = 1.0
+        block.layers.conv1.bias.zero_()
+    x = offset + 0.01 * torch.randn(1, 4, 16, 16, 16)
+    with torch.no_grad():
+        expected = block(x)
+        block.fuse_for_inference(1000)
+        out = block(x)
+    torch.testing.assert_close(out, expected, rtol=1e-4, atol=1e-3)
+
+def test_fused_model_cannot_be_scripted():
+    model = mednext_small(3, 1, 3, filters=8).eval()
+    x = torch.randn(1, 1, 32, 32, 32)
+    with torch.no_grad():
+        torch.testing.assert_close(torch.jit.script(model)(x), model(x))
+
+    model.fuse_for_inference()
+    with pytest.raises(RuntimeError, match="scripted"):
+        torch.jit.script(model)
+
+def test_quantize_int8_option():
+    torch.manual_seed(0)
+    float_model = mednext_small(2, 1, 3, filters=8)
+    randomize_norms(float_model)
+    model = mednext_small(2, 1, 3, filters=8, quantize_int8=True)
+    # The float32 checkpoint still loads, quantization waits for inference
+    model.load_state_dict(float_model.state_dict())
+
+    x = torch.randn(1, 1, 32, 32)
+    model.train()
+    model(x)
+    assert model.int8_pending
+
+    model.eval()
+    with torch.no_grad():
+        y = model(x)
+        expected = quantize_dynamic_int8(float_model)(x)
+    assert not model.int8_pending
+    torch.testing.assert_close(y, expected)
+
+def test_quantize_int8_rejects_other_options():
+    with pytest.raises(ValueError):
+        mednext_small(2, 1, 3, filters=8, quantize_int8=True, fuse_for_inference=True)
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+import torch
+from monai.data import MetaTensor, decollate_batch, list_data_collate
+from torch.utils.data._utils.collate import default_collate_fn_map
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mednext"))
+from custom.meta import (  # noqa: E402
+    MetaSidecar,
+    MetaSidecarBatch,
+    MetaSidecarCollate,
+    RestoreMeta,
+    SaveMeta
+)
+
+def make_item(index):
+    affine = torch.eye(4, dtype=torch.float64) * (index + 1)
+    image = MetaTensor(torch.rand(1, 4, 4, 4), affine=affine, meta={"filename_or_obj": f"case_{index}.nii.gz"})
+    item = {"image": image, "label": torch.zeros(1, 4, 4, 4)}
+    return SaveMeta(["image"], ["image_meta_dict"])(item)
+
+def test_no_global_collate_registration():
+    assert MetaSidecar not in default_collate_fn_map
+    # The default collate still batches the sidecars like plain dicts
+    batch = list_data_collate([make_item(i) for i in range(2)])
+    assert not isinstance(batch["image_meta_dict"], MetaSidecarBatch)
+
+@pytest.mark.parametrize("strip_keys", [None, ["image"]])
+def test_collate_round_trip(strip_keys):
+    items = [make_item(i) for i in range(3)]
+    batch = MetaSidecarCollate(strip_keys)(items)
+    assert isinstance(batch["image_meta_dict"], MetaSidecarBatch)
+    assert batch["image"].shape == (3, 1, 4, 4, 4)
+    assert isinstance(batch["image"], MetaTensor) == (strip_keys is None)
+
+    batch["preds"] = torch.zeros(3, 2, 4, 4, 4)
+    restore = RestoreMeta(["preds"], ["image_meta_dict"])
+    for index, item in enumerate(decollate_batch(batch)):
+        assert item["image_meta_dict"] is items[index]["image_meta_dict"]
+        preds = restore(item)["preds"]
+        assert preds.meta["filename_or_obj"] == f"case_{index}.nii.gz"
+        torch.testing.assert_close(preds.affine, items[index]["image"].affine)
+
+def test_collate_list_of_samples():
+    batch = MetaSidecarCollate()([[make_item(0), make_item(1)], [make_item(2), make_item(3)]])
+    assert len(batch["image_meta_dict"]) == 4
+
+def test_restore_meta_returns_a_new_tensor():
+    item = make_item(0)
+    preds = MetaTensor(torch.zeros(2, 4, 4, 4), meta={"filename_or_obj": "preds"})
+    out = RestoreMeta(["preds"], ["image_meta_dict"])({**item, "preds": preds})["preds"]
+    assert out is not preds
+    assert out.data_ptr() == preds.data_ptr()
+    assert preds.meta["filename_or_obj"] == "preds"
+    assert out.meta["filename_or_obj"] == "case_0.nii.gz"
+
+def test_restore_meta_needs_decollated_batch():
+    batch = MetaSidecarCollate()([make_item(0)])
+    batch["preds"] = torch.zeros(1, 2, 4, 4, 4)
+    with pytest.raises(ValueError):
+        RestoreMeta(["preds"], ["image_meta_dict"])(batch)
@@ -0,0 +1,87 @@
+import os
+import sys
+
+import pytest
+import torch
+from monai.metrics import DiceMetric
+from monai.networks.utils import one_hot
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mednext"))
+from custom.metrics import ConfusionMatrixMetric  # noqa: E402
+
+NUM_CLASSES = 3
+LOG_LABEL = ["val_meandice", "val_meandice_organ", "val_meandice_tumor"]
+
+def make_batch(seed):
+    torch.manual_seed(seed)
+    preds = torch.randint(0, NUM_CLASSES, (2, 1, 8, 8, 8))
+    label = torch.randint(0, NUM_CLASSES, (2, 1, 8, 8, 8))
+    # A case without tumor, excluded from the tumor mean
+    label[1][label[1] == 2] = 1
+    return preds, label
+
+def test_dice_parity():
+    metric = ConfusionMatrixMetric(NUM_CLASSES)
+    reference = DiceMetric(include_background=False, ignore_empty=True)
+    for seed in range(3):
+        preds, label = make_batch(seed)
+        scores = metric(preds, label)
+        expected = reference(one_hot(preds, NUM_CLASSES), one_hot(label, NUM_CLASSES))
+        torch.testing.assert_close(scores, expected.float(), equal_nan=True)
+    torch.testing.assert_close(metric.aggregate(), reference.aggregate().float())
+
+def test_per_class_layout():
+    # The iteration outputs and the aggregate have the layout of the log labels
+    metric = ConfusionMatrixMetric(NUM_CLASSES, per_class=True)
+    batches = [make_batch(seed) for seed in range(3)]
+    for preds, label in batches:
+        out = metric(preds, label)
+        assert isinstance(out, list) and len(out) == len(LOG_LABEL)
+        assert all(v.numel() == 1 for v in out)
+    aggregated = metric.aggregate()
+    assert isinstance(aggregated, list) and len(aggregated) == len(LOG_LABEL)
+
+    # A single batch aggregates to its iteration output
+    single = ConfusionMatrixMetric(NUM_CLASSES, per_class=True)
+    out = single(*batches[0])
+    for a, b in zip(out, single.aggregate()):
+        torch.testing.assert_close(a, b)
+
+def test_manafaln_metric_collection():
+    metric = pytest.importorskip("manafaln.core.metric")
+    collection = metric.MetricCollection([{
+        "name": "ConfusionMatrixMetric",
+        "path": "custom.metrics",
+        "input_keys": ["preds", "label"],
+        "log_label": LOG_LABEL,
+        "args": {"num_classes": NUM_CLASSES, "per_class": True}
+    }])
+    for seed in range(2):
+        preds, label = make_batch(seed)
+        out = collection.apply({"preds": preds, "label": label})
+        assert set(LOG_LABEL) <= set(out)
+    out = collection.aggregate()
+    assert set(LOG_LABEL) <= set(out)
+    assert all(torch.as_tensor(out[k]).numel() == 1 for k in LOG_LABEL)
+
+def test_out_of_range_values():
+    preds, label = make_batch(0)
+    metric = ConfusionMatrixMetric(NUM_CLASSES)
+    for bad_preds, bad_label in [(preds, label.masked_fill(label == 1, 255)), (preds - 1, label)]:
+        with pytest.raises(ValueError):
+            metric(bad_preds, bad_label)
+
+def test_ignore_index():
+    preds, label = make_batch(0)
+    ignored = torch.zeros_like(label, dtype=torch.bool)
+    ignored[..., :4] = True
+
+    metric = ConfusionMatrixMetric(NUM_CLASSES, ignore_index=255)
+    scores = metric(preds, label.masked_fill(ignored, 255))
+    # Same as scoring the voxels that are not ignored
+    reference = ConfusionMatrixMetric(NUM_CLASSES, spatial_dims=1)
+    expected = reference(
+        torch.stack([p[~m] for p, m in zip(preds, ignored)]).unsqueeze(1),
+        torch.stack([l[~m] for l, m in zip(label, ignored)]).unsqueeze(1)
+    )
+    torch.testing.assert_close(scores, expected, equal_nan=True)